@@ -0,0 +1,102 @@
+"""Cold-start import times of the app modules and the libraries they pull in.
+
+Each module is imported in a fresh interpreter, so the time includes everything
+it drags in. The report uses the same format as ``benchmarks.run`` and can be
+compared with ``python -m benchmarks.run --compare``:
+
+    python -m benchmarks.imports --output imports.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from benchmarks.run import _git_commit
+
+
+MODULES = [
+    "streamlit",
+    "shared.utils_upload",
+    "shared.utils_fitting",
+    "shared.utils_forecast",
+    "shared.utils_jobs",
+    "statsforecast",
+    "statsmodels.tsa.seasonal",
+    "sklearn.metrics",
+    "plotly.express",
+]
+HEAVY_MODULES = [
+    "statsforecast",
+    "statsmodels",
+    "sklearn",
+    "matplotlib",
+    "plotly.express",
+    "numba",
+]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps([seconds, heavy]))
+"""
+
+
+def time_import(module, repeat):
+    """Best of repeat cold imports of module, and the heavy libraries it loaded"""
+    best, heavy = None, []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode != 0:
+            return {"error": completed.stderr.strip().splitlines()[-1]}
+        seconds, heavy = json.loads(completed.stdout.strip().splitlines()[-1])
+        best = seconds if best is None else min(best, seconds)
+    return {"seconds": best, "heavy_imports": heavy}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = []
+    for module in args.modules:
+        measured = time_import(module, args.repeat)
+        results.append({"stage": f"import {module}", "points": 0, "series": 0, **measured})
+        status = measured.get("error") or (
+            f"{measured['seconds']:.3f}s {', '.join(measured['heavy_imports'])}"
+        )
+        print(f"{module:>26} {status}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
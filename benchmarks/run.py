@@ -0,0 +1,291 @@
+"""Headless benchmarks for the ingest, fit, forecast and plot pipeline.
+
+Every (stage, size) case runs in a fresh process so that wall time and peak
+RSS are not skewed by earlier cases. Run from the repository root:
+
+    python -m benchmarks.run --points 1000 100000 --series 1 100 --output run.json
+    python -m benchmarks.run --compare baseline.json run.json
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+
+STAGES = [
+    "ingest_file",
+    "transform_df_nixtla",
+    "fit_model",
+    "evaluate_performance",
+    "forecast",
+    "test_train_plot",
+]
+DEFAULT_POINTS = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_SERIES = [1, 10, 100, 1000]
+MIN_POINTS_PER_SERIES = 64
+
+
+class UploadedBytes(io.BytesIO):
+    """Mimic the file object Streamlit hands to the upload page"""
+
+    def __init__(self, data, name="benchmark.csv"):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def _prepare(stage, n_points, n_series, model_name, season_length, freq):
+    """Build the inputs of a stage outside of the timed region"""
+    from benchmarks.synthetic import make_csv, make_series
+    from shared.utils_fitting import fit_model, get_model, train_test_split
+
+    if stage == "ingest_file":
+        return {"file": UploadedBytes(make_csv(n_points, n_series, freq=freq))}
+
+    data = make_series(n_points, n_series, freq=freq)
+    if stage == "transform_df_nixtla":
+        raw = data.rename(columns={"unique_id": "meter", "ds": "timestamp", "y": "value"})
+        return {"raw": raw}
+
+    train_data, test_data = train_test_split(data, 80)
+    inputs = {"data": data, "train_data": train_data, "test_data": test_data}
+    inputs["model"] = get_model(model_name, season_length)
+    if stage in ("evaluate_performance", "forecast", "test_train_plot"):
+        inputs["forecast"], inputs["sf"] = fit_model(
+            inputs["model"], train_data, test_data, freq
+        )
+    return inputs
+
+
+def _run_stage(stage, inputs, model_name, freq):
+    """Execute one stage; this is the timed region"""
+    if stage == "ingest_file":
+        from shared.utils_upload import ingest_file
+
+        ingest_file(inputs["file"], ",")
+    elif stage == "transform_df_nixtla":
+        from shared.utils_upload import transform_df_nixtla
+
+        transform_df_nixtla(inputs["raw"], "timestamp", "value", "meter")
+    elif stage == "fit_model":
+        from shared.utils_fitting import run_fit
+
+        horizon = int(inputs["test_data"].groupby("unique_id").size().max())
+        # run_fit bypasses the fit cache so repeated runs measure real fits
+        run_fit(inputs["model"], inputs["train_data"], horizon, freq)
+    elif stage == "evaluate_performance":
+        from shared.utils_fitting import evaluate_performance_by_series
+
+        evaluate_performance_by_series(inputs["forecast"], inputs["test_data"], model_name)
+    elif stage == "forecast":
+        from shared.utils_forecast import forecast
+
+        horizon = int(inputs["test_data"].groupby("unique_id").size().max())
+        forecast(inputs["sf"], inputs["data"], horizon, freq)
+    elif stage == "test_train_plot":
+        from shared.utils_fitting import select_series, test_train_plot
+
+        first = inputs["data"]["unique_id"].iloc[0]
+        fig = test_train_plot(
+            select_series(inputs["data"], first),
+            select_series(inputs["train_data"], first),
+            select_series(inputs["test_data"], first),
+            "ds",
+            "y",
+            80,
+            select_series(inputs["forecast"], first),
+            model_name,
+        )
+        # Serialization is what the browser pays for, so it is part of the stage
+        fig.to_json()
+
+
+def _case(queue, stage, n_points, n_series, model_name, season_length, freq, store_dir):
+    os.environ["DATASET_STORE_DIR"] = store_dir
+    try:
+        from benchmarks.synthetic import series_freq
+
+        # The data may be generated at a finer frequency; the fit must use the same
+        freq = series_freq(n_points, n_series, freq)
+        inputs = _prepare(stage, n_points, n_series, model_name, season_length, freq)
+        rss_before = _peak_rss_mb()
+        start = time.perf_counter()
+        _run_stage(stage, inputs, model_name, freq)
+        seconds = time.perf_counter() - start
+        queue.put(
+            {
+                "seconds": seconds,
+                "peak_rss_mb": _peak_rss_mb(),
+                "peak_rss_delta_mb": _peak_rss_mb() - rss_before,
+            }
+        )
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def run_case(stage, n_points, n_series, model_name, season_length, freq, timeout):
+    """Run one stage at one size in a fresh process and collect its measurements"""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    with tempfile.TemporaryDirectory() as store_dir:
+        process = context.Process(
+            target=_case,
+            args=(queue, stage, n_points, n_series, model_name, season_length, freq, store_dir),
+        )
+        process.start()
+        process.join(timeout)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+            measured = {"error": f"timeout after {timeout}s"}
+        else:
+            try:
+                measured = queue.get(timeout=10)
+            except Exception:
+                measured = {"error": f"no result, exit code {process.exitcode}"}
+
+    from benchmarks.synthetic import series_freq
+
+    result = {
+        "stage": stage,
+        "points": n_points,
+        "series": n_series,
+        "freq": series_freq(n_points, n_series, freq),
+        **measured,
+    }
+    if "seconds" in measured:
+        result["points_per_second"] = n_points / max(measured["seconds"], 1e-9)
+        result["series_per_second"] = n_series / max(measured["seconds"], 1e-9)
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(points, series, stages, model_name, season_length, freq, timeout):
+    results = []
+    for n_points in points:
+        for n_series in series:
+            if n_points // n_series < MIN_POINTS_PER_SERIES:
+                continue
+            for stage in stages:
+                result = run_case(
+                    stage, n_points, n_series, model_name, season_length, freq, timeout
+                )
+                results.append(result)
+                status = result.get("error") or f"{result['seconds']:.3f}s"
+                print(
+                    f"{stage:>22} points={n_points:>10} series={n_series:>5} {status}",
+                    file=sys.stderr,
+                )
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "model": model_name,
+            "season_length": season_length,
+            "freq": freq,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline_path, current_path, tolerance):
+    """Print stages that got slower than tolerance; return True if any regressed"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(current_path) as f:
+        current = json.load(f)
+
+    def index(report):
+        return {
+            (r["stage"], r["points"], r["series"]): r
+            for r in report["results"]
+            if "seconds" in r
+        }
+
+    before, after = index(baseline), index(current)
+    regressed = False
+    for key in sorted(before.keys() & after.keys()):
+        ratio = after[key]["seconds"] / max(before[key]["seconds"], 1e-9)
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressed = True
+        print(
+            f"{key[0]:>22} points={key[1]:>10} series={key[2]:>5} "
+            f"{before[key]['seconds']:.3f}s -> {after[key]['seconds']:.3f}s ({ratio:.2f}x){flag}"
+        )
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, nargs="+", default=DEFAULT_POINTS)
+    parser.add_argument("--series", type=int, nargs="+", default=DEFAULT_SERIES)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--model", default="SeasonalNaive")
+    parser.add_argument("--season-length", type=int, default=24)
+    parser.add_argument("--freq", default="h")
+    parser.add_argument("--timeout", type=float, default=1800, help="Seconds per case")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CURRENT"),
+        help="Compare two JSON reports instead of running",
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging"
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return 1 if compare(*args.compare, args.tolerance) else 0
+
+    report = run(
+        args.points,
+        args.series,
+        args.stages,
+        args.model,
+        args.season_length,
+        args.freq,
+        args.timeout,
+    )
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
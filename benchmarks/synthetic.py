@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+# Frequencies tried, coarsest first, when a series is too long for its frequency
+FINER_FREQS = ["D", "h", "min", "s"]
+START = "2020-01-01"
+
+
+def _fits(length, freq):
+    """Whether length timestamps of freq span less than the largest Timedelta, which
+    also keeps them within datetime64[ns] once series_start moves the start back"""
+    return pd.Timedelta(to_offset(freq)).value * length < pd.Timedelta.max.value
+
+
+def series_freq(n_points, n_series=1, freq="h"):
+    """freq, or the coarsest finer frequency whose timestamps fit datetime64[ns].
+
+    Ten million hourly values span more than a thousand years, beyond the ns range.
+    The seasonalities are counted in samples, so a finer frequency leaves the
+    values unchanged.
+    """
+    length = max(n_points // n_series, 1)
+    if _fits(length, freq):
+        return freq
+    for finer in FINER_FREQS:
+        step = pd.Timedelta(to_offset(finer))
+        if step < pd.Timedelta(to_offset(freq)) and _fits(length, finer):
+            return finer
+    raise ValueError(f"{length} timestamps do not fit datetime64[ns] at any frequency")
+
+
+def series_start(length, freq, start=START):
+    """start, moved back far enough that the last of length timestamps still fits"""
+    latest = pd.Timestamp.max.floor("D") - pd.Timedelta(to_offset(freq)) * length
+    return min(pd.Timestamp(start), latest)
+
+
+def make_series(
+    n_points,
+    n_series=1,
+    freq="h",
+    seasonalities=(24, 168),
+    trend=0.01,
+    noise=1.0,
+    start=START,
+    seed=0,
+):
+    """Generate a long unique_id/ds/y frame of trend + seasonalities + noise.
+
+    ``n_points`` is the total number of rows, split evenly across ``n_series``.
+    Every series gets its own random amplitudes, phases and level. Series too long
+    for ``freq`` in datetime64[ns] start earlier, or use the frequency returned by
+    ``series_freq``.
+    """
+    rng = np.random.default_rng(seed)
+    length = max(n_points // n_series, 1)
+    freq = series_freq(n_points, n_series, freq)
+    t = np.arange(length, dtype=np.float64)
+
+    levels = rng.uniform(10, 100, size=(n_series, 1))
+    values = levels + trend * t
+    for period in seasonalities:
+        amplitude = rng.uniform(0.5, 5, size=(n_series, 1))
+        phase = rng.uniform(0, 2 * np.pi, size=(n_series, 1))
+        values = values + amplitude * np.sin(2 * np.pi * t / period + phase)
+    values = values + rng.normal(0, noise, size=(n_series, length))
+
+    ds = pd.date_range(series_start(length, freq, start), periods=length, freq=freq)
+    width = len(str(n_series - 1))
+    ids = np.array([f"series_{i:0{width}d}" for i in range(n_series)])
+    return pd.DataFrame(
+        {
+            "unique_id": np.repeat(ids, length),
+            "ds": np.tile(ds.to_numpy(), n_series),
+            "y": values.ravel().astype(np.float32),
+        }
+    )
+
+
+def make_csv(n_points, n_series=1, freq="h", seed=0, **kwargs):
+    """Render a synthetic dataset as CSV bytes in the layout users upload"""
+    df = make_series(n_points, n_series, freq=freq, seed=seed, **kwargs)
+    df = df.rename(columns={"unique_id": "meter", "ds": "timestamp", "y": "value"})
+    return df.to_csv(index=False).encode("utf-8")
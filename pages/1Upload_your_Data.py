@@ -2,13 +2,20 @@ import streamlit as st
 import pandas as pd
 from shared.utils_upload import (
     is_data_in_session,
-    load_file,
+    ingest_file,
+    load_series,
+    read_header,
     render_initial_main_content,
     process_data,
     select_columns,
+    select_series_layout,
+    select_decomposition,
 )
+from shared.utils_store import read_columns
+from shared.utils_profiling import render_perf_sidebar, start_profiling
 
 st.set_page_config(page_title="Upload Data", page_icon="⬆️", layout="wide")
+start_profiling()
 
 st.title("Upload Your Data and Visualize It 📊")
 st.sidebar.header("Upload your data")
@@ -18,34 +25,75 @@ st.sidebar.header("Upload your data")
 if not is_data_in_session():
     uploaded_file = st.sidebar.file_uploader("**Choose a file**", type=["csv"])
     if uploaded_file:
-        dataframe = load_file(uploaded_file)
-        if dataframe is not None:
+        columns, delimiter = read_header(uploaded_file)
+        if columns is not None:
             st.sidebar.success("File successfully loaded!")
-            x_axis, y_axis = select_columns(dataframe)
+            x_axis, y_axis = select_columns(columns)
+            id_axis, y_columns = select_series_layout(columns, x_axis, y_axis)
+            decomposition = select_decomposition()
             if st.sidebar.button("Submit"):
-                st.session_state.update(
-                    {
-                        "filename": uploaded_file.name,
-                        "uploaded_data": dataframe,
-                        "x_axis": x_axis,
-                        "y_axis": y_axis,
-                    }
-                )
-                process_data(dataframe, x_axis, y_axis)
+                dataset_id = ingest_file(uploaded_file, delimiter)
+                if dataset_id is not None:
+                    st.session_state.update(
+                        {
+                            "filename": uploaded_file.name,
+                            "dataset_id": dataset_id,
+                            "x_axis": x_axis,
+                            "y_axis": y_axis,
+                            "id_axis": id_axis,
+                            "y_columns": y_columns,
+                        }
+                    )
+                    process_data(
+                        load_series(dataset_id, x_axis, y_axis, id_axis),
+                        x_axis,
+                        y_axis,
+                        id_axis,
+                        decomposition,
+                    )
 else:
     st.sidebar.write("### File Information:")
     st.sidebar.write(f"**Filename:** {st.session_state.get('filename', 'Unknown')}")
-    dataframe = st.session_state["uploaded_data"]
-    x_axis, y_axis = select_columns(dataframe)
+    dataset_id = st.session_state["dataset_id"]
+    columns = read_columns(dataset_id)
+    x_axis, y_axis = select_columns(columns)
+    id_axis, y_columns = select_series_layout(columns, x_axis, y_axis)
+    decomposition = select_decomposition()
 
     if st.sidebar.button("Submit"):
         st.session_state.update(
             {
                 "x_axis": x_axis,
                 "y_axis": y_axis,
+                "id_axis": id_axis,
+                "y_columns": y_columns,
             }
         )
-        process_data(dataframe, x_axis, y_axis)
+        process_data(
+            load_series(dataset_id, x_axis, y_axis, id_axis),
+            x_axis,
+            y_axis,
+            id_axis,
+            decomposition,
+        )
+
+    newer_file = st.sidebar.file_uploader(
+        "**Load a newer export**",
+        type=["csv"],
+        help="Replaces the data but keeps the column selection and the fitted model, "
+        "so the Forecasting page can update the model with the new rows.",
+    )
+    if newer_file and st.sidebar.button("Replace Data"):
+        newer_columns, delimiter = read_header(newer_file)
+        if newer_columns is not None and set(columns) <= set(newer_columns):
+            newer_id = ingest_file(newer_file, delimiter)
+            if newer_id is not None:
+                st.session_state.update(
+                    {"filename": newer_file.name, "dataset_id": newer_id}
+                )
+                st.sidebar.success("Data replaced successfully!")
+        elif newer_columns is not None:
+            st.sidebar.error("The newer export is missing columns of the current data.")
 
     if st.sidebar.button("Delete Data"):
         st.session_state.clear()
@@ -55,3 +103,4 @@ else:
 # Render initial content if no data
 if not is_data_in_session():
     render_initial_main_content()
+render_perf_sidebar()
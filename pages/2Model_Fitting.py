@@ -1,5 +1,5 @@
 import streamlit as st
-import plotly.express as px
+import time
 
 from shared.utils_fitting import (
     load_data_from_session,
@@ -7,17 +7,64 @@ from shared.utils_fitting import (
     render_initial_sidebar,
     test_train_plot,
     get_model,
+    get_models,
     fit_model,
-    evaluate_performance,
+    make_fit_config,
+    apply_fit_result,
+    render_cv_sidebar,
+    render_interval_sidebar,
+    cross_validate,
+    cross_validation_metrics,
+    ALL_MODELS,
+    render_data_checks,
+    render_fit_warnings,
+    infer_session_settings,
+    return_frequency,
+    series_ids,
+    select_series,
 )
 from shared.utils_upload import is_data_in_session
+from shared.utils_preprocess import render_preprocess_sidebar
+from shared.utils_exog import render_exog_sidebar
+from shared.utils_cache import render_cache_sidebar
+from shared.utils_plot import render_zoomable_chart, zoom_window
+from shared.utils_jobs import collect_fit_job, render_job_sidebar, submit_fit_job
+from shared.utils_anomaly import (
+    render_anomaly_sidebar,
+    render_anomaly_table,
+    session_anomalies,
+)
+from shared.utils_search import (
+    render_search_sidebar,
+    run_search,
+    search_candidates,
+    shortest_series,
+)
+from shared.utils_profiling import render_perf_sidebar, start_profiling
 
 st.set_page_config(page_title="Model Fitting", page_icon="🦾", layout="wide")
+start_profiling()
 
 st.title("Model Fitting 🦾")
 
+settings = None
+preprocess = None
+exog = None
+if is_data_in_session():
+    preprocess = render_preprocess_sidebar(return_frequency())
+    exog = render_exog_sidebar(
+        st.session_state["dataset_id"],
+        [st.session_state["x_axis"], st.session_state["y_axis"], st.session_state.get("id_axis")]
+        + (st.session_state.get("y_columns") or []),
+    )
+    x_axis, y_axis, data = load_data_from_session(preprocess, exog)
+    settings = infer_session_settings(data, preprocess, exog)
+
 # Sidebar
-split_ratio, model, selected_freq, season_length, season_mstl = render_initial_sidebar()
+split_ratio, model, selected_freq, season_length, season_mstl = render_initial_sidebar(
+    settings
+)
+intervals = render_interval_sidebar(model)
 
 mae = None
 
@@ -25,40 +72,160 @@ if "last_evaluation" not in st.session_state:
     st.session_state.last_evaluation = None
 
 if is_data_in_session():
-    x_axis, y_axis, data = load_data_from_session()
+    render_data_checks(data, preprocess, exog)
     train_data, test_data = train_test_split(data, split_ratio)
-    fig = test_train_plot(data, train_data, test_data, x_axis, y_axis, split_ratio)
+    ids = series_ids(data)
+    plot_id = None
+    if len(ids) > 1:
+        plot_id = st.sidebar.selectbox("Series to plot", ids)
 
+    background = st.sidebar.toggle(
+        "Fit in background",
+        help="Run the fit in a worker process so the page stays responsive",
+    )
+    render_fit_warnings(model, train_data, season_length, season_mstl)
+    fit_result = None
     if st.sidebar.button("Fit Model"):
-        selected_model = get_model(model, season_length, season_mstl)
-        with st.spinner("Fitting Model..."):
-            forecast, sf = fit_model(
-                selected_model, train_data, test_data, selected_freq
-            )
-            st.session_state["fitted_model"] = sf
-            fig = test_train_plot(
-                data,
+        fit_config = make_fit_config(
+            model,
+            season_length,
+            season_mstl,
+            selected_freq,
+            split_ratio,
+            preprocess=preprocess,
+            exog=exog,
+            **intervals,
+        )
+        if background:
+            job_id = submit_fit_job(
+                fit_config["selected_model"],
                 train_data,
                 test_data,
-                x_axis,
-                y_axis,
+                selected_freq,
+                label=str(model),
+                level=fit_config["level"],
+                conformal=fit_config["conformal"],
+            )
+            st.session_state["fit_job"] = {"job_id": job_id, "config": fit_config}
+        else:
+            with st.spinner("Fitting Model..."):
+                start = time.perf_counter()
+                forecast, sf = fit_model(
+                    fit_config["selected_model"],
+                    train_data,
+                    test_data,
+                    selected_freq,
+                    level=fit_config["level"],
+                    conformal=fit_config["conformal"],
+                )
+                elapsed = time.perf_counter() - start
+            current_evaluation = apply_fit_result(
+                fit_config, forecast, sf, data, fit_seconds=elapsed
+            )
+            fit_result = (fit_config, forecast)
+            st.sidebar.write(
+                f"**Throughput:** {len(ids) / max(elapsed, 1e-9):.1f} series/s "
+                f"({len(ids)} series in {elapsed:.2f}s)"
+            )
+
+    search_config = render_search_sidebar(settings, season_length)
+    if search_config and st.sidebar.button("Run Search"):
+        candidates = search_candidates(
+            search_config["models"],
+            search_config["season_lengths"],
+            search_config["arima_orders"],
+            shortest_series(train_data) // 2,
+            search_config["max_candidates"],
+        )
+        start = time.perf_counter()
+        results, best = run_search(
+            candidates,
+            train_data,
+            test_data,
+            selected_freq,
+            level=intervals["level"],
+            progress=st.progress(0.0, text="Search: starting"),
+        )
+        st.session_state["search_results"] = results
+        if best is None:
+            st.sidebar.error("No candidate could be fitted.")
+        else:
+            # The winner is applied like a regular fit, so it reaches the Forecasting page
+            fit_config = make_fit_config(
+                best["candidate"]["model"],
+                best["candidate"]["season_length"],
+                best["candidate"]["season_mstl"],
+                selected_freq,
                 split_ratio,
-                forecast,
-                model,
+                level=intervals["level"],
+                preprocess=preprocess,
+                exog=exog,
+                arima_limits=best["candidate"]["arima_limits"],
+            )
+            current_evaluation = apply_fit_result(
+                fit_config, best["forecast"], best["sf"], data, fit_seconds=best["seconds"]
             )
+            fit_result = (fit_config, best["forecast"])
+            st.sidebar.write(
+                f"**Search:** {len(candidates)} candidates in "
+                f"{time.perf_counter() - start:.1f}s"
+            )
+
+    pending = st.session_state.get("fit_job")
+    job_evaluation = collect_fit_job(data)
+    if job_evaluation is not None:
+        current_evaluation = job_evaluation
+        fit_result = (pending["config"], st.session_state.pop("fit_job_forecast"))
+
+    if fit_result is not None:
+        fit_config, forecast = fit_result
+        if fit_config["split_ratio"] != split_ratio:
+            split_ratio = fit_config["split_ratio"]
+            train_data, test_data = train_test_split(data, split_ratio)
+        # Keep the forecast so zooming into the chart still shows it
+        st.session_state["last_fit"] = fit_result
         st.sidebar.success("Model Fitted Successfully")
-        mae, r2, mape = evaluate_performance(forecast, test_data, model)
-        current_evaluation = {"mae": mae, "r2": r2, "mape": mape}
-        st.session_state["selected_model"] = selected_model
-        st.session_state["freq"] = selected_freq
-        st.session_state["season_length"] = season_length
-        st.session_state["season_mstl"] = season_mstl
-        st.session_state["split_ratio"] = split_ratio
+        mae = current_evaluation["mae"]
+        r2 = current_evaluation["r2"]
+        mape = current_evaluation["mape"]
+
+    last_fit = st.session_state.get("last_fit")
+    anomaly_config = render_anomaly_sidebar(season_length)
+    anomalies = None
+    if last_fit is not None and last_fit[0]["split_ratio"] == split_ratio:
+        plotted_forecast = select_series(last_fit[1], plot_id)
+        plotted_model = last_fit[0]["plotted_model"]
+        if anomaly_config:
+            anomalies = session_anomalies(last_fit, data, **anomaly_config)
+    else:
+        plotted_forecast, plotted_model = None, None
+    fig = test_train_plot(
+        select_series(data, plot_id),
+        select_series(train_data, plot_id),
+        select_series(test_data, plot_id),
+        x_axis,
+        y_axis,
+        split_ratio,
+        plotted_forecast,
+        plotted_model,
+        window=zoom_window("fit_chart"),
+        anomalies=select_series(anomalies, plot_id),
+    )
+
+    cv_config = render_cv_sidebar()
+    if cv_config and st.sidebar.button("Run Cross-Validation"):
+        if model == ALL_MODELS:
+            cv_models = get_models(season_length, season_mstl)
+        else:
+            cv_models = [get_model(model, season_length, season_mstl)]
+        with st.spinner("Running Cross-Validation..."):
+            cv_df = cross_validate(cv_models, data, selected_freq, **cv_config)
+        st.session_state["cv_results"] = (cv_df, [str(m) for m in cv_models])
 
     st.write(
         f"### Train-Test Split Visualization ({split_ratio}% Train, {100 - split_ratio}% Test)"
     )
-    st.plotly_chart(fig, use_container_width=True)
+    render_zoomable_chart(fig, "fit_chart")
     if mae:
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -91,5 +258,36 @@ if is_data_in_session():
                 delta_color="inverse",
             )
         st.session_state.last_evaluation = current_evaluation
+    if mae and st.session_state.get("interval_metrics") is not None:
+        st.write("### Prediction Intervals")
+        st.dataframe(st.session_state["interval_metrics"], use_container_width=True)
+    if mae and st.session_state.get("leaderboard") is not None:
+        st.write("### Model Leaderboard")
+        st.dataframe(st.session_state["leaderboard"], use_container_width=True)
+    if search_config and st.session_state.get("search_results") is not None:
+        st.write("### Hyperparameter Search")
+        st.dataframe(st.session_state["search_results"], use_container_width=True)
+    if anomalies is not None:
+        render_anomaly_table(anomalies)
+    if len(ids) > 1 and st.session_state.get("series_metrics") is not None:
+        st.write("### Metrics per Series")
+        st.dataframe(st.session_state["series_metrics"], use_container_width=True)
+    if cv_config and st.session_state.get("cv_results") is not None:
+        cv_df, cv_model_names = st.session_state["cv_results"]
+        st.write("### Cross-Validation")
+        view = st.radio(
+            "Group metrics by",
+            ["model", "cutoff", "unique_id"],
+            format_func={"model": "Model", "cutoff": "Cutoff", "unique_id": "Series"}.get,
+            horizontal=True,
+        )
+        st.dataframe(
+            cross_validation_metrics(cv_df, cv_model_names, by=view),
+            use_container_width=True,
+        )
 else:
     st.error("You have to first update Data on the upload page.")
+
+render_job_sidebar()
+render_cache_sidebar()
+render_perf_sidebar()
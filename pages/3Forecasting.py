@@ -1,26 +1,49 @@
 import streamlit as st
-import plotly.express as px
 
 from shared.utils_fitting import (
     load_data_from_session,
+    load_future_rows_from_session,
+    series_ids,
+    select_series,
 )
+from shared.utils_upload import is_data_in_session
+from shared.utils_jobs import collect_fit_job, render_job_sidebar
+from shared.utils_plot import render_zoomable_chart, zoom_window
 from shared.utils_forecast import (
     forecast_plot,
     render_model_sidebar,
-    forecast,
+    render_registry_sidebar,
+    render_update_sidebar,
+    render_update_report,
+    update_forecast,
+    future_exog,
     load_model_data_from_session,
     is_model_data_in_session,
 )
+from shared.utils_profiling import render_perf_sidebar, start_profiling
 
 
 st.set_page_config(page_title="Forecasting", page_icon="🚀", layout="wide")
+start_profiling()
 
 st.title("Forecasting 🚀")
 
 forecasted_data = None
 
+render_registry_sidebar()
+
+if is_data_in_session() and st.session_state.get("fit_job") is not None:
+    # Pick up a fit that finished in the background while the user was away
+    job_config = st.session_state["fit_job"]["config"]
+    job_data = load_data_from_session(job_config.get("preprocess"), job_config.get("exog"))[2]
+    job_evaluation = collect_fit_job(job_data)
+    if job_evaluation is not None:
+        st.session_state.last_evaluation = job_evaluation
+
 if is_model_data_in_session():
-    x_axis, y_axis, data = load_data_from_session()
+    preprocess = st.session_state.get("preprocess")
+    exog = st.session_state.get("exog")
+    x_axis, y_axis, data = load_data_from_session(preprocess, exog)
     (
         selected_model,
         model_name,
@@ -29,18 +52,60 @@ if is_model_data_in_session():
         season_mstl,
         split_ratio,
     ) = load_model_data_from_session()
-    fig = forecast_plot(data, x_axis, y_axis, selected_model)
+    ids = series_ids(data)
+    plot_id = None
+    if len(ids) > 1:
+        plot_id = st.sidebar.selectbox("Series to plot", ids)
     forecast_horizon = render_model_sidebar(
         model_name, selected_freq, season_length, season_mstl
     )
+    update_only = render_update_sidebar()
     if st.sidebar.button("Forecast"):
         with st.spinner("Forecasting..."):
-            forecasted_data = forecast(
-                selected_model, data, forecast_horizon, selected_freq, season_mstl
+            X_df = None
+            if exog:
+                X_df = future_exog(
+                    data,
+                    load_future_rows_from_session(preprocess, exog),
+                    forecast_horizon,
+                    selected_freq,
+                    exog["calendar"],
+                )
+            forecasted_data, report = update_forecast(
+                selected_model,
+                data,
+                forecast_horizon,
+                selected_freq,
+                st.session_state.get("fitted_until", data["ds"].max()),
+                str(model_name),
+                (st.session_state.get("last_evaluation") or {}).get("mae"),
+                force_refit=not update_only,
+                level=st.session_state.get("level"),
+                conformal=st.session_state.get("conformal", False),
+                X_df=X_df,
             )
-            fig = forecast_plot(data, x_axis, y_axis, str(model_name), forecasted_data)
-    st.plotly_chart(fig, use_container_width=True)
+            if report["mode"] == "refit":
+                st.session_state["refit_seconds"] = report["seconds"]
+            st.session_state["fitted_until"] = data["ds"].max()
+            st.session_state["last_update_report"] = report
+        # Keep the forecast so zooming into the chart still shows it
+        st.session_state["last_forecast"] = forecasted_data
+    if st.session_state.get("last_update_report") is not None:
+        render_update_report(st.session_state["last_update_report"])
+    plotted_forecast = st.session_state.get("last_forecast")
+    fig = forecast_plot(
+        select_series(data, plot_id),
+        x_axis,
+        y_axis,
+        str(model_name),
+        select_series(plotted_forecast, plot_id),
+        window=zoom_window("forecast_chart"),
+    )
+    render_zoomable_chart(fig, "forecast_chart")
     if forecasted_data is not None:
         st.dataframe(forecasted_data, use_container_width=True)
 else:
     st.error("You have to first fit a model.")
+
+render_job_sidebar()
+render_perf_sidebar()
@@ -0,0 +1,69 @@
+import streamlit as st
+
+from shared.utils_registry import (
+    MODEL_REGISTRY_MAX_AGE_DAYS,
+    MODEL_REGISTRY_MAX_MB,
+    collect_garbage,
+    compare_models,
+    data_fingerprint,
+    delete_model,
+    list_models,
+)
+from shared.utils_profiling import render_perf_sidebar, start_profiling
+
+st.set_page_config(page_title="Model Registry", page_icon="🗂️", layout="wide")
+start_profiling()
+
+st.title("Model Registry 🗂️")
+
+current_fingerprint = None
+if "dataset_id" in st.session_state:
+    current_fingerprint = data_fingerprint(
+        st.session_state["dataset_id"],
+        st.session_state.get("x_axis"),
+        st.session_state.get("y_columns") or st.session_state.get("y_axis"),
+        st.session_state.get("id_axis"),
+    )
+only_current = st.sidebar.toggle(
+    "Only fits of the current data",
+    value=current_fingerprint is not None,
+    disabled=current_fingerprint is None,
+)
+st.sidebar.divider()
+st.sidebar.header("Clean Up")
+max_age_days = st.sidebar.number_input(
+    "Remove fits unused for (days)", min_value=0.0, value=MODEL_REGISTRY_MAX_AGE_DAYS
+)
+max_mb = st.sidebar.number_input(
+    "Keep the registry below (MB)", min_value=0.0, value=MODEL_REGISTRY_MAX_MB
+)
+if st.sidebar.button("Collect Garbage"):
+    removed = collect_garbage(max_age_days, max_mb, keep=st.session_state.get("model_id"))
+    st.sidebar.success(f"Removed {len(removed)} fits")
+
+entries = list_models(current_fingerprint if only_current else None)
+
+if entries:
+    table = compare_models(entries)
+    st.write(f"### Saved Fits ({len(entries)})")
+    st.dataframe(table, use_container_width=True)
+
+    selected = st.multiselect(
+        "Compare fits",
+        list(table.index),
+        format_func=lambda model_id: f"{table.loc[model_id, 'Model']} "
+        f"v{table.loc[model_id, 'Version']} ({model_id})",
+    )
+    if selected:
+        st.write("### Comparison")
+        st.dataframe(table.loc[selected].T.astype(str), use_container_width=True)
+        st.bar_chart(table.loc[selected, ["MAE", "MAPE"]])
+        if st.button("Delete Selected"):
+            for model_id in selected:
+                delete_model(model_id)
+            st.rerun()
+    st.caption("Load a fit on the Forecasting page.")
+else:
+    st.info("No fits saved yet. Fitted models are saved automatically.")
+
+render_perf_sidebar()
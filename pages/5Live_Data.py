@@ -0,0 +1,118 @@
+import streamlit as st
+import uuid
+
+from shared.utils_forecast import forecast_plot
+from shared.utils_live import (
+    extend_live_frame,
+    get_stream,
+    live_frame,
+    live_model,
+    live_series_id,
+    live_session,
+    refresh_live_forecast,
+    render_live_sidebar,
+    start_stream,
+    stop_stream,
+)
+from shared.utils_store import write_dataset
+from shared.utils_profiling import render_perf_sidebar, start_profiling
+
+st.set_page_config(page_title="Live Data", page_icon="📡", layout="wide")
+start_profiling()
+
+st.title("Live Data 📡")
+
+config, refresh = render_live_sidebar()
+session = live_session()
+col1, col2 = st.sidebar.columns(2)
+if col1.button("Start"):
+    if config["kind"] == "File" and not config["path"]:
+        st.sidebar.error("Enter the name of the file to follow.")
+    else:
+        try:
+            previous = st.session_state.get("live_source")
+            st.session_state["live_source"] = start_stream(config, session)
+            if previous not in (None, st.session_state["live_source"]):
+                stop_stream(previous, session)
+            # A new source starts from the fitted model again
+            st.session_state.pop("live_model_id", None)
+            st.session_state.pop("live_report", None)
+            st.session_state.pop("live_frame", None)
+        except (OSError, ValueError) as e:
+            st.sidebar.error(f"The source could not be opened: {e}")
+if col2.button("Stop") and st.session_state.get("live_source") is not None:
+    stop_stream(st.session_state.pop("live_source"), session)
+
+key = st.session_state.get("live_source")
+stream = get_stream(key, session) if key is not None else None
+if stream is not None and st.sidebar.button(
+    "Use buffer as dataset",
+    help="Store the buffered values as a dataset to fit a model on them.",
+):
+    ds, y, _ = stream.buffer.snapshot()
+    dataset_id = write_dataset(
+        f"live-{uuid.uuid4().hex[:12]}", iter([live_frame(ds, y, "live")[["ds", "y"]]])
+    )
+    st.session_state.update(
+        {
+            "filename": f"Live data ({len(ds)} points)",
+            "dataset_id": dataset_id,
+            "x_axis": "ds",
+            "y_axis": "y",
+            "id_axis": None,
+            "y_columns": None,
+        }
+    )
+    st.sidebar.success("Stored. Fit a model on the Model Fitting page.")
+
+
+@st.fragment(run_every=refresh["interval"])
+def live_panel():
+    """Redraw the buffered data and, once enough points arrived, the forecast"""
+    stream = get_stream(key, session) if key is not None else None
+    if stream is None:
+        st.info("Start a source to follow its data.")
+        return
+    model = live_model()
+    unique_id = live_series_id(model) if model is not None else "live"
+    cached = st.session_state.get("live_frame")
+    if cached is None or cached["source"] != (key, unique_id):
+        cached = {"source": (key, unique_id), "frame": None, "total": 0}
+    # Only the points received since the last tick are copied out of the buffer
+    cached["frame"], cached["total"] = extend_live_frame(
+        cached["frame"], stream.buffer, cached["total"], unique_id
+    )
+    st.session_state["live_frame"] = cached
+    data, total = cached["frame"], cached["total"]
+
+    status = f"{total} points received, {len(data)} buffered"
+    if not stream.running:
+        status += " · stopped"
+    st.caption(status)
+    if stream.error:
+        st.error(f"The source failed: {stream.error}")
+    if data.empty:
+        return
+
+    if model is None:
+        st.info("Fit a model without regressors to forecast the live data.")
+    else:
+        try:
+            refresh_live_forecast(model, data, total, refresh)
+        except Exception as e:
+            st.warning(f"The live forecast failed: {e}")
+        report = st.session_state.get("live_report")
+        if report is not None:
+            st.caption(
+                f"Last forecast: {report['mode']}, {report['new_rows']} new points, "
+                f"{report['seconds']:.2f}s"
+            )
+    model_name = str(st.session_state.get("selected_model"))
+    fig = forecast_plot(
+        data, "Time", "Value", model_name, st.session_state.get("live_forecast")
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+
+live_panel()
+render_perf_sidebar()
@@ -0,0 +1,251 @@
+"""Headless batch forecasting over many CSV or Parquet files.
+
+Runs the same pipeline as the app (transform_df_nixtla, get_model, fit_model,
+evaluate_performance, forecast) on every file with a process pool. Each file's
+forecast is written as its own Parquet part as soon as it finishes, and a
+manifest records finished files so an interrupted run picks up where it stopped:
+
+    python -m shared.batch "data/*.csv" --output out --x-col date --y-col value \\
+        --model AutoARIMA --season-length 7 --freq D
+
+The output directory can be read back with ``pd.read_parquet("out/forecasts")``.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+
+INPUT_EXTENSIONS = (".csv", ".parquet")
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def list_inputs(patterns):
+    """Expand directories and glob patterns into a sorted list of input files"""
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*")
+        files.update(
+            os.path.abspath(path)
+            for path in glob.glob(pattern)
+            if path.lower().endswith(INPUT_EXTENSIONS) and os.path.isfile(path)
+        )
+    return sorted(files)
+
+
+def read_input(path, x_col, y_col, id_col=None):
+    """Read only the configured columns of a CSV or Parquet file"""
+    from shared.utils_upload import detect_delimiter
+
+    y_cols = [y_col] if isinstance(y_col, str) else list(y_col)
+    columns = [x_col] + y_cols + ([id_col] if id_col else [])
+    if path.lower().endswith(".parquet"):
+        return pd.read_parquet(path, columns=columns)
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        delimiter = detect_delimiter(f.read(64 * 1024))
+    return pd.read_csv(path, delimiter=delimiter, usecols=columns)
+
+
+def file_signature(path):
+    """Size and modification time, so changed files are processed again"""
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def part_name(path):
+    return f"{hashlib.sha1(path.encode()).hexdigest()[:16]}.parquet"
+
+
+def forecast_file(path, config):
+    """Fit, evaluate and forecast one file; returns the forecast and its metrics"""
+    from shared.utils_fitting import (
+        evaluate_performance,
+        fit_model,
+        get_model,
+        train_test_split,
+    )
+    from shared.utils_forecast import forecast
+    from shared.utils_preprocess import preprocess_series
+    from shared.utils_upload import transform_df_nixtla
+
+    df = read_input(path, config["x_col"], config["y_col"], config.get("id_col"))
+    data = transform_df_nixtla(df, config["x_col"], config["y_col"], config.get("id_col"))
+    if config.get("preprocess"):
+        data = preprocess_series(data, **config["preprocess"])
+    train_data, test_data = train_test_split(data, config["split_ratio"])
+    model = get_model(
+        config["model"],
+        config["season_length"],
+        config.get("season_mstl"),
+        config.get("arima_limits"),
+    )
+    level = config.get("level") or None
+
+    holdout, sf = fit_model(model, train_data, test_data, config["freq"], level=level)
+    mae, r2, mape = evaluate_performance(holdout, test_data, str(model))
+
+    horizon = config.get("horizon") or int(
+        test_data.groupby("unique_id", sort=False, observed=True).size().max()
+    )
+    forecast_df = forecast(sf, data, horizon, config["freq"], level=level)
+    forecast_df.insert(0, "file", path)
+    metrics = {
+        "rows": len(data),
+        "series": int(data["unique_id"].nunique()),
+        "mae": mae,
+        "r2": r2,
+        "mape": mape,
+    }
+    return forecast_df, metrics
+
+
+def _process_file(path, config, output_dir):
+    """Worker: forecast one file and write its Parquet part atomically"""
+    start = time.perf_counter()
+    record = {"file": path, **file_signature(path)}
+    try:
+        forecast_df, metrics = forecast_file(path, config)
+        part = os.path.join(output_dir, "forecasts", part_name(path))
+        tmp_part = f"{part}.{os.getpid()}.tmp"
+        forecast_df.to_parquet(tmp_part, index=False)
+        os.replace(tmp_part, part)
+        record.update(status="done", part=part, **metrics)
+    except Exception as e:
+        record.update(status="failed", error=f"{type(e).__name__}: {e}")
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def load_manifest(output_dir):
+    """Return the latest manifest record of every file"""
+    records = {}
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    records[record["file"]] = record
+    return records
+
+
+def is_done(record, path):
+    return (
+        record is not None
+        and record["status"] == "done"
+        and os.path.exists(record["part"])
+        and file_signature(path) == {"size": record["size"], "mtime": record["mtime"]}
+    )
+
+
+def run_batch(inputs, output_dir, config, max_workers=None, resume=True, log=sys.stderr):
+    """Forecast every input file and return a summary of the run.
+
+    ``inputs`` are files, directories or glob patterns. With ``resume`` files that
+    finished in an earlier run and did not change since are skipped.
+    """
+    files = list_inputs(inputs)
+    os.makedirs(os.path.join(output_dir, "forecasts"), exist_ok=True)
+    manifest = load_manifest(output_dir) if resume else {}
+    pending = [path for path in files if not is_done(manifest.get(path), path)]
+    summary = {"files": len(files), "skipped": len(files) - len(pending), "done": 0, "failed": 0}
+
+    from shared.utils_fitting import single_process_fits
+
+    start = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with open(os.path.join(output_dir, MANIFEST_NAME), "a" if resume else "w") as manifest_file:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=context, initializer=single_process_fits
+        ) as executor:
+            futures = [
+                executor.submit(_process_file, path, config, output_dir) for path in pending
+            ]
+            for future in as_completed(futures):
+                record = future.result()
+                manifest[record["file"]] = record
+                manifest_file.write(json.dumps(record) + "\n")
+                manifest_file.flush()
+                summary[record["status"]] += 1
+                finished = summary["done"] + summary["failed"]
+                rate = finished / max(time.perf_counter() - start, 1e-9) * 60
+                if log is not None:
+                    status = record.get("error") or f"{record['seconds']:.2f}s"
+                    print(
+                        f"[{finished}/{len(pending)}] {rate:.1f} files/min "
+                        f"{os.path.basename(record['file'])}: {status}",
+                        file=log,
+                    )
+
+    wanted = set(files)
+    metrics = pd.DataFrame([record for path, record in manifest.items() if path in wanted])
+    if not metrics.empty:
+        metrics.to_parquet(os.path.join(output_dir, "metrics.parquet"), index=False)
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    summary["files_per_minute"] = round(
+        (summary["done"] + summary["failed"]) / max(summary["seconds"], 1e-9) * 60, 2
+    )
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="Files, directories or glob patterns")
+    parser.add_argument("--output", required=True, help="Directory for results and manifest")
+    parser.add_argument("--x-col", required=True, help="Timestamp column")
+    parser.add_argument(
+        "--y-col", required=True, nargs="+", help="Value column, or several to melt"
+    )
+    parser.add_argument("--id-col", help="Series identifier column")
+    parser.add_argument("--model", default="AutoARIMA")
+    parser.add_argument("--season-length", type=int, default=1)
+    parser.add_argument("--season-mstl", type=int, default=0)
+    parser.add_argument("--freq", default="D")
+    parser.add_argument("--split-ratio", type=int, default=80)
+    parser.add_argument("--horizon", type=int, help="Defaults to the holdout length")
+    parser.add_argument("--level", type=int, nargs="*", default=[], help="Interval levels")
+    parser.add_argument("--resample", help="Resample to this frequency before fitting")
+    parser.add_argument("--agg", default="mean", choices=["mean", "sum", "last", "max"])
+    parser.add_argument("--fill", choices=["ffill", "interpolate", "zero"], help="Fill gaps")
+    parser.add_argument("--clip", type=float, help="Clip outliers beyond this many MADs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--restart", action="store_true", help="Ignore the manifest and process everything"
+    )
+    args = parser.parse_args(argv)
+
+    config = {
+        "x_col": args.x_col,
+        "y_col": args.y_col[0] if len(args.y_col) == 1 else args.y_col,
+        "id_col": args.id_col,
+        "model": args.model,
+        "season_length": args.season_length,
+        "season_mstl": args.season_mstl,
+        "freq": args.freq,
+        "split_ratio": args.split_ratio,
+        "horizon": args.horizon,
+        "level": sorted(args.level),
+        "preprocess": {
+            "freq": args.resample,
+            "agg": args.agg,
+            "fill": args.fill,
+            "clip": args.clip,
+        },
+    }
+    summary = run_batch(
+        args.inputs, args.output, config, max_workers=args.workers, resume=not args.restart
+    )
+    print(json.dumps(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
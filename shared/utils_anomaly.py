@@ -0,0 +1,223 @@
+import streamlit as st
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from shared.utils_cache import cache_get, cache_put, make_fit_key
+from shared.utils_plot import interval_levels
+from shared.utils_preprocess import MAD_SCALE
+from shared.utils_profiling import timed
+
+
+# Training points outside the in-sample interval of this level are flagged
+ANOMALY_LEVEL = 99
+ANOMALY_THRESHOLD = 3.5
+ANOMALY_MIN_WINDOW = 25
+# Rolling windows whose median is taken at once, bounding the temporary memory
+ANOMALY_BLOCK = 1 << 16
+ANOMALY_TABLE_ROWS = 1000
+
+
+def series_bounds(data):
+    """Start and stop positions of every series; canonical frames keep them contiguous"""
+    codes = data["unique_id"].cat.codes.to_numpy()
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    return starts, np.r_[starts[1:], len(codes)]
+
+
+def rolling_robust_zscore(y, window):
+    """Robust z-score of every value against the median and MAD of its neighbours.
+
+    Windows are taken every window // 4 values from a strided view and each value
+    uses the window centred nearest to it, so the cost stays linear in len(y).
+    Returns the z-scores and the rolling medians.
+    """
+    n = len(y)
+    window = int(min(max(window, 1), n))
+    stride = max(window // 4, 1)
+    views = sliding_window_view(y, window)[::stride]
+    median_of = np.nanmedian if np.isnan(y).any() else np.median
+    medians = np.empty(len(views))
+    mads = np.empty(len(views))
+    for start in range(0, len(views), ANOMALY_BLOCK):
+        block = views[start : start + ANOMALY_BLOCK]
+        median = median_of(block, axis=1)
+        medians[start : start + len(block)] = median
+        mads[start : start + len(block)] = median_of(np.abs(block - median[:, None]), axis=1)
+    nearest = np.rint((np.arange(n) - window // 2) / stride).astype(np.int64)
+    nearest = np.clip(nearest, 0, len(views) - 1)
+    median, scale = medians[nearest], MAD_SCALE * mads[nearest]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(scale > 0, (y - median) / scale, 0.0)
+    return z, median
+
+
+def in_sample_bounds(sf, model_name, uids, starts, train_sizes, n, level=ANOMALY_LEVEL):
+    """Fitted values and interval bounds of the training rows from the fitted models.
+
+    Rows stay NaN where the model has no in-sample values, such as the machine
+    learning models, the first season of SeasonalNaive, or a model that has been
+    refit on more data since.
+    """
+    expected, lo, hi = np.full(n, np.nan), np.full(n, np.nan), np.full(n, np.nan)
+    names = [str(m) for m in getattr(sf, "models", [])]
+    if not hasattr(sf, "fitted_") or model_name not in names:
+        return expected, lo, hi
+    column = names.index(model_name)
+    position = {str(uid): i for i, uid in enumerate(sf.uids)}
+    for uid, start, size in zip(uids, starts, train_sizes):
+        row = position.get(str(uid))
+        if row is None:
+            continue
+        try:
+            values = sf.fitted_[row, column].predict_in_sample(level=[level])
+        except Exception:
+            continue
+        if len(values["fitted"]) != size:
+            continue
+        expected[start : start + size] = values["fitted"]
+        lo[start : start + size] = values[f"fitted-lo-{level}"]
+        hi[start : start + size] = values[f"fitted-hi-{level}"]
+    return expected, lo, hi
+
+
+@timed
+def detect_anomalies(sf, forecast_df, data, split_ratio, model_name, threshold, window):
+    """Flag the points of data that the fitted model did not expect.
+
+    Training points are flagged outside the in-sample interval, test points outside
+    the widest interval of the holdout forecast. Points without an interval fall
+    back to a rolling robust z-score above threshold. Returns only the flagged
+    points, with the expected value and the method that flagged them.
+    """
+    y = data["y"].to_numpy(dtype=np.float64)
+    n = len(y)
+    starts, stops = series_bounds(data)
+    lengths = stops - starts
+    # The same positions train_test_split cuts at
+    train_sizes = (lengths * (split_ratio / 100)).astype(int)
+    position = np.arange(n) - np.repeat(starts, lengths)
+    is_train = position < np.repeat(train_sizes, lengths)
+    uids = data["unique_id"].to_numpy()[starts]
+
+    expected, lo, hi = in_sample_bounds(sf, model_name, uids, starts, train_sizes, n)
+    levels = interval_levels(forecast_df, model_name) if forecast_df is not None else []
+    if levels:
+        if "unique_id" not in forecast_df.columns:
+            forecast_df = forecast_df.reset_index()
+        predicted = pd.DataFrame(
+            {
+                "unique_id": forecast_df["unique_id"].astype(str).to_numpy(),
+                "step": forecast_df.groupby("unique_id", sort=False, observed=True)
+                .cumcount()
+                .to_numpy(),
+                "expected": forecast_df[model_name].to_numpy(),
+                "lo": forecast_df[f"{model_name}-lo-{levels[0]}"].to_numpy(),
+                "hi": forecast_df[f"{model_name}-hi-{levels[0]}"].to_numpy(),
+            }
+        )
+        test_rows = np.flatnonzero(~is_train)
+        actual = pd.DataFrame(
+            {
+                "unique_id": data["unique_id"].to_numpy()[test_rows].astype(str),
+                "step": (position - np.repeat(train_sizes, lengths))[test_rows],
+                "row": test_rows,
+            }
+        )
+        aligned = actual.merge(predicted, on=["unique_id", "step"], how="inner")
+        rows = aligned["row"].to_numpy()
+        expected[rows] = aligned["expected"].to_numpy()
+        lo[rows] = aligned["lo"].to_numpy()
+        hi[rows] = aligned["hi"].to_numpy()
+
+    has_interval = np.isfinite(lo) & np.isfinite(hi)
+    outside = has_interval & ((y < lo) | (y > hi))
+    flagged = outside.copy()
+    z = np.zeros(n)
+    if not has_interval.all():
+        rolling_median = np.empty(n)
+        for start, stop in zip(starts, stops):
+            z[start:stop], rolling_median[start:stop] = rolling_robust_zscore(
+                y[start:stop], window
+            )
+        flagged |= ~has_interval & (np.abs(z) > threshold)
+        expected = np.where(has_interval, expected, rolling_median)
+
+    rows = np.flatnonzero(flagged)
+    return pd.DataFrame(
+        {
+            "unique_id": data["unique_id"].to_numpy()[rows],
+            "ds": data["ds"].to_numpy()[rows],
+            "y": y[rows],
+            "expected": expected[rows],
+            "method": np.where(outside[rows], "interval", "robust z-score"),
+            "set": np.where(is_train[rows], "train", "test"),
+        }
+    )
+
+
+def session_anomalies(last_fit, data, threshold, window):
+    """Anomalies of the session's last fit, kept in the session and the fit cache"""
+    fit_config, forecast_df = last_fit
+    memo = st.session_state.get("anomalies")
+    if memo is not None and memo["fit"] is forecast_df and memo["params"] == (threshold, window):
+        return memo["result"]
+    key = make_fit_key(
+        data,
+        fit_config["selected_model"],
+        freq=fit_config["freq"],
+        split_ratio=fit_config["split_ratio"],
+        level=tuple(fit_config["level"]),
+        conformal=fit_config["conformal"],
+        anomalies=(ANOMALY_LEVEL, threshold, window),
+    )
+    result = cache_get(key)
+    if result is None:
+        result = detect_anomalies(
+            st.session_state["fitted_model"],
+            forecast_df,
+            data,
+            fit_config["split_ratio"],
+            str(st.session_state["selected_model"]),
+            threshold,
+            window,
+        )
+        cache_put(key, result)
+    st.session_state["anomalies"] = {
+        "fit": forecast_df,
+        "params": (threshold, window),
+        "result": result,
+    }
+    return result
+
+
+def render_anomaly_sidebar(season_length):
+    st.sidebar.divider()
+    st.sidebar.header("Anomaly Detection")
+    if not st.sidebar.toggle(
+        "Flag anomalies",
+        help=f"Mark points outside the model's {ANOMALY_LEVEL}% in-sample interval "
+        "or the widest forecast interval. Points without an interval are judged by "
+        "a rolling robust z-score.",
+    ):
+        return None
+    threshold = st.sidebar.number_input(
+        "Robust z-score threshold", min_value=1.0, value=ANOMALY_THRESHOLD, step=0.5
+    )
+    window = st.sidebar.number_input(
+        "Rolling window",
+        min_value=3,
+        value=max(ANOMALY_MIN_WINDOW, 2 * int(season_length) + 1),
+        help="Points in the window the median and MAD of the z-score are taken over.",
+    )
+    return {"threshold": float(threshold), "window": int(window)}
+
+
+def render_anomaly_table(anomalies):
+    st.write(f"### Anomalies ({len(anomalies)} points)")
+    deviation = (anomalies["y"] - anomalies["expected"]).abs()
+    largest = anomalies.loc[deviation.sort_values(ascending=False).index[:ANOMALY_TABLE_ROWS]]
+    st.dataframe(largest, use_container_width=True)
+    if len(anomalies) > ANOMALY_TABLE_ROWS:
+        st.caption(f"The {ANOMALY_TABLE_ROWS} largest deviations are listed.")
@@ -0,0 +1,176 @@
+import streamlit as st
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+FIT_CACHE_MAX_ENTRIES = int(os.environ.get("FIT_CACHE_MAX_ENTRIES", "32"))
+FIT_CACHE_DIR = os.environ.get("FIT_CACHE_DIR", "")
+FIT_CACHE_MAX_MB = float(os.environ.get("FIT_CACHE_MAX_MB", "1024"))
+
+
+@st.cache_resource
+def get_fit_cache():
+    """Return the fit cache shared by all sessions of this server process"""
+    return {
+        "entries": OrderedDict(),
+        "hits": 0,
+        "misses": 0,
+        "lock": threading.Lock(),
+    }
+
+
+def hash_frame(df):
+    """Hash the content of a DataFrame, independent of its index"""
+    hashed = pd.util.hash_pandas_object(df, index=False).values
+    digest = hashlib.sha256(hashed.tobytes())
+    digest.update(",".join(map(str, df.columns)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _config_value(value):
+    """Turn a model attribute into a stable, hashable description"""
+    if isinstance(value, (list, tuple)):
+        return [_config_value(item) for item in value]
+    if isinstance(value, dict):
+        return {str(k): _config_value(v) for k, v in sorted(value.items())}
+    if hasattr(value, "__dict__"):
+        return model_config(value)
+    return repr(value)
+
+
+def model_config(model):
+    """Describe a model by its class name and its full set of parameters"""
+    params = {
+        key: _config_value(value)
+        for key, value in sorted(vars(model).items())
+        # Fitted state, such as StatsForecast's model_ or a regressor_, is not configuration
+        if not key.startswith("_") and not key.endswith("_")
+    }
+    return {"class": type(model).__name__, "params": params}
+
+
+def make_fit_key(training_data, model, **config):
+    """Build the cache key from the training frame and the model configuration"""
+    models = model if isinstance(model, (list, tuple)) else [model]
+    digest = hashlib.sha256(hash_frame(training_data).encode("utf-8"))
+    digest.update(repr([model_config(m) for m in models]).encode("utf-8"))
+    digest.update(repr(sorted(config.items())).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _cache_path(key):
+    return os.path.join(FIT_CACHE_DIR, f"{key}.pkl")
+
+
+def _touch(path):
+    """Refresh the modification time, which doubles as the LRU timestamp on disk"""
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def cache_get(key):
+    """Look up a fit result in memory first, then on disk if persistence is enabled"""
+    cache = get_fit_cache()
+    with cache["lock"]:
+        value = cache["entries"].get(key)
+        if value is not None:
+            cache["entries"].move_to_end(key)
+            cache["hits"] += 1
+    if value is not None:
+        if FIT_CACHE_DIR:
+            _touch(_cache_path(key))
+        return value
+
+    value = None
+    if FIT_CACHE_DIR and os.path.exists(_cache_path(key)):
+        try:
+            with open(_cache_path(key), "rb") as f:
+                value = pickle.load(f)
+            _touch(_cache_path(key))
+        except Exception:
+            value = None
+
+    with cache["lock"]:
+        if value is None:
+            cache["misses"] += 1
+            return None
+        cache["hits"] += 1
+    _store(key, value)
+    return value
+
+
+def cache_put(key, value):
+    """Store a fit result and persist it to disk if a cache directory is set"""
+    _store(key, value)
+    if FIT_CACHE_DIR:
+        os.makedirs(FIT_CACHE_DIR, exist_ok=True)
+        tmp_path = _cache_path(key) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, _cache_path(key))
+        evict_disk_cache(keep=key)
+
+
+def evict_disk_cache(keep=None):
+    """Drop the least recently used fits on disk beyond FIT_CACHE_MAX_MB"""
+    entries = []
+    for name in os.listdir(FIT_CACHE_DIR):
+        if not name.endswith(".pkl"):
+            continue
+        path = os.path.join(FIT_CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, name[: -len(".pkl")], path))
+
+    max_bytes = FIT_CACHE_MAX_MB * 1024 * 1024
+    entries.sort()
+    total = sum(size for _, size, _, _ in entries)
+    for _, size, key, path in entries:
+        if total <= max_bytes:
+            break
+        if key == keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def _store(key, value):
+    cache = get_fit_cache()
+    with cache["lock"]:
+        cache["entries"][key] = value
+        cache["entries"].move_to_end(key)
+        while len(cache["entries"]) > FIT_CACHE_MAX_ENTRIES:
+            cache["entries"].popitem(last=False)
+
+
+def cache_stats():
+    """Return the hit/miss counters and the current number of cached fits"""
+    cache = get_fit_cache()
+    with cache["lock"]:
+        return {
+            "hits": cache["hits"],
+            "misses": cache["misses"],
+            "entries": len(cache["entries"]),
+        }
+
+
+def render_cache_sidebar():
+    stats = cache_stats()
+    st.sidebar.divider()
+    st.sidebar.header("Fit Cache")
+    st.sidebar.write(
+        f"**Hits:** {stats['hits']} | **Misses:** {stats['misses']} | "
+        f"**Entries:** {stats['entries']}/{FIT_CACHE_MAX_ENTRIES}"
+    )
@@ -0,0 +1,117 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import USFederalHolidayCalendar
+
+from shared.utils_preprocess import preprocess_series, resample
+from shared.utils_store import read_columns
+from shared.utils_upload import load_canonical_series
+
+
+CALENDAR_FEATURES = {
+    "Hour": "hour",
+    "Day of Week": "dayofweek",
+    "Month": "month",
+    "Holiday": "holiday",
+}
+
+
+def exog_columns(data):
+    """Regressor columns of a long frame, everything besides unique_id, ds and y"""
+    return [col for col in data.columns if col not in ("unique_id", "ds", "y")]
+
+
+def exog_frame(data):
+    """The unique_id, ds and regressor columns StatsForecast expects as X_df, or None"""
+    columns = exog_columns(data)
+    if not columns:
+        return None
+    return data[["unique_id", "ds"] + columns]
+
+
+def calendar_features(ds, features):
+    """Calendar regressors computed from the timestamps in one vectorized pass.
+
+    ``holiday`` flags US federal holidays, from the calendar that ships with pandas.
+    """
+    ds = pd.DatetimeIndex(ds)
+    columns = {}
+    for feature in features:
+        if feature == "holiday":
+            if len(ds):
+                holidays = USFederalHolidayCalendar().holidays(ds.min(), ds.max())
+                values = ds.normalize().isin(holidays)
+            else:
+                values = np.zeros(0, dtype=bool)
+        else:
+            values = getattr(ds, feature)
+        columns[feature] = np.asarray(values, dtype=np.float32)
+    return pd.DataFrame(columns)
+
+
+def add_calendar_features(data, features):
+    if not features or not pd.api.types.is_datetime64_any_dtype(data["ds"]):
+        return data
+    return data.assign(**calendar_features(data["ds"], features).set_index(data.index))
+
+
+def split_future_rows(data):
+    """Separate the rows after the last observed value of each series.
+
+    Uploads may carry known future values of the regressors on rows without a
+    target; those rows are not part of the fit but feed the forecast horizon.
+    """
+    observed = data["y"].notna()
+    codes = data["unique_id"].cat.codes.to_numpy()
+    # Number of observed values at or after every row, within its series
+    later = observed.iloc[::-1].groupby(codes[::-1], sort=False).cumsum().iloc[::-1]
+    future = (later == 0).to_numpy()
+    if not future.any():
+        return data, data.iloc[:0]
+    return data[~future], data[future]
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def load_feature_series(dataset_id, x_col, y_col, id_col, preprocess, exog):
+    """History and future regressor rows with calendar features, built once per
+    dataset, column selection, pre-processing and regressor configuration.
+
+    Callers must treat the returned frames as read-only.
+    """
+    columns = tuple(exog["columns"])
+    data = load_canonical_series(dataset_id, x_col, y_col, id_col, columns)
+    history, future = split_future_rows(data)
+    if preprocess:
+        history = preprocess_series(history, **preprocess)
+        if preprocess["freq"] and len(future):
+            future = resample(future, preprocess["freq"], preprocess["agg"])
+    history = add_calendar_features(history, exog["calendar"])
+    # A constant feature, such as the hour of daily data, makes the regression singular
+    constant = [
+        col for col in exog["calendar"] if col in history and history[col].nunique() <= 1
+    ]
+    return history.drop(columns=constant), future
+
+
+def render_exog_sidebar(dataset_id, used_columns):
+    """Return the regressor configuration, or None if no regressors are selected"""
+    st.sidebar.header("Exogenous Regressors")
+    candidates = [col for col in read_columns(dataset_id) if col not in used_columns]
+    columns = st.sidebar.multiselect(
+        "Regressor columns",
+        candidates,
+        help="Other columns of the data, such as temperature, used to explain the "
+        "target. Rows after the last target value provide their future values; "
+        "otherwise the last value is carried forward.",
+    )
+    calendar = st.sidebar.multiselect(
+        "Calendar features",
+        list(CALENDAR_FEATURES),
+        help="Derived from the timestamps, also for the forecast horizon.",
+    )
+    if columns or calendar:
+        st.sidebar.caption("Used by AutoARIMA; the other models ignore regressors.")
+    st.sidebar.divider()
+    if not (columns or calendar):
+        return None
+    return {"columns": columns, "calendar": [CALENDAR_FEATURES[c] for c in calendar]}
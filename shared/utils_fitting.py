@@ -1,36 +1,215 @@
 import streamlit as st
+import copy
 import csv
-import plotly.express as px
+import os
+import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
-
-from statsforecast import StatsForecast
-from statsforecast.models import (
-    AutoARIMA,
-    SeasonalNaive,
-    HoltWinters,
-    HistoricAverage,
-    MSTL,
-)
-
-from sklearn.metrics import (
-    mean_absolute_error,
-    r2_score,
-    mean_absolute_percentage_error,
+from pandas.tseries.frequencies import to_offset
+
+from shared.utils_cache import cache_get, cache_put, hash_frame, make_fit_key
+from shared.utils_plot import PLOT_POINTS, add_interval_bands, downsample_trace
+from shared.utils_exog import exog_frame, load_feature_series
+from shared.utils_ml import (
+    ML_MAX_TRAIN_ROWS,
+    ML_MODELS,
+    LagForecaster,
+    MLModel,
+    is_ml_model,
 )
+from shared.utils_preprocess import load_preprocessed_series
+from shared.utils_profiling import timed
+from shared.utils_registry import data_fingerprint, register_model
+from shared.utils_seasonality import detect_periods
+from shared.utils_upload import cached_validation, load_canonical_series
 
 ####### PAGE 2: Model Fitting #######
 
 
-def load_data_from_session():
-    """Load all data from session state"""
+# A detected period within this share of a calendar season is taken as that season
+SEASON_TOLERANCE = 0.02
+# Processes StatsForecast fans out to; pool workers set it to 1 via single_process_fits
+FIT_N_JOBS = -1
+
+
+def session_columns():
+    """Dataset id and column selection of the data in the session"""
     return (
+        st.session_state["dataset_id"],
         st.session_state["x_axis"],
-        st.session_state["y_axis"],
-        st.session_state["transformed_data"],
+        st.session_state.get("y_columns") or st.session_state["y_axis"],
+        st.session_state.get("id_axis"),
     )
 
 
-def render_initial_sidebar():
+@timed
+def load_data_from_session(preprocess=None, exog=None):
+    """Load all data from session state, pre-processed and with regressors if
+    configurations are given"""
+    x_axis = st.session_state["x_axis"]
+    y_axis = st.session_state["y_axis"]
+    try:
+        if exog:
+            data = load_feature_series(*session_columns(), preprocess, exog)[0]
+            return x_axis, y_axis, data
+        if preprocess:
+            data = load_preprocessed_series(*session_columns(), preprocess)
+            return x_axis, y_axis, data
+    except ValueError as e:
+        st.sidebar.warning(f"Pre-processing skipped: {e}")
+        if exog:
+            data = load_feature_series(*session_columns(), None, exog)[0]
+            return x_axis, y_axis, data
+    data = load_canonical_series(*session_columns())
+    return x_axis, y_axis, data
+
+
+def load_future_rows_from_session(preprocess=None, exog=None):
+    """Rows after the last target value, which carry future regressor values"""
+    if not exog:
+        return None
+    try:
+        return load_feature_series(*session_columns(), preprocess, exog)[1]
+    except ValueError:
+        return load_feature_series(*session_columns(), None, exog)[1]
+
+
+def render_data_checks(data, preprocess=None, exog=None):
+    """Show the detected frequency and warn about duplicate or missing timestamps"""
+    report = cached_validation(*session_columns(), data, preprocess, exog)
+    if report["freq"]:
+        st.sidebar.caption(f"Detected frequency: {report['freq']}")
+    elif report["irregular"]:
+        st.sidebar.caption("Detected frequency: irregular")
+    if report["duplicates"]:
+        st.warning(
+            f"The data has {report['duplicates']} duplicate timestamps. "
+            "Models expect one value per timestamp and series."
+        )
+    if report["irregular"]:
+        st.warning(
+            "The timestamps are irregular. Resample them to a regular frequency "
+            "under Pre-processing before fitting."
+        )
+    elif report["missing"]:
+        st.warning(
+            f"The data is missing {report['missing']} timestamps in {report['gaps']} gaps."
+        )
+    return report
+
+
+def first_series(data):
+    """Values of the first series; the canonical frame keeps every series contiguous"""
+    codes = data["unique_id"].cat.codes.to_numpy()
+    other = np.flatnonzero(codes != codes[0])
+    return data["y"].to_numpy()[: other[0] if len(other) else len(codes)]
+
+
+def default_season_length(step):
+    """Season length implied by the sampling step (in nanoseconds) when the data
+    shows no clear periodicity: a day of sub-daily data, a week of days, and so on"""
+    day = 86_400 * 10**9
+    if not step:
+        return 1
+    if step < day:
+        return int(day // step) if day % step == 0 else 1
+    days = step / day
+    for length, season in ((1, 7), (7, 52), (31, 12), (92, 4)):
+        if days <= length:
+            return season
+    return 1
+
+
+def calendar_seasons(step):
+    """Season lengths the calendar allows for a sampling step in nanoseconds: the
+    hours, days and weeks of sub-daily data, the weeks and years of daily data, ..."""
+    day = 86_400 * 10**9
+    if not step:
+        return []
+    if step < day:
+        spans = (3_600 * 10**9, day, 7 * day)
+        return [span // step for span in spans if span % step == 0 and span // step >= 2]
+    days = step / day
+    for length, seasons in ((1, [7, 365]), (7, [52]), (31, [12]), (92, [4])):
+        if days <= length:
+            return seasons
+    return []
+
+
+def match_season(period, seasons):
+    """The calendar season within SEASON_TOLERANCE of a detected period, or None"""
+    for season in seasons:
+        if abs(period - season) <= max(1, SEASON_TOLERANCE * season):
+            return season
+    return None
+
+
+def infer_settings(data, report):
+    """Derive the model frequency and candidate season lengths from the data.
+
+    The frequency comes from the validation ``report``, the season lengths from
+    the periodogram and ACF of the first series. For timestamps, a detected period
+    only counts when it matches a season of the calendar at that frequency, such
+    as 24 or 168 for hourly data. Periods that do not repeat at least twice in the
+    shortest series are dropped.
+    """
+    min_length = int(data.groupby("unique_id", sort=False, observed=True).size().min())
+    periods = detect_periods(first_series(data))
+    if pd.api.types.is_datetime64_any_dtype(data["ds"]):
+        seasons = calendar_seasons(report["step"])
+        periods = [match_season(p, seasons) for p in periods]
+        periods = [p for p in dict.fromkeys(periods) if p is not None]
+    periods = [p for p in periods if 2 * p <= min_length]
+    if not periods:
+        fallback = default_season_length(report["step"])
+        periods = [fallback] if 2 * fallback <= min_length else [1]
+    return {"freq": report["freq"], "season_lengths": periods}
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def cached_settings(dataset_id, x_col, y_col, id_col, _data, preprocess=None, exog=None):
+    """Memoize the inferred settings per dataset, column selection, pre-processing
+    and regressors"""
+    report = cached_validation(dataset_id, x_col, y_col, id_col, _data, preprocess, exog)
+    return infer_settings(_data, report)
+
+
+def infer_session_settings(data, preprocess=None, exog=None):
+    return cached_settings(*session_columns(), data, preprocess, exog)
+
+
+def series_ids(data):
+    """Return the unique series identifiers in order of appearance"""
+    return list(pd.unique(data["unique_id"]))
+
+
+def select_series(data, unique_id):
+    """Restrict a long frame to one series, leaving single-series frames untouched"""
+    if data is None or unique_id is None:
+        return data
+    if "unique_id" not in data.columns:
+        data = data.reset_index()
+    return data[data["unique_id"].astype(str) == str(unique_id)]
+
+
+def frequency_options(inferred_freq=None):
+    """The selectable frequencies and the index of the one matching the data.
+
+    A detected frequency outside the fixed list is offered as its own option.
+    """
+    options = return_frequency()
+    if inferred_freq is None:
+        return options, 0
+    for index, alias in enumerate(options.values()):
+        if to_offset(alias) == to_offset(inferred_freq):
+            return options, index
+    return {f"Detected ({inferred_freq})": inferred_freq, **options}, 0
+
+
+def render_initial_sidebar(settings=None):
+    """Model sidebar, pre-filled with the frequency and season lengths inferred
+    from the data when ``settings`` are given"""
+    settings = settings or {"freq": None, "season_lengths": [1]}
     st.sidebar.header("Train-Test Split")
     split_ratio = st.sidebar.slider(
         "Select Train-Test Split Ratio (%)",
@@ -49,7 +228,7 @@ def render_initial_sidebar():
         model_list = return_imported_stat_models()
         model = st.sidebar.selectbox(
             "Select Model",
-            [model for model in model_list],
+            [model for model in model_list] + [ALL_MODELS],
             help="""
         - **AutoARIMA**: Automatically selects the best ARIMA model for your data.  
           **Pros**: No manual tuning, handles trends and seasonality, adaptable to various datasets.  
@@ -61,61 +240,115 @@ def render_initial_sidebar():
           **Pros**: Extremely simple, efficient, and suitable for stationary data.  
         - **MSTL**: Decomposes data into multiple seasonal components, trend, and residuals.  
           **Pros**: Ideal for complex seasonality, flexible, and interpretable.
+        - **All Models**: Fits every model above in one pass and ranks them.
         """,
         )
-
-        freq = return_frequency()
-        frequency = st.sidebar.selectbox(
-            "Select Frequency",
-            [freq for freq in freq.keys()],
-            help="Select the frequency of the underlying data",
+    else:
+        model = st.sidebar.selectbox(
+            "Select Model",
+            ML_MODELS,
+            help="""
+        - **GradientBoosting**: Histogram gradient boosted trees on lag, rolling-mean and calendar features.  
+          **Pros**: Captures non-linear patterns and regressor effects, fits long series in seconds.  
+        - **Ridge**: Regularized linear regression on the same features.  
+          **Pros**: Very fast, extrapolates trends, easy to interpret.
+        """,
         )
-        selected_freq = freq.get(frequency)
 
-        season_length = st.sidebar.number_input(
-            "Season Length",
-            min_value=1,
+    freq, freq_index = frequency_options(settings["freq"])
+    frequency = st.sidebar.selectbox(
+        "Select Frequency",
+        [freq for freq in freq.keys()],
+        index=freq_index,
+        help="Select the frequency of the underlying data",
+    )
+    selected_freq = freq.get(frequency)
+
+    season_lengths = settings["season_lengths"]
+    season_length = st.sidebar.number_input(
+        "Season Length",
+        min_value=1,
+        value=season_lengths[0],
+        placeholder="Type a number...",
+        help="How many periods are in a season? Machine learning models use it "
+        f"for their lags and rolling windows. Detected: {', '.join(map(str, season_lengths))}",
+    )
+
+    season_mstl = 0
+
+    if model in ("MSTL", ALL_MODELS):
+        season_mstl = st.sidebar.number_input(
+            "Second Season Length",
+            min_value=0,
+            value=season_lengths[1] if len(season_lengths) > 1 else 0,
             placeholder="Type a number...",
             help="How many periods are in a season?",
         )
-
-        season_mstl = 0
-
-        if model == "MSTL":
-            season_mstl = st.sidebar.number_input(
-                "Second Season Length",
-                min_value=0,
-                placeholder="Type a number...",
-                help="How many periods are in a season?",
-            )
-        return split_ratio, model, selected_freq, season_length, season_mstl
-    else:
-        st.sidebar.write("Currently not implemented - Coming soon")
-        return None, None, None, None, None
+    return split_ratio, model, selected_freq, season_length, season_mstl
 
 
+@timed
 def train_test_split(data, split_ratio):
-    """Split data into train and test sets"""
-    train_size = int(len(data) * (split_ratio / 100))
-    train_data = data.iloc[:train_size]
-    test_data = data.iloc[train_size:]
-
-    return train_data, test_data
+    """Split data into train and test sets, per series if there are several.
+
+    A single series is split into two views of data without copying.
+    """
+    if data["unique_id"].nunique() <= 1:
+        train_size = int(len(data) * (split_ratio / 100))
+        train_data = data.iloc[:train_size]
+        test_data = data.iloc[train_size:]
+        return train_data, test_data
+
+    grouped = data.groupby("unique_id", sort=False, observed=True)
+    position = grouped.cumcount().to_numpy()
+    train_sizes = (grouped["y"].transform("size").to_numpy() * (split_ratio / 100)).astype(int)
+    is_train = position < train_sizes
+    return data[is_train], data[~is_train]
+
+
+ALL_MODELS = "All Models"
+FIT_COST_WARN_SECONDS = float(os.environ.get("FIT_COST_WARN_SECONDS", "30"))
+# Seconds per training point and exponent of the season length, measured on one core
+FIT_COST_PER_POINT = {
+    "AutoARIMA": (2.5e-3, 0.75),
+    "SeasonalNaive": (1e-6, 0),
+    "HoltWinters": (3.5e-4, 0),
+    "HistoricAverage": (1e-6, 0),
+    "MSTL": (2e-4, 0),
+    "GradientBoosting": (2e-5, 0),
+    "Ridge": (1e-6, 0),
+}
+INTERVAL_LEVELS = [50, 80, 90, 95, 99]
+CONFORMAL_WINDOWS = 2
 
 
 def return_imported_stat_models():
     return ["AutoARIMA", "SeasonalNaive", "HoltWinters", "HistoricAverage", "MSTL"]
 
 
-def get_model(selected_model, season_length, season_mstl=None):
-    """Retrieve the model based on the selected type and season length."""
+def get_model(selected_model, season_length, season_mstl=None, arima_limits=None):
+    """Retrieve the model based on the selected type and season length.
+
+    ``arima_limits`` caps the orders AutoARIMA searches, such as ``max_p``.
+    """
+    if selected_model in ML_MODELS:
+        return MLModel(selected_model, season_length)
+    # statsforecast is imported on first use so pages that never fit load faster
+    from statsforecast.models import (
+        AutoARIMA,
+        SeasonalNaive,
+        HoltWinters,
+        HistoricAverage,
+        MSTL,
+    )
+
     if selected_model == "MSTL":
         if season_mstl is None or season_mstl <= 1:
             return MSTL(season_length=[int(season_length)])
         else:
             return MSTL(season_length=[int(season_length), int(season_mstl)])
     model_map = {
-        "AutoARIMA": AutoARIMA(season_length=int(season_length)),
+        "AutoARIMA": AutoARIMA(season_length=int(season_length), **(arima_limits or {})),
         "HoltWinters": HoltWinters(season_length=int(season_length)),
         "SeasonalNaive": SeasonalNaive(season_length=int(season_length)),
         "HistoricAverage": HistoricAverage(),
@@ -123,17 +356,136 @@ def get_model(selected_model, season_length, season_mstl=None):
     return model_map.get(selected_model)
 
 
-def fit_model(model, training_data, testing_data, freq, freq_mstl=None):
-    """Fit the model to training data and validate it against testing data"""
-    if model == "MSTL":
-        sf = StatsForecast(models=[model], freq=[freq, freq_mstl], n_jobs=-1)
+def get_models(season_length, season_mstl=None):
+    """Retrieve every statistical model so they can be fitted in one pass."""
+    return [
+        get_model(name, season_length, season_mstl)
+        for name in return_imported_stat_models()
+    ]
+
+
+def estimate_fit_seconds(model, series_lengths, season_length, season_mstl=0):
+    """Rough fit time from the training length of every series and the season length.
+
+    Each model's cost grows linearly with the series length; AutoARIMA's also with
+    the season length to the power 0.75. Series are fitted on all CPUs in parallel.
+    """
+    names = return_imported_stat_models() if model == ALL_MODELS else [model]
+    lengths = np.asarray(series_lengths, dtype=np.float64)
+    seconds = 0.0
+    for name in names:
+        per_point, season_exponent = FIT_COST_PER_POINT[name]
+        seasons = max(season_length, season_mstl if name == "MSTL" else 0, 1)
+        # Machine learning models train on at most ML_MAX_TRAIN_ROWS rows
+        points = min(lengths.sum(), ML_MAX_TRAIN_ROWS) if name in ML_MODELS else lengths.sum()
+        seconds += per_point * seasons**season_exponent * points
+    return seconds / min(len(lengths), os.cpu_count() or 1)
+
+
+def render_fit_warnings(model, train_data, season_length, season_mstl=0):
+    """Warn before fits that are expected to be slow or that cannot work"""
+    if model is None:
+        return
+    lengths = train_data.groupby("unique_id", sort=False, observed=True).size().to_numpy()
+    if 2 * max(season_length, season_mstl or 0) > lengths.min():
+        st.sidebar.warning(
+            "The season length is more than half of the shortest training series; "
+            "seasonal models need at least two full seasons."
+        )
+    seconds = estimate_fit_seconds(model, lengths, season_length, season_mstl or 0)
+    if seconds > FIT_COST_WARN_SECONDS:
+        st.sidebar.warning(
+            f"This fit is expected to take about {seconds:.0f}s. Consider a shorter "
+            "season length, a simpler model or fitting in the background."
+        )
+
+
+def render_interval_sidebar(selected_model=None):
+    st.sidebar.divider()
+    st.sidebar.header("Prediction Intervals")
+    level = st.sidebar.multiselect(
+        "Levels (%)",
+        INTERVAL_LEVELS,
+        default=[80, 95],
+        help="All levels are computed from the same fit.",
+    )
+    is_ml = selected_model in ML_MODELS
+    conformal = st.sidebar.toggle(
+        "Conformal intervals",
+        disabled=is_ml,
+        help="Machine learning models take their intervals from the in-sample errors."
+        if is_ml
+        else "Calibrate the intervals on the errors of rolling holdout windows "
+        "instead of the model's own error distribution.",
+    )
+    return {"level": sorted(level), "conformal": conformal and not is_ml}
+
+
+def conformal_intervals(forecast_horizon):
+    """Conformal calibration over CONFORMAL_WINDOWS holdout windows of the horizon"""
+    from statsforecast.utils import ConformalIntervals
+
+    return ConformalIntervals(h=forecast_horizon, n_windows=CONFORMAL_WINDOWS)
+
+
+def fit_cache_key(
+    model, training_data, testing_data, freq, freq_mstl=None, level=None, conformal=False
+):
+    """Return the fit cache key and the forecast horizon for a fit request"""
+    forecast_horizon = int(testing_data.groupby("unique_id", sort=False, observed=True).size().max())
+    X_df = exog_frame(testing_data)
+    key = make_fit_key(
+        training_data,
+        model,
+        freq=freq,
+        freq_mstl=freq_mstl,
+        h=forecast_horizon,
+        level=tuple(level or ()),
+        conformal=bool(conformal and level),
+        **({"exog": hash_frame(X_df)} if X_df is not None else {}),
+    )
+    return key, forecast_horizon
+
+
+def single_process_fits():
+    """Process pool initializer: fit in the worker itself, so a pool of N workers
+    runs N fitting processes rather than N times the number of cores"""
+    global FIT_N_JOBS
+    FIT_N_JOBS = 1
+
+
+def run_fit(
+    model,
+    training_data,
+    forecast_horizon,
+    freq,
+    freq_mstl=None,
+    level=None,
+    conformal=False,
+    X_df=None,
+):
+    """Fit the model and forecast the horizon, without touching the cache.
+
+    Every interval level comes out of the same fit and predict call. Regressor
+    columns of training_data are used by the models that support them, with their
+    values over the horizon taken from ``X_df``.
+    """
+    from statsforecast import StatsForecast
+
+    models = list(model) if isinstance(model, (list, tuple)) else [model]
+    if is_ml_model(models):
+        sf = LagForecaster(models=models, freq=freq)
+    elif model == "MSTL":
+        sf = StatsForecast(models=models, freq=[freq, freq_mstl], n_jobs=FIT_N_JOBS)
     else:
-        sf = StatsForecast(models=[model], freq=freq, n_jobs=-1)
-    sf.fit(df=training_data)
+        sf = StatsForecast(models=models, freq=freq, n_jobs=FIT_N_JOBS)
+    prediction_intervals = None
+    if conformal and level:
+        prediction_intervals = conformal_intervals(forecast_horizon)
+    sf.fit(df=training_data, prediction_intervals=prediction_intervals)
 
-    # Prepare a DataFrame for forecasting
-    forecast_horizon = len(testing_data)
-    forecast_df = sf.forecast(h=forecast_horizon, df=training_data)
+    # Predict from the fitted models instead of fitting a second time
+    forecast_df = sf.predict(h=forecast_horizon, level=level or None, X_df=X_df)
 
     # Ensure column names align for consistency
     forecast_df = forecast_df.rename(columns={"y_hat": "y"})
@@ -142,43 +494,377 @@ def fit_model(model, training_data, testing_data, freq, freq_mstl=None):
     return forecast_df, sf
 
 
+@timed
+def fit_model(
+    model, training_data, testing_data, freq, freq_mstl=None, level=None, conformal=False
+):
+    """Fit the model to training data and validate it against testing data"""
+    key, forecast_horizon = fit_cache_key(
+        model, training_data, testing_data, freq, freq_mstl, level, conformal
+    )
+    cached = cache_get(key)
+    if cached is None:
+        cached = run_fit(
+            model,
+            training_data,
+            forecast_horizon,
+            freq,
+            freq_mstl,
+            level,
+            conformal,
+            exog_frame(testing_data),
+        )
+        cache_put(key, cached)
+
+    # Hand out copies so later refits on the Forecasting page don't touch the cache
+    forecast_df, sf = cached
+    return forecast_df.copy(), copy.deepcopy(sf)
+
+
+def make_fit_config(
+    model,
+    season_length,
+    season_mstl,
+    freq,
+    split_ratio,
+    level=None,
+    conformal=False,
+    preprocess=None,
+    exog=None,
+    arima_limits=None,
+):
+    """Collect everything needed to fit, and later to describe, a model"""
+    if model == ALL_MODELS:
+        selected_model = get_models(season_length, season_mstl)
+        plotted_model = [str(m) for m in selected_model]
+    else:
+        selected_model = get_model(model, season_length, season_mstl, arima_limits)
+        plotted_model = model
+    return {
+        "model": model,
+        "selected_model": selected_model,
+        "plotted_model": plotted_model,
+        "freq": freq,
+        "season_length": season_length,
+        "season_mstl": season_mstl,
+        "split_ratio": split_ratio,
+        "level": list(level or []),
+        "conformal": bool(conformal and level),
+        "preprocess": preprocess,
+        "exog": exog,
+        "arima_limits": arima_limits,
+    }
+
+
+def apply_fit_result(fit_config, forecast, sf, data, fit_seconds=None):
+    """Evaluate a finished fit, store it in the session for the Forecasting page
+    and register it so it can be reloaded after a refresh or restart"""
+    train_data, test_data = train_test_split(data, fit_config["split_ratio"])
+    model = fit_config["model"]
+    selected_model = fit_config["selected_model"]
+    if model == ALL_MODELS:
+        leaderboard = rank_models(forecast, test_data, fit_config["plotted_model"])
+        st.session_state["leaderboard"] = leaderboard
+        # The best model carries the metrics and is used on the Forecasting page
+        model = leaderboard.iloc[0]["Model"]
+        selected_model = selected_model[fit_config["plotted_model"].index(model)]
+    else:
+        st.session_state.pop("leaderboard", None)
+    mae, r2, mape = evaluate_performance(forecast, test_data, model)
+    if data["unique_id"].nunique() > 1:
+        st.session_state["series_metrics"] = evaluate_performance_by_series(
+            forecast, test_data, model
+        )
+    else:
+        st.session_state.pop("series_metrics", None)
+    if fit_config["level"]:
+        st.session_state["interval_metrics"] = evaluate_intervals(
+            forecast, test_data, model, fit_config["level"]
+        )
+    else:
+        st.session_state.pop("interval_metrics", None)
+
+    st.session_state["fitted_model"] = sf
+    st.session_state.pop("last_forecast", None)
+    st.session_state.pop("last_update_report", None)
+    st.session_state["selected_model"] = selected_model
+    st.session_state["freq"] = fit_config["freq"]
+    st.session_state["season_length"] = fit_config["season_length"]
+    st.session_state["season_mstl"] = fit_config["season_mstl"]
+    st.session_state["split_ratio"] = fit_config["split_ratio"]
+    st.session_state["level"] = fit_config["level"]
+    st.session_state["conformal"] = fit_config["conformal"]
+    st.session_state["preprocess"] = fit_config.get("preprocess")
+    st.session_state["exog"] = fit_config.get("exog")
+    st.session_state["fitted_until"] = train_data["ds"].max()
+    evaluation = {"mae": mae, "r2": r2, "mape": mape}
+    try:
+        st.session_state["model_id"] = register_fit(
+            fit_config, sf, model, evaluation, train_data["ds"].max(), fit_seconds
+        )
+    except Exception as e:
+        st.sidebar.warning(f"The fit could not be saved to the model registry: {e}")
+    return evaluation
+
+
+def register_fit(fit_config, sf, model_name, metrics, fitted_until, fit_seconds=None):
+    """Save the fitted model with its configuration, data description and metrics"""
+    data = {
+        key: st.session_state.get(key)
+        for key in ("dataset_id", "filename", "x_axis", "y_axis", "id_axis", "y_columns")
+    }
+    entry = {
+        "name": str(model_name),
+        "fingerprint": data_fingerprint(
+            data["dataset_id"],
+            data["x_axis"],
+            data["y_columns"] or data["y_axis"],
+            data["id_axis"],
+        ),
+        "config": {
+            key: fit_config[key]
+            for key in (
+                "model",
+                "freq",
+                "season_length",
+                "season_mstl",
+                "split_ratio",
+                "level",
+                "conformal",
+                "preprocess",
+                "exog",
+                "arima_limits",
+            )
+        },
+        "data": data,
+        "metrics": metrics,
+        "fit_seconds": fit_seconds,
+        "fitted_until": str(fitted_until),
+    }
+    return register_model(sf, entry)
+
+
+def align_forecast(forecast_df, testing_data, model, columns=()):
+    """Pair every test value with the forecast made for the same series and step.
+
+    Extra forecast ``columns``, such as interval bounds, are carried along.
+    """
+    if "unique_id" not in forecast_df.columns:
+        forecast_df = forecast_df.reset_index()
+    predicted = pd.DataFrame(
+        {
+            "unique_id": forecast_df["unique_id"].astype(str).to_numpy(),
+            "step": forecast_df.groupby("unique_id", sort=False, observed=True).cumcount().to_numpy(),
+            "y_hat": forecast_df[model].to_numpy(),
+            **{column: forecast_df[column].to_numpy() for column in columns},
+        }
+    )
+    actual = pd.DataFrame(
+        {
+            "unique_id": testing_data["unique_id"].astype(str).to_numpy(),
+            "step": testing_data.groupby("unique_id", sort=False, observed=True).cumcount().to_numpy(),
+            "y": testing_data["y"].to_numpy(),
+        }
+    )
+    return actual.merge(predicted, on=["unique_id", "step"], how="inner")
+
+
+@timed
 def evaluate_performance(forecast_df, testing_data, model):
     """Evaluate the model using the forecasted data"""
-    mae = round(mean_absolute_error(testing_data["y"], forecast_df[model]), 2)
-    r2 = round(r2_score(testing_data["y"], forecast_df[model]), 2)
-    mape = round(
-        mean_absolute_percentage_error(testing_data["y"], forecast_df[model]), 2
+    from sklearn.metrics import (
+        mean_absolute_error,
+        r2_score,
+        mean_absolute_percentage_error,
     )
 
+    aligned = align_forecast(forecast_df, testing_data, model)
+    mae = round(mean_absolute_error(aligned["y"], aligned["y_hat"]), 2)
+    r2 = round(r2_score(aligned["y"], aligned["y_hat"]), 2)
+    mape = round(mean_absolute_percentage_error(aligned["y"], aligned["y_hat"]), 2)
+
     return mae, r2, mape
 
 
+@timed
+def evaluate_performance_by_series(forecast_df, testing_data, model):
+    """Compute MAE, R² and MAPE for every series in one vectorized groupby pass"""
+    aligned = align_forecast(forecast_df, testing_data, model)
+    y = aligned["y"].to_numpy(dtype=np.float64)
+    error = aligned["y_hat"].to_numpy(dtype=np.float64) - y
+    grouped_y = aligned.groupby("unique_id", sort=False, observed=True)["y"]
+    centered = y - grouped_y.transform("mean").to_numpy(dtype=np.float64)
+    parts = pd.DataFrame(
+        {
+            "unique_id": aligned["unique_id"],
+            "abs_error": np.abs(error),
+            "squared_error": error**2,
+            "squared_total": centered**2,
+            "pct_error": np.abs(error) / np.maximum(np.abs(y), np.finfo(np.float64).eps),
+        }
+    ).groupby("unique_id", sort=False, observed=True)
+    sums = parts.sum()
+    means = parts.mean()
+    metrics = pd.DataFrame(
+        {
+            "MAE": means["abs_error"],
+            "R²": 1 - sums["squared_error"] / sums["squared_total"].replace(0, np.nan),
+            "MAPE": means["pct_error"],
+        }
+    ).round(2)
+    return metrics.sort_values("MAE")
+
+
+@timed
+def evaluate_intervals(forecast_df, testing_data, model, level):
+    """Coverage, mean width and interval score of every level in one vectorized pass.
+
+    The interval score is the width plus 2 / alpha times the distance by which the
+    actual value falls outside, so it rewards narrow intervals that still cover.
+    """
+    lo_columns = [f"{model}-lo-{l}" for l in level]
+    hi_columns = [f"{model}-hi-{l}" for l in level]
+    aligned = align_forecast(forecast_df, testing_data, model, lo_columns + hi_columns)
+    y = aligned["y"].to_numpy(dtype=np.float64)[:, None]
+    lo = aligned[lo_columns].to_numpy(dtype=np.float64)
+    hi = aligned[hi_columns].to_numpy(dtype=np.float64)
+    alpha = 1 - np.asarray(level, dtype=np.float64) / 100
+    misses = np.maximum(lo - y, 0) + np.maximum(y - hi, 0)
+    metrics = pd.DataFrame(
+        {
+            "Target Coverage": np.asarray(level, dtype=np.float64) / 100,
+            "Coverage": ((y >= lo) & (y <= hi)).mean(axis=0),
+            "Mean Width": (hi - lo).mean(axis=0),
+            "Interval Score": (hi - lo + 2 / alpha * misses).mean(axis=0),
+        },
+        index=pd.Index([f"{l}%" for l in level], name="Level"),
+    )
+    return metrics.round(2)
+
+
+def rank_models(forecast_df, testing_data, model_names):
+    """Build a leaderboard of all fitted models, best MAE first"""
+    rows = []
+    for name in model_names:
+        mae, r2, mape = evaluate_performance(forecast_df, testing_data, name)
+        rows.append({"Model": name, "MAE": mae, "R²": r2, "MAPE": mape})
+    leaderboard = pd.DataFrame(rows).sort_values(["MAE", "MAPE"], ignore_index=True)
+    leaderboard.index = leaderboard.index + 1
+    leaderboard.index.name = "Rank"
+    return leaderboard
+
+
+def render_cv_sidebar():
+    st.sidebar.divider()
+    st.sidebar.header("Cross-Validation")
+    enabled = st.sidebar.toggle("Rolling-origin backtest", value=False)
+    if not enabled:
+        return None
+    horizon = st.sidebar.number_input("Horizon", min_value=1, value=12)
+    n_windows = st.sidebar.number_input("Windows", min_value=1, value=5)
+    step_size = st.sidebar.number_input(
+        "Step Size",
+        min_value=1,
+        value=int(horizon),
+        help="How many periods the cutoff moves between windows",
+    )
+    return {"h": int(horizon), "n_windows": int(n_windows), "step_size": int(step_size)}
+
+
+@timed
+def cross_validate(model, data, freq, h, n_windows, step_size):
+    """Backtest the model over rolling cutoffs, reusing cached folds when available"""
+    key = make_fit_key(
+        data, model, freq=freq, h=h, n_windows=n_windows, step_size=step_size, cv=True
+    )
+    cached = cache_get(key)
+    if cached is not None:
+        return cached.copy()
+
+    from statsforecast import StatsForecast
+
+    models = list(model) if isinstance(model, (list, tuple)) else [model]
+    if is_ml_model(models):
+        sf = LagForecaster(models=models, freq=freq)
+    else:
+        sf = StatsForecast(models=models, freq=freq, n_jobs=FIT_N_JOBS)
+    cv_df = sf.cross_validation(
+        df=data, h=h, n_windows=n_windows, step_size=step_size
+    )
+    if "unique_id" not in cv_df.columns:
+        cv_df = cv_df.reset_index()
+
+    cache_put(key, cv_df)
+    return cv_df.copy()
+
+
+def cross_validation_metrics(cv_df, model_names, by="cutoff"):
+    """Compute MAE, RMSE and MAPE for all cutoffs and models in one groupby pass"""
+    y = cv_df["y"].to_numpy(dtype=np.float64)[:, None]
+    predictions = cv_df[model_names].to_numpy(dtype=np.float64)
+    error = predictions - y
+    denominator = np.maximum(np.abs(y), np.finfo(np.float64).eps)
+    parts = pd.concat(
+        {
+            "MAE": pd.DataFrame(np.abs(error), columns=model_names),
+            "RMSE": pd.DataFrame(error**2, columns=model_names),
+            "MAPE": pd.DataFrame(np.abs(error) / denominator, columns=model_names),
+        },
+        axis=1,
+    )
+    if by == "model":
+        metrics = parts.mean().unstack(level=0)
+        metrics["RMSE"] = np.sqrt(metrics["RMSE"])
+        metrics.index.name = "Model"
+        return metrics.round(2).sort_values("MAE")
+    metrics = parts.groupby(cv_df[by].to_numpy(), sort=True).mean()
+    metrics["RMSE"] = np.sqrt(metrics["RMSE"])
+    metrics.index.name = by
+    return metrics.round(2)
+
+
 def return_frequency():
-    return {"Yearly": "YS", "Monthly": "MS", "Weekly": "W", "Daily": "D", "Hourly": "H"}
+    return {"Yearly": "YS", "Monthly": "MS", "Weekly": "W", "Daily": "D", "Hourly": "h"}
 
 
+@timed
 def test_train_plot(
-    data, train_data, test_data, x_axis, y_axis, split_ratio, model_fit=None, model=None
+    data,
+    train_data,
+    test_data,
+    x_axis,
+    y_axis,
+    split_ratio,
+    model_fit=None,
+    model=None,
+    window=None,
+    anomalies=None,
 ):
-    fig = px.line(data, x="ds", y="y", title=f"{x_axis} vs {y_axis}")
-    fig.update_layout(xaxis_title=x_axis, yaxis_title=y_axis)
-    fig.update_traces(opacity=0.1)
-
+    """Plot train, test and fitted data, downsampled to screen resolution, and the
+    flagged anomalies as markers"""
+    fig = go.Figure()
+    fig.update_layout(title=f"{x_axis} vs {y_axis}")
+
+    x, y = downsample_trace(data["ds"], data["y"], window)
+    fig.add_scatter(x=x, y=y, mode="lines", name="Data", opacity=0.1)
+    x, y = downsample_trace(train_data["ds"], train_data["y"], window)
     fig.add_scatter(
-        x=train_data["ds"],
-        y=train_data["y"],
+        x=x,
+        y=y,
         mode="lines",
         name="Train Data",
         line=dict(color="blue", width=4),
     )
+    x, y = downsample_trace(test_data["ds"], test_data["y"], window)
     fig.add_scatter(
-        x=test_data["ds"],
-        y=test_data["y"],
+        x=x,
+        y=y,
         mode="lines",
         name="Test Data",
         line=dict(color="red", width=4),
     )
-    if model_fit is not None:
+    if model_fit is not None and isinstance(model, str):
+        add_interval_bands(fig, model_fit, model)
         fig.add_scatter(
             x=model_fit["ds"],
             y=model_fit[model],
@@ -186,8 +872,41 @@ def test_train_plot(
             name="Fitted Data",
             line=dict(color="purple", width=4, dash="dot"),
         )
+    elif model_fit is not None:
+        for name in model:
+            fig.add_scatter(
+                x=model_fit["ds"],
+                y=model_fit[name],
+                mode="lines",
+                name=name,
+                line=dict(width=3, dash="dot"),
+            )
+    if anomalies is not None and len(anomalies):
+        x, y = anomaly_markers(anomalies, window)
+        fig.add_scatter(
+            x=x,
+            y=y,
+            mode="markers",
+            name="Anomalies",
+            marker=dict(color="orange", size=9, symbol="x"),
+        )
     fig.update_layout(
         xaxis_title="Date", yaxis_title="Values", legend_title="Data Split"
     )
 
     return fig
+
+
+def anomaly_markers(anomalies, window=None, n_out=PLOT_POINTS):
+    """The anomalies inside the zoom window, the largest deviations if there are
+    more than can be drawn"""
+    if window is not None:
+        start, end = window
+        if pd.api.types.is_datetime64_any_dtype(anomalies["ds"]):
+            start, end = pd.Timestamp(start), pd.Timestamp(end)
+        anomalies = anomalies[(anomalies["ds"] >= start) & (anomalies["ds"] <= end)]
+    if len(anomalies) > n_out:
+        deviation = (anomalies["y"] - anomalies["expected"]).abs().to_numpy()
+        keep = np.sort(np.argpartition(deviation, -n_out)[-n_out:])
+        anomalies = anomalies.iloc[keep]
+    return anomalies["ds"], anomalies["y"]
@@ -1,16 +1,21 @@
 import streamlit as st
 import csv
-import plotly.express as px
+import plotly.graph_objects as go
+import os
+import time
+import numpy as np
 import pandas as pd
 
-from statsforecast import StatsForecast
-from statsforecast.models import (
-    AutoARIMA,
-    SeasonalNaive,
-    HoltWinters,
-    HistoricAverage,
-    MSTL,
-)
+from shared.utils_exog import add_calendar_features, exog_columns
+from shared.utils_fitting import align_forecast, conformal_intervals
+from shared.utils_plot import add_interval_bands, downsample_trace
+from shared.utils_profiling import timed
+from shared.utils_registry import get_entry, list_models, load_model
+from shared.utils_store import has_dataset
+from shared.utils_upload import is_data_in_session
+
+
+DRIFT_THRESHOLD = float(os.environ.get("DRIFT_THRESHOLD", "1.5"))
 
 
 def load_model_data_from_session():
@@ -33,6 +38,80 @@ def is_model_data_in_session():
     )
 
 
+def restore_registered_model(model_id):
+    """Load a registered fit into the session as if it had just been fitted.
+
+    The data of the fit is loaded too, unless the session already holds data with
+    the same columns (such as a newer export). Returns False if neither is available.
+    """
+    entry = get_entry(model_id)
+    sf = load_model(model_id)
+    config = entry["config"]
+    st.session_state.update(
+        {
+            "fitted_model": sf,
+            "selected_model": next(m for m in sf.models if str(m) == entry["name"]),
+            "freq": config["freq"],
+            "season_length": config["season_length"],
+            "season_mstl": config["season_mstl"],
+            "split_ratio": config["split_ratio"],
+            "level": config.get("level", []),
+            "conformal": config.get("conformal", False),
+            "preprocess": config.get("preprocess"),
+            "exog": config.get("exog"),
+            "fitted_until": entry["fitted_until"],
+            "last_evaluation": entry["metrics"],
+            "model_id": model_id,
+        }
+    )
+    st.session_state.pop("last_forecast", None)
+    st.session_state.pop("last_update_report", None)
+
+    data = entry["data"]
+    same_columns = all(
+        st.session_state.get(key) == data[key]
+        for key in ("x_axis", "y_axis", "id_axis", "y_columns")
+    )
+    if is_data_in_session() and same_columns:
+        return True
+    if not has_dataset(data["dataset_id"]):
+        return False
+    st.session_state.update(data)
+    return True
+
+
+def render_registry_sidebar():
+    entries = list_models()
+    if not entries:
+        return
+    st.sidebar.header("Model Registry")
+    labels = {
+        e["id"]: f"{e['name']} v{e['version']} · {e['data'].get('filename')} · "
+        f"MAE {e['metrics'].get('mae')}"
+        for e in entries
+    }
+    ids = list(labels)
+    current = st.session_state.get("model_id")
+    model_id = st.sidebar.selectbox(
+        "Saved fits",
+        ids,
+        index=ids.index(current) if current in ids else 0,
+        format_func=labels.get,
+    )
+    if st.sidebar.button("Load Model"):
+        start = time.perf_counter()
+        if restore_registered_model(model_id):
+            st.session_state["registry_load_seconds"] = time.perf_counter() - start
+            st.rerun()
+        st.sidebar.warning(
+            "The data of this fit is no longer stored. Upload it again to forecast."
+        )
+    load_seconds = st.session_state.pop("registry_load_seconds", None)
+    if load_seconds is not None:
+        st.sidebar.caption(f"Loaded in {load_seconds * 1000:.0f} ms")
+    st.sidebar.divider()
+
+
 def render_model_sidebar(model, freq, season_length, season_mstl):
     st.sidebar.header("Fitted Model")
     st.sidebar.write(f"**Model:** {model}")
@@ -40,6 +119,10 @@ def render_model_sidebar(model, freq, season_length, season_mstl):
     st.sidebar.write(f"**Season Lenght:** {season_length}")
     if str(model) == "MSTL":
         st.sidebar.write(f"**Second Season Lenght:** {season_mstl}")
+    level = st.session_state.get("level")
+    if level:
+        kind = "conformal" if st.session_state.get("conformal") else "model"
+        st.sidebar.write(f"**Intervals:** {', '.join(f'{l}%' for l in level)} ({kind})")
     st.sidebar.divider()
     model_performance = st.session_state.get("last_evaluation")
     st.sidebar.header("Model Performance")
@@ -56,11 +139,43 @@ def render_model_sidebar(model, freq, season_length, season_mstl):
     return forecast_horizon
 
 
-def forecast_plot(data, x_axis, y_axis, model, forecast=None):
-    fig = px.line(data, x="ds", y="y", title=f"{x_axis} vs {y_axis}")
-    fig.update_layout(xaxis_title=x_axis, yaxis_title=y_axis)
+def render_update_sidebar():
+    mode = st.sidebar.radio(
+        "Forecast Mode",
+        ["Refit on all data", "Update with new data"],
+        help="""
+        - **Refit on all data**: Re-estimates the model parameters on the full dataset.
+        - **Update with new data**: Keeps the fitted parameters and only advances the
+          model over the rows newer than the last fit. Falls back to a refit if the
+          model has no update path or the error on the new rows has drifted.
+        """,
+    )
+    return mode == "Update with new data"
+
+
+def render_update_report(report):
+    st.sidebar.divider()
+    st.sidebar.header("Last Forecast")
+    st.sidebar.write(f"**Mode:** {report['mode'].capitalize()}")
+    st.sidebar.write(f"**New rows:** {report['new_rows']}")
+    if report.get("drift") is not None:
+        st.sidebar.write(f"**Drift (MAE ratio):** {report['drift']:.2f}")
+    st.sidebar.write(f"**Time:** {report['seconds']:.2f}s")
+    refit_seconds = st.session_state.get("refit_seconds")
+    if report["mode"] == "update" and refit_seconds is not None:
+        st.sidebar.write(f"**Last full refit:** {refit_seconds:.2f}s")
+
+
+@timed
+def forecast_plot(data, x_axis, y_axis, model, forecast=None, window=None):
+    """Plot the data, downsampled to screen resolution, and the forecast"""
+    fig = go.Figure()
+    fig.update_layout(title=f"{x_axis} vs {y_axis}")
+    x, y = downsample_trace(data["ds"], data["y"], window)
+    fig.add_scatter(x=x, y=y, mode="lines", name="Data")
 
     if forecast is not None:
+        add_interval_bands(fig, forecast, model)
         fig.add_scatter(
             x=forecast["ds"],
             y=forecast[model],
@@ -75,15 +190,179 @@ def forecast_plot(data, x_axis, y_axis, model, forecast=None):
     return fig
 
 
-def forecast(model, data, forecast_horizon, freq, freq_mstl=None):
-    """Fit the model to training data and validate it against testing data"""
-    model.fit(df=data)
+@timed
+def forecast(
+    model,
+    data,
+    forecast_horizon,
+    freq,
+    freq_mstl=None,
+    level=None,
+    conformal=False,
+    X_df=None,
+):
+    """Refit the model on all data and forecast, with every interval level in one pass.
+
+    ``X_df`` holds the regressor values over the horizon if data has regressors.
+    """
+    prediction_intervals = None
+    if conformal and level:
+        # Conformal scores are calibrated for one horizon, so they are redone here
+        prediction_intervals = conformal_intervals(forecast_horizon)
+    for m in model.models:
+        # StatsForecast keeps the calibration of an earlier fit on the model objects
+        m.prediction_intervals = None
+    model.fit(df=data, prediction_intervals=prediction_intervals)
 
-    # Prepare a DataFrame for forecasting
-    forecast_df = model.forecast(h=forecast_horizon, df=data)
+    # Predict from the fitted models instead of fitting a second time
+    forecast_df = model.predict(h=forecast_horizon, level=level or None, X_df=X_df)
 
     # Ensure column names align for consistency
     forecast_df = forecast_df.rename(columns={"y_hat": "y"})
     forecast_df["Type"] = "Predicted"
 
     return forecast_df
+
+
+def future_exog(data, future_rows, forecast_horizon, freq, calendar=()):
+    """Regressor values over the horizon of every series, or None without regressors.
+
+    Calendar features are computed from the future timestamps. Other regressors
+    come from the future rows of the upload where they cover the horizon and hold
+    their last observed value elsewhere.
+    """
+    columns = exog_columns(data)
+    if not columns:
+        return None
+    last = data.groupby("unique_id", sort=False, observed=True).tail(1)
+    X_df = pd.DataFrame(
+        {
+            "unique_id": pd.Categorical(
+                np.repeat(last["unique_id"].to_numpy(), forecast_horizon),
+                dtype=data["unique_id"].dtype,
+            ),
+            "ds": np.concatenate(
+                [future_dates(ds, forecast_horizon, freq) for ds in last["ds"]]
+            ),
+        }
+    )
+    regressors = [col for col in columns if col not in calendar]
+    if regressors:
+        if future_rows is not None and len(future_rows):
+            X_df = X_df.merge(
+                future_rows[["unique_id", "ds"] + regressors],
+                on=["unique_id", "ds"],
+                how="left",
+            )
+        held = data.groupby("unique_id", sort=False, observed=True)[regressors].last()
+        held = held.reindex(X_df["unique_id"]).set_axis(X_df.index)
+        X_df = X_df.reindex(columns=["unique_id", "ds"] + regressors)
+        X_df[regressors] = X_df[regressors].fillna(held)
+    X_df = add_calendar_features(X_df, [col for col in calendar if col in columns])
+    return X_df[["unique_id", "ds"] + columns]
+
+
+def future_dates(last_ds, forecast_horizon, freq):
+    """Return the timestamps of the next forecast_horizon periods after last_ds"""
+    if isinstance(last_ds, (int, np.integer)):
+        return last_ds + np.arange(1, forecast_horizon + 1)
+    return pd.date_range(pd.Timestamp(last_ds), periods=forecast_horizon + 1, freq=freq)[1:]
+
+
+def can_forward(model, data):
+    """Check that every model has a forward path and every series was part of the fit"""
+    known = {str(uid) for uid in model.uids}
+    return all(hasattr(m, "forward") for m in model.models) and set(
+        data["unique_id"].astype(str).unique()
+    ) <= known
+
+
+def forward(model, data, forecast_horizon, freq, level=None):
+    """Forecast from the fitted parameters, only running the model filters over data"""
+    position = {str(uid): i for i, uid in enumerate(model.uids)}
+    names = [str(m) for m in model.models]
+    frames = []
+    for uid, series in data.groupby("unique_id", sort=False, observed=True):
+        fitted = model.fitted_[position[str(uid)]]
+        y = series["y"].to_numpy(dtype=np.float64)
+        frame = {
+            "unique_id": uid,
+            "ds": future_dates(series["ds"].iloc[-1], forecast_horizon, freq),
+        }
+        for name, fitted_model in zip(names, fitted):
+            result = fitted_model.forward(y=y, h=forecast_horizon, level=level or None)
+            frame[name] = result["mean"]
+            for l in level or []:
+                frame[f"{name}-lo-{l}"] = result[f"lo-{l}"]
+                frame[f"{name}-hi-{l}"] = result[f"hi-{l}"]
+        frames.append(pd.DataFrame(frame))
+    forecast_df = pd.concat(frames, ignore_index=True)
+    forecast_df["Type"] = "Predicted"
+    return forecast_df
+
+
+def measure_drift(model, data, freq, fitted_until, model_name, baseline_mae):
+    """Compare the error on rows newer than the fit with the error seen at fit time"""
+    history = data[data["ds"] <= fitted_until]
+    new_rows = data[data["ds"] > fitted_until]
+    if new_rows.empty or history.empty or not baseline_mae:
+        return None
+    horizon = int(new_rows.groupby("unique_id", sort=False, observed=True).size().max())
+    aligned = align_forecast(
+        forward(model, history, horizon, freq), new_rows, model_name
+    )
+    mae = (aligned["y_hat"] - aligned["y"]).abs().mean()
+    return float(mae / baseline_mae)
+
+
+@timed
+def update_forecast(
+    model,
+    data,
+    forecast_horizon,
+    freq,
+    fitted_until,
+    model_name,
+    baseline_mae=None,
+    drift_threshold=DRIFT_THRESHOLD,
+    force_refit=False,
+    level=None,
+    conformal=False,
+    X_df=None,
+):
+    """Advance the fitted model with the rows newer than fitted_until and forecast.
+
+    The parameters estimated at fit time are kept and only the model filters are
+    run over the data. A full refit happens when a model has no forward path or the
+    error on the new rows exceeds ``drift_threshold`` times the fit-time MAE.
+    Conformal intervals always refit, as their calibration depends on the horizon,
+    and so do fits with regressors, whose values over the horizon are in ``X_df``.
+    """
+    if pd.api.types.is_datetime64_any_dtype(data["ds"]):
+        # Fits restored from the registry carry fitted_until as a string
+        fitted_until = pd.Timestamp(fitted_until)
+    new_rows = int((data["ds"] > fitted_until).sum())
+    report = {"new_rows": new_rows, "drift": None, "mode": "update"}
+    start = time.perf_counter()
+    if force_refit or (conformal and level) or X_df is not None or not can_forward(model, data):
+        report["mode"] = "refit"
+    else:
+        report["drift"] = measure_drift(
+            model, data, freq, fitted_until, model_name, baseline_mae
+        )
+        if report["drift"] is not None and report["drift"] > drift_threshold:
+            report["mode"] = "refit"
+        else:
+            forecast_df = forward(model, data, forecast_horizon, freq, level)
+    if report["mode"] == "refit":
+        forecast_df = forecast(
+            model,
+            data,
+            forecast_horizon,
+            freq,
+            level=level,
+            conformal=conformal,
+            X_df=X_df,
+        )
+    report["seconds"] = time.perf_counter() - start
+    return forecast_df, report
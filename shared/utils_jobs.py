@@ -0,0 +1,251 @@
+import streamlit as st
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from shared.utils_cache import cache_get, cache_put
+from shared.utils_exog import exog_frame
+from shared.utils_fitting import (
+    apply_fit_result,
+    fit_cache_key,
+    run_fit,
+    single_process_fits,
+)
+
+
+FIT_JOBS_MAX_WORKERS = int(os.environ.get("FIT_JOBS_MAX_WORKERS", "2"))
+# Jobs no session has asked about for this long are dropped with their results
+FIT_JOBS_IDLE_SECONDS = float(os.environ.get("FIT_JOBS_IDLE_SECONDS", "600"))
+
+
+@st.cache_resource
+def get_job_manager():
+    """Return the process pool and job table shared by all sessions of this server.
+
+    A daemon thread drops the jobs of sessions that went away, such as closed
+    browser tabs, so their results do not pile up in memory.
+    """
+    context = multiprocessing.get_context("spawn")
+    manager = {
+        "executor": ProcessPoolExecutor(
+            max_workers=FIT_JOBS_MAX_WORKERS,
+            mp_context=context,
+            initializer=single_process_fits,
+        ),
+        "progress": context.Manager().dict(),
+        "jobs": {},
+        "lock": threading.Lock(),
+    }
+    threading.Thread(target=_sweep_idle, args=(manager,), daemon=True).start()
+    return manager
+
+
+def _drop_idle(manager):
+    """Cancel and drop the jobs not looked at for FIT_JOBS_IDLE_SECONDS"""
+    now = time.time()
+    with manager["lock"]:
+        idle = [
+            job_id
+            for job_id, job in manager["jobs"].items()
+            if now - job["seen"] > FIT_JOBS_IDLE_SECONDS
+        ]
+        for job_id in idle:
+            job = manager["jobs"].pop(job_id)
+            if job["future"] is not None:
+                job["future"].cancel()
+    for job_id in idle:
+        manager["progress"].pop(job_id, None)
+
+
+def _sweep_idle(manager):
+    while True:
+        time.sleep(max(FIT_JOBS_IDLE_SECONDS / 4, 1))
+        _drop_idle(manager)
+
+
+def _fit_job(
+    job_id, progress, model, training_data, forecast_horizon, freq, level, conformal, X_df
+):
+    """Run a fit inside a worker process and report which stage it is in"""
+    progress[job_id] = "Fitting model"
+    result = run_fit(
+        model,
+        training_data,
+        forecast_horizon,
+        freq,
+        level=level,
+        conformal=conformal,
+        X_df=X_df,
+    )
+    progress[job_id] = "Sending results"
+    return result
+
+
+def submit_fit_job(
+    model, training_data, testing_data, freq, label="", level=None, conformal=False
+):
+    """Queue a fit on the process pool and return its job id"""
+    manager = get_job_manager()
+    job_id = uuid.uuid4().hex[:12]
+    key, forecast_horizon = fit_cache_key(
+        model, training_data, testing_data, freq, level=level, conformal=conformal
+    )
+    job = {
+        "label": label,
+        "key": key,
+        "submitted": time.time(),
+        "seen": time.time(),
+        "future": None,
+        "result": cache_get(key),
+        "error": None,
+        "cancelled": False,
+    }
+    if job["result"] is None:
+        manager["progress"][job_id] = "Queued"
+        job["future"] = manager["executor"].submit(
+            _fit_job,
+            job_id,
+            manager["progress"],
+            model,
+            training_data,
+            forecast_horizon,
+            freq,
+            level,
+            conformal,
+            exog_frame(testing_data),
+        )
+    with manager["lock"]:
+        manager["jobs"][job_id] = job
+    return job_id
+
+
+def job_status(job_id):
+    """Return the state of a job: queued, running, done, failed, cancelled or unknown"""
+    manager = get_job_manager()
+    with manager["lock"]:
+        job = manager["jobs"].get(job_id)
+        if job is not None:
+            job["seen"] = time.time()
+    if job is None:
+        return {"state": "unknown", "progress": "", "elapsed": 0.0, "label": "", "error": None}
+
+    future = job["future"]
+    elapsed = time.time() - job["submitted"]
+    if job["cancelled"]:
+        state = "cancelled"
+    elif job["result"] is not None:
+        state = "done"
+    elif job["error"] is not None:
+        state = "failed"
+    elif future.done():
+        try:
+            job["result"] = future.result()
+            cache_put(job["key"], job["result"])
+            state = "done"
+        except Exception as e:
+            job["error"] = str(e)
+            state = "failed"
+    elif future.running():
+        state = "running"
+    else:
+        state = "queued"
+    return {
+        "state": state,
+        "progress": manager["progress"].get(job_id, ""),
+        "elapsed": elapsed,
+        "label": job["label"],
+        "error": job["error"],
+    }
+
+
+def job_result(job_id):
+    """Return the (forecast, fitted model) pair of a finished job"""
+    manager = get_job_manager()
+    with manager["lock"]:
+        job = manager["jobs"].get(job_id)
+    if job is None or job["result"] is None or job["cancelled"]:
+        return None
+    return job["result"]
+
+
+def cancel_job(job_id):
+    """Cancel a job. Queued jobs never start. A running fit cannot be interrupted in
+    its worker, so it runs to the end and its result is discarded"""
+    manager = get_job_manager()
+    with manager["lock"]:
+        job = manager["jobs"].get(job_id)
+        if job is None:
+            return
+        job["cancelled"] = True
+        if job["future"] is not None:
+            job["future"].cancel()
+
+
+def forget_job(job_id):
+    """Drop a job and its result from the job table"""
+    manager = get_job_manager()
+    with manager["lock"]:
+        manager["jobs"].pop(job_id, None)
+    manager["progress"].pop(job_id, None)
+
+
+def collect_fit_job(data):
+    """Apply the session's background fit once it has finished.
+
+    Returns the evaluation of the fit, or None while nothing new is available.
+    """
+    pending = st.session_state.get("fit_job")
+    if pending is None:
+        return None
+    status = job_status(pending["job_id"])
+    if status["state"] != "done":
+        return None
+    forecast, sf = job_result(pending["job_id"])
+    forget_job(pending["job_id"])
+    del st.session_state["fit_job"]
+    evaluation = apply_fit_result(
+        pending["config"], forecast, sf, data, fit_seconds=status["elapsed"]
+    )
+    st.session_state["fit_job_forecast"] = forecast
+    return evaluation
+
+
+def render_job_sidebar():
+    if st.session_state.get("fit_job") is None:
+        return
+    with st.sidebar:
+        st.divider()
+        st.header("Background Fit")
+        _job_panel()
+
+
+@st.fragment(run_every=2)
+def _job_panel():
+    """Poll the session's background fit and rerun the page when it finishes"""
+    pending = st.session_state.get("fit_job")
+    if pending is None:
+        return
+    status = job_status(pending["job_id"])
+    st.write(
+        f"**{status['label']}**: {status['state']} - {status['progress']} "
+        f"({status['elapsed']:.0f}s)"
+    )
+    if status["state"] == "done":
+        st.rerun()
+    elif status["state"] in ("failed", "cancelled", "unknown"):
+        if status["state"] == "failed":
+            st.error(f"Fit failed: {status['error']}")
+        del st.session_state["fit_job"]
+        forget_job(pending["job_id"])
+    elif st.button(
+        "Cancel Fit",
+        help="A queued fit never starts. A running fit keeps its worker busy until "
+        "it ends, and its result is then discarded.",
+    ):
+        if status["state"] == "running":
+            st.toast("The running fit finishes in the background; its result is discarded.")
+        cancel_job(pending["job_id"])
+        st.rerun()
@@ -0,0 +1,470 @@
+"""Live data: tail a growing CSV file or a local socket into a fixed-size buffer.
+
+A reader thread per source appends every new line to an array-backed ring buffer,
+so ingestion costs time proportional to the new data and memory stays fixed no
+matter how long the source runs. The Live Data page polls the buffer on an
+interval and forecasts again once enough new points have arrived.
+"""
+import streamlit as st
+import copy
+import ipaddress
+import os
+import select
+import socket
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from shared.utils_forecast import update_forecast
+from shared.utils_upload import compact_float
+
+
+LIVE_BUFFER_SIZE = int(os.environ.get("LIVE_BUFFER_SIZE", "100000"))
+# Files can only be followed inside this directory, sockets only bind to loopback
+LIVE_DATA_DIR = os.environ.get("LIVE_DATA_DIR", "live_data")
+# The model filters are run over at most this many recent points per forecast, so
+# a refresh costs the same however full the buffer is
+LIVE_FORECAST_WINDOW = int(os.environ.get("LIVE_FORECAST_WINDOW", "5000"))
+LIVE_POLL_SECONDS = 0.5
+# Sessions that have not looked at a stream for this long are detached from it,
+# and a stream without sessions is stopped
+LIVE_IDLE_SECONDS = float(os.environ.get("LIVE_IDLE_SECONDS", "300"))
+# At most this much of a file is read per poll, so catching up never blocks long
+LIVE_READ_BYTES = 4 * 1024 * 1024
+SOURCE_KINDS = ["File", "TCP socket", "UDP socket"]
+
+
+class RingBuffer:
+    """The last ``capacity`` timestamps and values of one series in two fixed arrays"""
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.ds = np.zeros(self.capacity, dtype=np.int64)
+        self.y = np.zeros(self.capacity, dtype=np.float64)
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def append(self, ds, y):
+        """Write new values after the newest ones, overwriting the oldest.
+
+        Values not newer than the last timestamp are dropped, so the buffer stays
+        sorted even if a source repeats or reorders lines.
+        """
+        with self.lock:
+            last = np.iinfo(np.int64).min
+            if self.total:
+                last = self.ds[(self.total - 1) % self.capacity]
+            newest = np.maximum.accumulate(np.concatenate(([last], ds)))[:-1]
+            keep = ds > newest
+            ds, y = ds[keep], y[keep]
+            count = len(ds)
+            if count == 0:
+                return 0
+            ds, y = ds[-self.capacity :], y[-self.capacity :]
+            start = (self.total + count - len(ds)) % self.capacity
+            first = min(len(ds), self.capacity - start)
+            self.ds[start : start + first] = ds[:first]
+            self.y[start : start + first] = y[:first]
+            self.ds[: len(ds) - first] = ds[first:]
+            self.y[: len(ds) - first] = y[first:]
+            self.total += count
+            return count
+
+    def since(self, seen):
+        """Ordered copies of the values appended after the first ``seen``, as far as
+        they are still buffered, and the total count"""
+        with self.lock:
+            count = self.total - seen if 0 <= seen <= self.total else self.total
+            order = np.arange(self.total - min(count, self.capacity), self.total)
+            order %= self.capacity
+            return self.ds[order].view("datetime64[ns]"), self.y[order], self.total
+
+    def snapshot(self):
+        """Ordered copies of the buffered timestamps and values, and the total count"""
+        return self.since(0)
+
+
+def parse_lines(lines, ds_field=1, value_field=2):
+    """Timestamps (ns) and values of comma separated lines, fields counted from 1.
+
+    Lines whose timestamp or value cannot be parsed, such as a header, are dropped.
+    """
+    if not lines:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    fields = pd.Series(lines).str.split(",", expand=True)
+    if fields.shape[1] < max(ds_field, value_field):
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    values = pd.to_numeric(fields[value_field - 1].str.strip(), errors="coerce")
+    raw = fields[ds_field - 1].str.strip()
+    # One format for the whole batch, guessed from its last line, which is never a header
+    date_format = guess_datetime_format(str(raw.iloc[-1]))
+    ds = pd.to_datetime(raw, errors="coerce", format=date_format or "mixed")
+    valid = (values.notna() & ds.notna()).to_numpy()
+    return (
+        ds.to_numpy(dtype="datetime64[ns]")[valid].view(np.int64),
+        values.to_numpy(dtype=np.float64)[valid],
+    )
+
+
+def split_lines(pending, chunk):
+    """Complete lines of pending + chunk and the unfinished rest"""
+    *lines, rest = (pending + chunk).split(b"\n")
+    return [line.decode(errors="replace") for line in lines if line.strip()], rest
+
+
+def live_file_path(name):
+    """The real path of a file inside LIVE_DATA_DIR; anything outside is refused"""
+    root = os.path.realpath(LIVE_DATA_DIR)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Only files inside {LIVE_DATA_DIR} can be followed.")
+    return path
+
+
+def check_loopback(host):
+    """Refuse hosts other than a loopback address, so no port opens to the network"""
+    try:
+        loopback = ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        loopback = False
+    if not loopback:
+        raise ValueError("Live sockets can only listen on a loopback address such as 127.0.0.1.")
+
+
+class FileTail:
+    """Read the lines appended to a file since the last read"""
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.pending = b""
+
+    def read(self, timeout):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = self.offset
+        if size < self.offset:
+            # Truncated or replaced: start over
+            self.offset, self.pending = 0, b""
+        if size == self.offset:
+            time.sleep(timeout)
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(min(size - self.offset, LIVE_READ_BYTES))
+        self.offset += len(chunk)
+        lines, self.pending = split_lines(self.pending, chunk)
+        return lines
+
+    def close(self):
+        pass
+
+
+class SocketSource:
+    """Listen on a local TCP or UDP port for newline separated lines"""
+
+    def __init__(self, kind, host, port):
+        check_loopback(host)
+        self.tcp = kind == "TCP socket"
+        self.server = socket.socket(
+            socket.AF_INET, socket.SOCK_STREAM if self.tcp else socket.SOCK_DGRAM
+        )
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, int(port)))
+        if self.tcp:
+            self.server.listen()
+        self.clients = {}
+
+    def read(self, timeout):
+        readable, _, _ = select.select([self.server, *self.clients], [], [], timeout)
+        lines = []
+        for sock in readable:
+            if sock is self.server and self.tcp:
+                client, _ = self.server.accept()
+                self.clients[client] = b""
+            elif sock is self.server:
+                # Every datagram holds whole lines
+                datagram, _ = self.server.recvfrom(65535)
+                lines += split_lines(b"", datagram + b"\n")[0]
+            else:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    sock.close()
+                    del self.clients[sock]
+                    continue
+                new_lines, self.clients[sock] = split_lines(self.clients[sock], chunk)
+                lines += new_lines
+        return lines
+
+    def close(self):
+        for sock in [self.server, *self.clients]:
+            sock.close()
+
+
+class LiveStream:
+    """A source, its ring buffer and the thread that moves lines from one to the other"""
+
+    def __init__(self, config):
+        self.config = config
+        if config["kind"] == "File":
+            self.source = FileTail(live_file_path(config["path"]))
+        else:
+            self.source = SocketSource(config["kind"], config["host"], config["port"])
+        self.buffer = RingBuffer(config["capacity"])
+        # Last time each session watching the stream looked at it
+        self.sessions = {}
+        self.error = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            while not self.stopped.is_set():
+                lines = self.source.read(LIVE_POLL_SECONDS)
+                if lines:
+                    self.buffer.append(
+                        *parse_lines(lines, self.config["ds_field"], self.config["value_field"])
+                    )
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.source.close()
+
+    @property
+    def running(self):
+        return self.thread.is_alive()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join(timeout=2 * LIVE_POLL_SECONDS)
+
+
+@st.cache_resource
+def get_live_streams():
+    """Streams shared by all sessions of this server, keyed by their source.
+
+    A daemon thread stops the streams whose sessions all went idle, such as
+    closed browser tabs that never pressed Stop.
+    """
+    registry = {"streams": {}, "lock": threading.Lock()}
+    threading.Thread(target=_sweep_idle, args=(registry,), daemon=True).start()
+    return registry
+
+
+def live_session():
+    """An id for this browser session, to count the sessions watching a stream"""
+    return st.session_state.setdefault("live_session", uuid.uuid4().hex)
+
+
+def source_key(config):
+    if config["kind"] == "File":
+        return ("File", live_file_path(config["path"]))
+    return (config["kind"], config["host"], int(config["port"]))
+
+
+def _detach_idle(streams):
+    """Detach idle sessions and return the streams no session watches any more.
+
+    Called with the registry lock held; the caller stops the returned streams.
+    """
+    now = time.time()
+    orphans = []
+    for key, stream in list(streams.items()):
+        for session, seen in list(stream.sessions.items()):
+            if now - seen > LIVE_IDLE_SECONDS:
+                del stream.sessions[session]
+        if not stream.sessions:
+            orphans.append(streams.pop(key))
+    return orphans
+
+
+def _sweep_idle(registry):
+    while True:
+        time.sleep(max(LIVE_IDLE_SECONDS / 4, LIVE_POLL_SECONDS))
+        with registry["lock"]:
+            orphans = _detach_idle(registry["streams"])
+        for orphan in orphans:
+            orphan.stop()
+
+
+def start_stream(config, session):
+    """Watch the source from session, starting its stream unless it runs, and
+    return its key.
+
+    Sessions asking for a running source with the same settings share its stream.
+    Other settings replace it only when no other session watches it; otherwise a
+    ValueError is raised.
+    """
+    registry = get_live_streams()
+    key = source_key(config)
+    with registry["lock"]:
+        orphans = _detach_idle(registry["streams"])
+        stream = registry["streams"].get(key)
+        if stream is not None and stream.running and stream.config != config:
+            if set(stream.sessions) - {session}:
+                raise ValueError("The source is in use by another session with other settings.")
+            stream.stop()
+            stream = None
+        if stream is None or not stream.running:
+            stream = LiveStream(config)
+            registry["streams"][key] = stream
+        stream.sessions[session] = time.time()
+    for orphan in orphans:
+        orphan.stop()
+    return key
+
+
+def get_stream(key, session):
+    """The stream of the source if session watches it, marking the session active"""
+    registry = get_live_streams()
+    with registry["lock"]:
+        stream = registry["streams"].get(key)
+        if stream is None or session not in stream.sessions:
+            return None
+        stream.sessions[session] = time.time()
+        return stream
+
+
+def stop_stream(key, session):
+    """Stop watching the source from session, and stop its stream if none watch it"""
+    registry = get_live_streams()
+    with registry["lock"]:
+        stream = registry["streams"].get(key)
+        if stream is None:
+            return
+        stream.sessions.pop(session, None)
+        orphans = _detach_idle(registry["streams"])
+    for orphan in orphans:
+        orphan.stop()
+
+
+def live_frame(ds, y, unique_id):
+    """The buffered values as a canonical single-series frame"""
+    return pd.DataFrame(
+        {
+            "unique_id": pd.Categorical(np.full(len(ds), str(unique_id))),
+            "ds": ds,
+            "y": compact_float(y),
+        }
+    )
+
+
+def extend_live_frame(frame, buffer, seen, unique_id):
+    """Append the values the buffer received after the first ``seen`` to frame.
+
+    Only the new values are copied out of the buffer. The frame is rebuilt from
+    the whole buffer when the new values overwrote all it held, and is cut to the
+    buffer's capacity otherwise. Returns the frame and the new total count.
+    """
+    ds, y, total = buffer.since(seen if frame is not None else 0)
+    if frame is not None and not len(ds):
+        return frame, total
+    new = live_frame(ds, y, unique_id)
+    if frame is None or not 0 <= total - seen < buffer.capacity:
+        return new, total
+    frame = pd.concat([frame, new], ignore_index=True)
+    return frame.iloc[-buffer.capacity :].reset_index(drop=True), total
+
+
+def live_model():
+    """A copy of the session's fitted model for the live data, so live refits leave
+    the model of the Forecasting page untouched. Returns None without a usable fit."""
+    if st.session_state.get("fitted_model") is None or st.session_state.get("exog"):
+        return None
+    if (
+        "live_model" not in st.session_state
+        or "live_model_id" not in st.session_state
+        or st.session_state["live_model_id"] != st.session_state.get("model_id")
+    ):
+        st.session_state["live_model"] = copy.deepcopy(st.session_state["fitted_model"])
+        st.session_state["live_model_id"] = st.session_state.get("model_id")
+        st.session_state["live_fitted_until"] = st.session_state.get("fitted_until")
+        st.session_state["live_forecast"] = None
+        st.session_state["live_forecast_total"] = 0
+    return st.session_state["live_model"]
+
+
+def live_series_id(model):
+    """Name the live series like the fitted one, so the model can be advanced over it"""
+    uids = list(getattr(model, "uids", []))
+    return uids[0] if len(uids) == 1 else "live"
+
+
+def refresh_live_forecast(model, data, total, refresh):
+    """Forecast the live data again once min_new_points arrived since the last one.
+
+    The fitted parameters are kept and the model filters are run over the last
+    LIVE_FORECAST_WINDOW points, unless update_forecast falls back to a refit.
+    StatsForecast models keep no filter state between calls, so the window bounds
+    the work of every refresh instead.
+    """
+    if total - st.session_state.get("live_forecast_total", 0) < refresh["min_new_points"]:
+        return
+    data = data.iloc[-LIVE_FORECAST_WINDOW:]
+    fitted_until = st.session_state.get("live_fitted_until")
+    forecast_df, report = update_forecast(
+        model,
+        data,
+        int(refresh["horizon"]),
+        st.session_state["freq"],
+        data["ds"].min() if fitted_until is None else fitted_until,
+        str(st.session_state["selected_model"]),
+        (st.session_state.get("last_evaluation") or {}).get("mae"),
+        level=st.session_state.get("level"),
+        conformal=st.session_state.get("conformal", False),
+    )
+    st.session_state["live_forecast"] = forecast_df
+    st.session_state["live_forecast_total"] = total
+    st.session_state["live_fitted_until"] = data["ds"].max()
+    st.session_state["live_report"] = report
+
+
+def render_live_sidebar():
+    """Return the source configuration and the refresh settings"""
+    st.sidebar.header("Live Source")
+    kind = st.sidebar.radio("Source", SOURCE_KINDS, horizontal=True)
+    config = {"kind": kind}
+    if kind == "File":
+        config["path"] = st.sidebar.text_input(
+            "File name",
+            help=f"A CSV file in {LIVE_DATA_DIR} on the server that another process "
+            "appends to.",
+        )
+    else:
+        config["host"] = st.sidebar.text_input(
+            "Host", "127.0.0.1", help="A loopback address; the port is not opened to the network."
+        )
+        config["port"] = st.sidebar.number_input(
+            "Port", min_value=1, max_value=65535, value=9999
+        )
+    config["ds_field"] = st.sidebar.number_input(
+        "Timestamp field", min_value=1, value=1, help="Position in each line, from 1."
+    )
+    config["value_field"] = st.sidebar.number_input(
+        "Value field", min_value=1, value=2, help="Position in each line, from 1."
+    )
+    config["capacity"] = st.sidebar.number_input(
+        "Buffer size",
+        min_value=100,
+        value=LIVE_BUFFER_SIZE,
+        help="Only the newest values are kept; memory does not grow beyond this.",
+    )
+    st.sidebar.divider()
+    st.sidebar.header("Refresh")
+    refresh = {
+        "interval": st.sidebar.number_input("Refresh every (s)", min_value=1, value=2),
+        "min_new_points": st.sidebar.number_input(
+            "Forecast after new points",
+            min_value=1,
+            value=10,
+            help="The forecast is only computed again once this many points arrived.",
+        ),
+        "horizon": st.sidebar.number_input("Forecast Horizon", min_value=1, value=24),
+    }
+    return config, refresh
@@ -0,0 +1,233 @@
+"""Machine learning forecasters trained on lag, rolling-window and calendar features.
+
+One global regressor is trained over all series. ``LagForecaster`` offers the part
+of the StatsForecast interface the app relies on (``fit``, ``predict``,
+``cross_validation``, ``models`` and ``uids``), so ML fits go through the fit cache,
+background jobs, model registry and Forecasting page like the statistical models.
+"""
+import copy
+import os
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from shared.utils_exog import calendar_features, exog_columns
+
+
+ML_MODELS = ["GradientBoosting", "Ridge"]
+CALENDAR_FEATURES = ["hour", "dayofweek", "month"]
+# Quantiles of the absolute in-sample errors kept for prediction intervals
+RESIDUAL_QUANTILES = np.linspace(0, 1, 1001)
+ML_MAX_TRAIN_ROWS = int(os.environ.get("ML_MAX_TRAIN_ROWS", "250000"))
+
+
+class MLModel:
+    """A scikit-learn regressor named and configured like a StatsForecast model"""
+
+    def __init__(self, name, season_length=1):
+        self.name = name
+        self.season_length = int(season_length)
+        self.prediction_intervals = None
+        self.regressor_ = None
+        self.residual_quantiles_ = None
+
+    def __repr__(self):
+        return self.name
+
+    def new_regressor(self):
+        if self.name == "GradientBoosting":
+            from sklearn.ensemble import HistGradientBoostingRegressor
+
+            return HistGradientBoostingRegressor(max_iter=200, random_state=0)
+        from sklearn.linear_model import Ridge
+
+        return Ridge(alpha=1.0)
+
+
+def is_ml_model(model):
+    models = model if isinstance(model, (list, tuple)) else [model]
+    return all(isinstance(m, MLModel) for m in models)
+
+
+def feature_lags(season_length):
+    """The lags and rolling-mean windows used for a season length"""
+    season_length = max(int(season_length), 1)
+    lags = sorted({1, 2, 3, season_length, 2 * season_length})
+    windows = sorted({3, season_length} - {1})
+    return lags, windows
+
+
+def lag_features(y, lags, windows):
+    """Lag and rolling-mean features of every predictable position of y.
+
+    All features come from one strided view of y, so nothing is shifted or copied
+    row by row. Returns the feature matrix and the matching targets.
+    """
+    depth = max(lags + windows)
+    if len(y) <= depth:
+        return np.empty((0, len(lags) + len(windows))), np.empty(0)
+    # Row i holds y[i:i + depth], the history before the target y[i + depth]
+    view = sliding_window_view(y, depth)[:-1]
+    columns = [view[:, depth - lag] for lag in lags]
+    columns += [view[:, depth - window :].mean(axis=1) for window in windows]
+    return np.column_stack(columns), y[depth:]
+
+
+def buffer_features(buffer, lags, windows):
+    """The same features for the next step of every series, from their lag buffers"""
+    depth = buffer.shape[1]
+    columns = [buffer[:, depth - lag] for lag in lags]
+    columns += [buffer[:, depth - window :].mean(axis=1) for window in windows]
+    return np.column_stack(columns)
+
+
+def future_timestamps(last_ds, horizon, freq):
+    """The next horizon timestamps after every value of last_ds, one row per series"""
+    if not np.issubdtype(np.asarray(last_ds).dtype, np.datetime64):
+        return np.asarray(last_ds)[:, None] + np.arange(1, horizon + 1)
+    return np.stack(
+        [pd.date_range(ds, periods=horizon + 1, freq=freq)[1:].to_numpy() for ds in last_ds]
+    )
+
+
+class LagForecaster:
+    """Fit ML models on all series at once and forecast them recursively"""
+
+    def __init__(self, models, freq, n_jobs=-1):
+        # Fitted state goes onto copies, leaving the caller's model objects as configured
+        self.models = [copy.deepcopy(m) for m in models]
+        self.freq = freq
+        self.n_jobs = n_jobs
+
+    def _extra_features(self, ds, exog):
+        """Calendar and regressor columns for the rows with timestamps ds"""
+        columns = []
+        if self.calendar_:
+            columns.append(calendar_features(ds, self.calendar_).to_numpy(np.float64))
+        if self.exog_:
+            columns.append(np.asarray(exog, dtype=np.float64))
+        return columns
+
+    def fit(self, df, prediction_intervals=None):
+        """Build the features of every series and fit every model on all of them.
+
+        Series are standardized by their own mean and standard deviation, so one
+        model serves series of different scales. Beyond ML_MAX_TRAIN_ROWS feature
+        rows, a random sample is trained on. Intervals come from the in-sample
+        errors; conformal ``prediction_intervals`` are not supported.
+        """
+        if prediction_intervals is not None:
+            raise ValueError("Conformal intervals are not available for machine learning models")
+        season_length = max(m.season_length for m in self.models)
+        self.lags_, self.windows_ = feature_lags(season_length)
+        depth = max(self.lags_ + self.windows_)
+        self.exog_ = exog_columns(df)
+        is_datetime = pd.api.types.is_datetime64_any_dtype(df["ds"])
+        self.calendar_ = [
+            feature
+            for feature in CALENDAR_FEATURES
+            if is_datetime and getattr(pd.DatetimeIndex(df["ds"]), feature).nunique() > 1
+        ]
+
+        features, targets, uids, scales, buffers, last_ds = [], [], [], [], [], []
+        for uid, series in df.groupby("unique_id", sort=False, observed=True):
+            y = series["y"].to_numpy(dtype=np.float64)
+            if len(y) <= depth:
+                raise ValueError(
+                    f"series {uid} has {len(y)} values, the features need more than {depth}"
+                )
+            mean, std = y.mean(), y.std()
+            std = std if std > 0 else 1.0
+            y = (y - mean) / std
+            X, target = lag_features(y, self.lags_, self.windows_)
+            extra = self._extra_features(
+                series["ds"].to_numpy()[depth:], series[self.exog_].to_numpy()[depth:]
+            )
+            features.append(np.column_stack([X] + extra))
+            targets.append(target)
+            uids.append(uid)
+            scales.append((mean, std))
+            buffers.append(y[-depth:])
+            last_ds.append(series["ds"].to_numpy()[-1])
+
+        X, target = np.concatenate(features), np.concatenate(targets)
+        if len(target) > ML_MAX_TRAIN_ROWS:
+            # A sample spread over the whole history trains nearly as well
+            rows = np.random.default_rng(0).choice(len(target), ML_MAX_TRAIN_ROWS, replace=False)
+            X, target = X[rows], target[rows]
+        for m in self.models:
+            m.regressor_ = m.new_regressor().fit(X, target)
+            errors = np.abs(target - m.regressor_.predict(X))
+            m.residual_quantiles_ = np.quantile(errors, RESIDUAL_QUANTILES)
+        self.uids = pd.Index(uids, name="unique_id")
+        self.scales_ = np.array(scales)
+        self.buffers_ = np.array(buffers)
+        self.last_ds_ = np.array(last_ds)
+        return self
+
+    def predict(self, h, level=None, X_df=None):
+        """Forecast h steps of every series recursively.
+
+        Each step predicts all series in one call, then shifts the prediction into
+        the lag buffers in place. Interval bounds widen with the square root of the
+        step from the in-sample absolute error quantiles.
+        """
+        ds = future_timestamps(self.last_ds_, h, self.freq)
+        exog = None
+        if self.exog_:
+            grid = pd.DataFrame(
+                {"unique_id": np.repeat(self.uids.astype(str), h), "ds": ds.ravel()}
+            )
+            values = grid.merge(
+                X_df.assign(unique_id=X_df["unique_id"].astype(str)),
+                on=["unique_id", "ds"],
+                how="left",
+            )
+            exog = values[self.exog_].to_numpy(np.float64).reshape(len(self.uids), h, -1)
+        mean, std = self.scales_[:, 0:1], self.scales_[:, 1:2]
+
+        forecast = {
+            "unique_id": np.repeat(self.uids.to_numpy(), h),
+            "ds": ds.ravel(),
+        }
+        for m in self.models:
+            buffer = self.buffers_.copy()
+            predictions = np.empty((len(self.uids), h))
+            for step in range(h):
+                X = [buffer_features(buffer, self.lags_, self.windows_)]
+                X += self._extra_features(
+                    ds[:, step], None if exog is None else exog[:, step]
+                )
+                predictions[:, step] = m.regressor_.predict(np.column_stack(X))
+                buffer[:, :-1] = buffer[:, 1:]
+                buffer[:, -1] = predictions[:, step]
+            name = str(m)
+            forecast[name] = (predictions * std + mean).ravel()
+            for l in level or []:
+                width = m.residual_quantiles_[int(round(l * 10))]
+                spread = (width * std * np.sqrt(np.arange(1, h + 1))).ravel()
+                forecast[f"{name}-lo-{l}"] = forecast[name] - spread
+                forecast[f"{name}-hi-{l}"] = forecast[name] + spread
+        return pd.DataFrame(forecast)
+
+    def cross_validation(self, df, h, n_windows=1, step_size=1):
+        """Refit at n_windows rolling cutoffs and forecast h steps from each"""
+        grouped = df.groupby("unique_id", sort=False, observed=True)
+        position = grouped.cumcount().to_numpy()
+        size = grouped["y"].transform("size").to_numpy()
+        frames = []
+        for window in range(n_windows):
+            offset = h + (n_windows - 1 - window) * step_size
+            train = df[position < size - offset]
+            test = df[(position >= size - offset) & (position < size - offset + h)]
+            X_df = test[["unique_id", "ds"] + exog_columns(df)] if exog_columns(df) else None
+            forecast_df = self.fit(train).predict(h, X_df=X_df)
+            cutoffs = train.groupby("unique_id", sort=False, observed=True)["ds"].max()
+            forecast_df["cutoff"] = forecast_df["unique_id"].map(cutoffs)
+            forecast_df["unique_id"] = forecast_df["unique_id"].astype(str)
+            actual = test[["unique_id", "ds", "y"]].assign(
+                unique_id=test["unique_id"].astype(str)
+            )
+            frames.append(forecast_df.merge(actual, on=["unique_id", "ds"], how="inner"))
+        return pd.concat(frames, ignore_index=True)
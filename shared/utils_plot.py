@@ -0,0 +1,195 @@
+import streamlit as st
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from shared.utils_profiling import timed
+
+
+PLOT_POINTS = int(os.environ.get("PLOT_POINTS", "2000"))
+PLOT_CACHE_ENTRIES = 64
+
+
+@st.cache_resource
+def get_plot_cache():
+    """Return the downsampling cache shared by all sessions of this server process"""
+    return {"entries": OrderedDict(), "lock": threading.Lock()}
+
+
+def _numeric_x(x):
+    """Map x values onto numbers so that triangle areas can be computed"""
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").view(np.int64).astype(np.float64)
+    if np.issubdtype(x.dtype, np.number):
+        return x.astype(np.float64)
+    return np.arange(len(x), dtype=np.float64)
+
+
+def minmax_indices(y, n_buckets):
+    """Pick the minimum and maximum of every bucket in one vectorized pass"""
+    n = len(y)
+    bucket_size = int(np.ceil(n / n_buckets))
+    padded = np.full(bucket_size * n_buckets, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(n_buckets, bucket_size)
+    valid = ~np.isnan(buckets).all(axis=1)
+    offsets = np.arange(n_buckets) * bucket_size
+    lows = np.nanargmin(np.where(valid[:, None], buckets, 0), axis=1) + offsets
+    highs = np.nanargmax(np.where(valid[:, None], buckets, 0), axis=1) + offsets
+    indices = np.unique(np.concatenate([lows[valid], highs[valid], [0, n - 1]]))
+    return indices[indices < n]
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets selection, vectorized within each bucket"""
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[stop:next_stop].mean() if next_stop > stop else x[-1]
+        next_y = y[stop:next_stop].mean() if next_stop > stop else y[-1]
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample_indices(x, y, n_out=PLOT_POINTS, method="minmax-lttb"):
+    """Reduce a trace to roughly n_out points.
+
+    ``minmax-lttb`` preselects the minimum and maximum of 2 * n_out buckets and runs
+    LTTB on that small subset, which keeps spikes visible at a fraction of the cost.
+    """
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    if method == "minmax":
+        return minmax_indices(y, max(n_out // 2, 1))
+    x = _numeric_x(np.asarray(x))
+    candidates = np.arange(n)
+    if method == "minmax-lttb" and n > 4 * n_out:
+        candidates = minmax_indices(y, 2 * n_out)
+    return candidates[lttb_indices(x[candidates], y[candidates], n_out)]
+
+
+def _array_bytes(values):
+    """The raw buffer of a numeric array, or a hash of every value of an object array"""
+    if values.dtype == object:
+        return pd.util.hash_array(values).tobytes()
+    return np.ascontiguousarray(values).tobytes()
+
+
+def _fingerprint(x, y, window, n_out):
+    """Content key over every timestamp and value, so edited data never hits a stale trace"""
+    digest = hashlib.sha1(_array_bytes(y))
+    digest.update(_array_bytes(x))
+    digest.update(repr((len(y), window, n_out)).encode())
+    return digest.hexdigest()
+
+
+def downsample_trace(x, y, window=None, n_out=PLOT_POINTS):
+    """Return the x/y arrays to draw for a trace, restricted to an optional zoom window"""
+    x = pd.Series(x).to_numpy()
+    y = pd.Series(y).to_numpy()
+    if window is not None and len(x):
+        start, end = window
+        if np.issubdtype(x.dtype, np.datetime64):
+            start, end = np.datetime64(pd.Timestamp(start)), np.datetime64(pd.Timestamp(end))
+        lo, hi = np.searchsorted(x, [start, end], side="left")
+        x, y = x[max(lo - 1, 0) : hi + 1], y[max(lo - 1, 0) : hi + 1]
+    if len(y) <= n_out:
+        return x, y
+
+    key = _fingerprint(x, y, window, n_out)
+    cache = get_plot_cache()
+    with cache["lock"]:
+        if key in cache["entries"]:
+            cache["entries"].move_to_end(key)
+            return cache["entries"][key]
+    indices = downsample_indices(x, y, n_out)
+    result = (x[indices], y[indices])
+    with cache["lock"]:
+        cache["entries"][key] = result
+        while len(cache["entries"]) > PLOT_CACHE_ENTRIES:
+            cache["entries"].popitem(last=False)
+    return result
+
+
+def _widget_key(chart_key):
+    """Charts get a fresh widget key on every zoom reset, which clears the selection"""
+    return f"{chart_key}_{st.session_state.get(f'{chart_key}_version', 0)}"
+
+
+def zoom_window(chart_key):
+    """Read the x range of a box selection on a chart as the zoom window"""
+    chart = st.session_state.get(_widget_key(chart_key))
+    try:
+        box = chart.selection.box[0]
+        start, end = sorted(box["x"][:2])
+        return start, end
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+@timed
+def render_zoomable_chart(fig, chart_key):
+    """Show a chart whose box selection re-fetches that window at higher resolution"""
+    st.plotly_chart(
+        fig,
+        use_container_width=True,
+        key=_widget_key(chart_key),
+        on_select="rerun",
+        selection_mode="box",
+    )
+    if zoom_window(chart_key) is not None:
+        st.caption("Showing the selected window at higher resolution.")
+        if st.button("Reset Zoom", key=f"{chart_key}_reset"):
+            version_key = f"{chart_key}_version"
+            st.session_state[version_key] = st.session_state.get(version_key, 0) + 1
+            st.rerun()
+    else:
+        st.caption("Use box select to re-fetch a window at higher resolution.")
+
+
+def interval_levels(df, model):
+    """Levels of the prediction intervals of model present in df, widest first"""
+    prefix = f"{model}-lo-"
+    levels = [column[len(prefix) :] for column in df.columns if column.startswith(prefix)]
+    return sorted(levels, key=float, reverse=True)
+
+
+def add_interval_bands(fig, df, model, rgb="128, 0, 128"):
+    """Shade the prediction intervals of model, the narrower bands drawn on top"""
+    for level in interval_levels(df, model):
+        fig.add_scatter(
+            x=df["ds"],
+            y=df[f"{model}-hi-{level}"],
+            mode="lines",
+            line=dict(width=0),
+            showlegend=False,
+            name=f"{level}% upper",
+        )
+        fig.add_scatter(
+            x=df["ds"],
+            y=df[f"{model}-lo-{level}"],
+            mode="lines",
+            line=dict(width=0),
+            fill="tonexty",
+            fillcolor=f"rgba({rgb}, 0.15)",
+            name=f"{level}% interval",
+        )
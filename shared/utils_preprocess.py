@@ -0,0 +1,182 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import Tick
+
+from shared.utils_profiling import timed
+from shared.utils_upload import load_canonical_series, validate_series
+
+
+AGGREGATIONS = ["mean", "sum", "last", "max"]
+FILL_METHODS = {"Off": None, "Forward": "ffill", "Interpolate": "interpolate", "Zero": "zero"}
+OUTLIER_THRESHOLD = 5.0
+# Scales the median absolute deviation to a standard deviation for normal data
+MAD_SCALE = 1.4826
+
+
+def value_columns(data):
+    """The target and any regressor columns"""
+    return [col for col in data.columns if col not in ("unique_id", "ds")]
+
+
+def resample(data, freq, agg="mean"):
+    """Aggregate every series onto bins of freq in one grouped pass.
+
+    Regressors are aggregated like the target. Only bins that contain data are
+    returned; empty bins are left to fill_missing.
+    """
+    columns = value_columns(data)
+    grouped = data.groupby(
+        ["unique_id", pd.Grouper(key="ds", freq=freq)], observed=True, sort=True
+    )[columns]
+    resampled = grouped.agg(agg).reset_index()
+    return resampled.astype({col: data[col].dtype for col in columns})
+
+
+def regular_grid(data, freq):
+    """Every timestamp of freq between the first and last value of each series"""
+    bounds = data.groupby("unique_id", observed=True, sort=True)["ds"].agg(["min", "max"])
+    offset = to_offset(freq)
+    if isinstance(offset, Tick):
+        step = pd.Timedelta(offset).value
+        starts = bounds["min"].to_numpy().view(np.int64)
+        counts = (bounds["max"].to_numpy().view(np.int64) - starts) // step + 1
+        # Position of every row within its series, without a Python loop
+        positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        ds = (np.repeat(starts, counts) + positions * step).view("datetime64[ns]")
+    else:
+        ranges = [pd.date_range(lo, hi, freq=offset) for lo, hi in bounds.to_numpy()]
+        counts = np.array([len(r) for r in ranges])
+        ds = np.concatenate([r.to_numpy() for r in ranges]) if ranges else []
+    unique_id = pd.Categorical.from_codes(
+        np.repeat(bounds.index.codes, counts), dtype=data["unique_id"].dtype
+    )
+    return pd.DataFrame({"unique_id": unique_id, "ds": ds})
+
+
+def fill_missing(data, freq, method):
+    """Insert the missing timestamps of freq and fill their values.
+
+    ``ffill`` repeats the last value, ``interpolate`` interpolates linearly in time
+    and ``zero`` inserts zeros. Values before the first observation of a series
+    take its first value. Timestamps off the grid are kept.
+    """
+    data = data.merge(regular_grid(data, freq), on=["unique_id", "ds"], how="outer", sort=True)
+    codes = data["unique_id"].cat.codes.to_numpy()
+    for col in value_columns(data):
+        data[col] = fill_column(data, codes, col, method)
+    return data
+
+
+def fill_column(data, codes, col, method):
+    """Fill the NaNs of one value column series by series, keeping its dtype"""
+    y = data[col].to_numpy(dtype=np.float64)
+    missing = np.isnan(y)
+    if not missing.any():
+        return data[col]
+    grouped = data.groupby(codes, sort=False)[col]
+    if method == "zero":
+        filled = np.where(missing, 0.0, y)
+    elif method == "ffill":
+        filled = grouped.ffill().fillna(grouped.bfill()).to_numpy(dtype=np.float64)
+    else:
+        ticks = pd.Series(np.where(missing, np.nan, data["ds"].to_numpy().view(np.int64)))
+        by_series = ticks.groupby(codes, sort=False)
+        previous_t, next_t = by_series.ffill().to_numpy(), by_series.bfill().to_numpy()
+        previous_y = grouped.ffill().to_numpy(dtype=np.float64)
+        next_y = grouped.bfill().to_numpy(dtype=np.float64)
+        t = data["ds"].to_numpy().view(np.int64).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = (t - previous_t) / (next_t - previous_t)
+        filled = previous_y + weight * (next_y - previous_y)
+        filled = np.where(np.isnan(previous_y), next_y, filled)
+        filled = np.where(np.isnan(next_y), previous_y, filled)
+        filled = np.where(missing, filled, y)
+    return filled.astype(data[col].dtype)
+
+
+def clip_outliers(data, threshold=OUTLIER_THRESHOLD):
+    """Clip values more than threshold robust standard deviations (MAD) from the
+    median of their series.
+
+    Series whose MAD is zero, such as intermittent demand, are left unclipped,
+    since their clip range would collapse onto the median.
+    """
+    grouped = data.groupby("unique_id", observed=True, sort=False)["y"]
+    median = grouped.transform("median")
+    deviation = (data["y"] - median).abs()
+    mad = deviation.groupby(data["unique_id"], observed=True, sort=False).transform("median")
+    spread = (threshold * MAD_SCALE * mad).where(mad > 0, np.inf)
+    return data.assign(
+        y=data["y"].clip(median - spread, median + spread).astype(data["y"].dtype)
+    )
+
+
+@timed
+def preprocess_series(data, freq=None, agg="mean", fill=None, clip=None):
+    """Resample, fill gaps and clip outliers of a canonical series frame.
+
+    Every step is optional. Gaps are filled at the resampling frequency, or at the
+    frequency detected in the data when it is not resampled.
+    """
+    if (freq or fill) and not np.issubdtype(data["ds"].dtype, np.datetime64):
+        raise ValueError("resampling and gap filling need a timestamp column")
+    if freq:
+        data = resample(data, freq, agg)
+    if fill:
+        report = validate_series(data)
+        fill_freq = freq or report["freq"]
+        if fill_freq is None and report["irregular"]:
+            raise ValueError("the timestamps are irregular, resample them before filling gaps")
+        if fill_freq is None:
+            raise ValueError("the frequency of the data could not be detected")
+        data = fill_missing(data, fill_freq, fill)
+    if clip:
+        data = clip_outliers(data, clip)
+    return data
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def load_preprocessed_series(dataset_id, x_col, y_col, id_col, preprocess, exog=()):
+    """Pre-processed series shared read-only across reruns and sessions, built once
+    per dataset, column selection and pre-processing configuration"""
+    data = load_canonical_series(dataset_id, x_col, y_col, id_col, exog)
+    return preprocess_series(data, **preprocess)
+
+
+def render_preprocess_sidebar(frequencies):
+    """Return the pre-processing configuration, or None if every step is off"""
+    st.sidebar.header("Pre-processing")
+    resample_to = st.sidebar.selectbox(
+        "Resample to",
+        ["Off"] + list(frequencies),
+        help="Aggregate the data onto a regular frequency before fitting.",
+    )
+    agg = "mean"
+    if resample_to != "Off":
+        agg = st.sidebar.selectbox("Aggregation", AGGREGATIONS)
+    fill = st.sidebar.selectbox(
+        "Fill gaps",
+        list(FILL_METHODS),
+        help="Insert missing timestamps and fill their values.",
+    )
+    clip = None
+    if st.sidebar.toggle("Clip outliers"):
+        clip = st.sidebar.number_input(
+            "Outlier threshold",
+            min_value=1.0,
+            value=OUTLIER_THRESHOLD,
+            help="Clip values more than this many robust standard deviations "
+            "(median absolute deviation) away from the median.",
+        )
+    st.sidebar.divider()
+    config = {
+        "freq": frequencies.get(resample_to),
+        "agg": agg,
+        "fill": FILL_METHODS[fill],
+        "clip": clip,
+    }
+    if not (config["freq"] or config["fill"] or config["clip"]):
+        return None
+    return config
@@ -0,0 +1,177 @@
+import streamlit as st
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import time
+from contextlib import contextmanager
+
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+
+PERF_LOG_PATH = os.environ.get("PERF_LOG_PATH", "")
+PERF_HISTORY_LIMIT = 500
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _row_count(args, kwargs):
+    """Rows of the first DataFrame or array argument, if there is one"""
+    for value in list(args) + list(kwargs.values()):
+        shape = getattr(value, "shape", None)
+        if shape:
+            return int(shape[0])
+    return None
+
+
+def _record(name, seconds, rows, memory_delta):
+    """Store a measurement in the session of the running script, if there is one"""
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return
+    record = {
+        "stage": name,
+        "seconds": round(seconds, 4),
+        "rows": rows,
+        "memory_delta_mb": None if memory_delta is None else round(memory_delta, 2),
+        "timestamp": time.time(),
+    }
+    st.session_state.setdefault("perf_records", []).append(record)
+    if PERF_LOG_PATH:
+        record = {"session": get_script_run_ctx().session_id, **record}
+        with open(PERF_LOG_PATH, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+@contextmanager
+def measure(name, rows=None):
+    """Time a block and record its duration, row count and memory delta"""
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        rss_after = current_rss_mb()
+        delta = None if rss_before is None or rss_after is None else rss_after - rss_before
+        _record(name, seconds, rows, delta)
+
+
+def timed(func):
+    """Decorator that measures every call of func as a stage named after it.
+
+    The row count is taken from the first DataFrame or array argument, or from the
+    result for stages such as loaders that take none. Calls that raise are recorded
+    too, with "(failed)" after the stage name.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        result, failed = None, True
+        try:
+            result = func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            seconds = time.perf_counter() - start
+            rss_after = current_rss_mb()
+            rows = _row_count(args, kwargs)
+            if rows is None:
+                rows = _row_count(result if isinstance(result, tuple) else (result,), {})
+            delta = None if rss_before is None or rss_after is None else rss_after - rss_before
+            name = f"{func.__name__} (failed)" if failed else func.__name__
+            _record(name, seconds, rows, delta)
+
+    return wrapper
+
+
+def start_profiling():
+    """Start a profiler for this rerun if the user enabled it in the Performance panel"""
+    # A rerun interrupted by st.rerun() never reached render_perf_sidebar
+    _stop_profiling()
+    profiler_name = st.session_state.get("perf_profiler", "Off")
+    if profiler_name == "cProfile":
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this interpreter
+            profiler = None
+    elif profiler_name == "pyinstrument" and pyinstrument is not None:
+        profiler = pyinstrument.Profiler()
+        profiler.start()
+    else:
+        profiler = None
+    st.session_state["perf_active_profiler"] = profiler
+
+
+def _stop_profiling():
+    """Stop the running profiler and return its report as text"""
+    profiler = st.session_state.pop("perf_active_profiler", None)
+    if profiler is None:
+        return None
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(30)
+        return output.getvalue()
+    profiler.stop()
+    return profiler.output_text(unicode=True)
+
+
+def render_perf_sidebar():
+    """Show this rerun's measurements in a collapsible panel and reset them"""
+    records = st.session_state.pop("perf_records", [])
+    report = _stop_profiling()
+    history = st.session_state.setdefault("perf_history", [])
+    history.extend(records)
+    del history[:-PERF_HISTORY_LIMIT]
+
+    with st.sidebar.expander("Performance"):
+        if records:
+            st.dataframe(
+                [
+                    {
+                        "Stage": r["stage"],
+                        "Seconds": r["seconds"],
+                        "Rows": r["rows"],
+                        "Memory Δ (MB)": r["memory_delta_mb"],
+                    }
+                    for r in records
+                ],
+                use_container_width=True,
+                hide_index=True,
+            )
+        else:
+            st.write("No instrumented calls in this run.")
+        profilers = ["Off", "cProfile"] + (["pyinstrument"] if pyinstrument else [])
+        st.selectbox(
+            "Profile next run",
+            profilers,
+            key="perf_profiler",
+            help="Captures a profile of the whole page on the next rerun.",
+        )
+        if report:
+            st.code(report, language=None)
+        st.download_button(
+            "Export timings (JSONL)",
+            "\n".join(json.dumps(r) for r in history),
+            file_name="timings.jsonl",
+            mime="application/json",
+        )
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+
+MODEL_REGISTRY_DIR = os.environ.get("MODEL_REGISTRY_DIR", ".model_registry")
+MODEL_REGISTRY_MAX_AGE_DAYS = float(os.environ.get("MODEL_REGISTRY_MAX_AGE_DAYS", "30"))
+MODEL_REGISTRY_MAX_MB = float(os.environ.get("MODEL_REGISTRY_MAX_MB", "2048"))
+
+_index_lock = threading.Lock()
+
+
+def _index_path():
+    return os.path.join(MODEL_REGISTRY_DIR, "index.json")
+
+
+def model_path(model_id):
+    return os.path.join(MODEL_REGISTRY_DIR, "models", f"{model_id}.pkl")
+
+
+def _read_index():
+    try:
+        with open(_index_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def _write_index(entries):
+    os.makedirs(MODEL_REGISTRY_DIR, exist_ok=True)
+    tmp_path = f"{_index_path()}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(entries, f, indent=1, default=str)
+    os.replace(tmp_path, _index_path())
+
+
+def data_fingerprint(dataset_id, x_axis, y_axis, id_axis=None):
+    """Identify the training data by the stored dataset and the selected columns.
+
+    Dataset ids are content hashes already, so nothing has to be rehashed.
+    """
+    digest = hashlib.sha256(repr((dataset_id, x_axis, y_axis, id_axis)).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def register_model(sf, entry):
+    """Persist a fitted StatsForecast object with its description and return its id.
+
+    ``entry`` holds the model name, fit configuration, data description and
+    metrics. The version counts previous fits of the same model on the same data;
+    refitting an identical configuration returns the existing id instead.
+    """
+    # Compare in the form the index stores, so numpy scalars match their JSON value
+    entry = json.loads(json.dumps(entry, default=str))
+    # One lock hold for the duplicate check, version and index update, so two
+    # sessions registering the same fit cannot both get a new version
+    with _index_lock:
+        entries = _read_index()
+        for existing in entries:
+            if all(existing[key] == entry[key] for key in ("name", "fingerprint", "config")):
+                existing["last_used"] = time.time()
+                _write_index(entries)
+                return existing["id"]
+
+        model_id = uuid.uuid4().hex[:12]
+        os.makedirs(os.path.dirname(model_path(model_id)), exist_ok=True)
+        tmp_path = f"{model_path(model_id)}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(sf, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, model_path(model_id))
+
+        version = 1 + max(
+            (
+                e["version"]
+                for e in entries
+                if e["name"] == entry["name"] and e["fingerprint"] == entry["fingerprint"]
+            ),
+            default=0,
+        )
+        now = time.time()
+        entries.append(
+            {
+                **entry,
+                "id": model_id,
+                "version": version,
+                "created": now,
+                "last_used": now,
+                "size_bytes": os.path.getsize(model_path(model_id)),
+            }
+        )
+        _write_index(entries)
+    collect_garbage(keep=model_id)
+    return model_id
+
+
+def list_models(fingerprint=None):
+    """Return the registry index, newest first, optionally for one dataset"""
+    entries = _read_index()
+    if fingerprint is not None:
+        entries = [e for e in entries if e["fingerprint"] == fingerprint]
+    return sorted(entries, key=lambda e: e["created"], reverse=True)
+
+
+def get_entry(model_id):
+    return next((e for e in _read_index() if e["id"] == model_id), None)
+
+
+def load_model(model_id):
+    """Unpickle a registered model and mark it as recently used"""
+    with open(model_path(model_id), "rb") as f:
+        sf = pickle.load(f)
+    with _index_lock:
+        entries = _read_index()
+        for entry in entries:
+            if entry["id"] == model_id:
+                entry["last_used"] = time.time()
+        _write_index(entries)
+    return sf
+
+
+def delete_model(model_id):
+    with _index_lock:
+        _write_index([e for e in _read_index() if e["id"] != model_id])
+    try:
+        os.remove(model_path(model_id))
+    except OSError:
+        pass
+
+
+def collect_garbage(
+    max_age_days=MODEL_REGISTRY_MAX_AGE_DAYS, max_mb=MODEL_REGISTRY_MAX_MB, keep=None
+):
+    """Drop models unused for max_age_days, then the least recently used beyond max_mb.
+
+    Returns the ids of the removed models.
+    """
+    now = time.time()
+    removed = []
+    with _index_lock:
+        entries = sorted(_read_index(), key=lambda e: e["last_used"])
+        total = sum(e["size_bytes"] for e in entries)
+        kept = []
+        for entry in entries:
+            expired = now - entry["last_used"] > max_age_days * 86400
+            if entry["id"] != keep and (expired or total > max_mb * 1024 * 1024):
+                total -= entry["size_bytes"]
+                removed.append(entry["id"])
+            else:
+                kept.append(entry)
+        if removed:
+            _write_index(kept)
+    for model_id in removed:
+        try:
+            os.remove(model_path(model_id))
+        except OSError:
+            pass
+    return removed
+
+
+def compare_models(entries):
+    """One row per fit with its configuration, metrics and fit time"""
+    rows = []
+    for e in entries:
+        config = e["config"]
+        rows.append(
+            {
+                "ID": e["id"],
+                "Model": e["name"],
+                "Version": e["version"],
+                "File": e["data"].get("filename"),
+                "Created": pd.Timestamp(e["created"], unit="s").floor("s"),
+                "Freq": config.get("freq"),
+                "Season Length": config.get("season_length"),
+                "Second Season": config.get("season_mstl"),
+                "Split (%)": config.get("split_ratio"),
+                "MAE": e["metrics"].get("mae"),
+                "R²": e["metrics"].get("r2"),
+                "MAPE": e["metrics"].get("mape"),
+                "Fit Time (s)": e.get("fit_seconds"),
+                "Size (KB)": round(e["size_bytes"] / 1024, 1),
+            }
+        )
+    return pd.DataFrame(rows).set_index("ID") if rows else pd.DataFrame()
@@ -0,0 +1,311 @@
+import streamlit as st
+import math
+import os
+import time
+from concurrent.futures import as_completed
+
+import numpy as np
+import pandas as pd
+
+from shared.utils_exog import exog_frame
+from shared.utils_fitting import (
+    align_forecast,
+    get_model,
+    return_imported_stat_models,
+    run_fit,
+)
+from shared.utils_jobs import get_job_manager
+
+
+SEARCH_MAX_CANDIDATES = int(os.environ.get("SEARCH_MAX_CANDIDATES", "24"))
+# The first round fits every candidate on this fraction of the most recent history
+SEARCH_SHORT_FRACTION = 0.25
+# Candidates whose first-round error exceeds the best by this factor stop early
+SEARCH_STOP_RATIO = 1.5
+ARIMA_ORDERS = [1, 2, 3, 5]
+SEASONAL_MODELS = {"AutoARIMA", "SeasonalNaive", "HoltWinters", "MSTL"}
+
+
+def arima_limits(order):
+    """AutoARIMA limits for a maximum non-seasonal order; seasonal orders stay at most 2"""
+    seasonal = min(order, 2)
+    return {"max_p": order, "max_q": order, "max_P": seasonal, "max_Q": seasonal}
+
+
+def describe_candidate(candidate):
+    seasons = [candidate["season_length"]]
+    if candidate["season_mstl"]:
+        seasons.append(candidate["season_mstl"])
+    text = f"{candidate['model']} (season {', '.join(map(str, seasons))}"
+    if candidate["arima_limits"]:
+        text += f", order ≤ {candidate['arima_limits']['max_p']}"
+    return text + ")"
+
+
+def search_candidates(models, season_lengths, arima_orders, max_season, max_candidates, seed=0):
+    """Every configuration of the models over the season lengths, MSTL season pairs
+    and AutoARIMA orders, or a random sample of max_candidates of them.
+
+    Season lengths above max_season, which would not repeat twice in the shortest
+    training series, are skipped.
+    """
+    seasons = sorted({int(s) for s in season_lengths if 1 <= s <= max_season}) or [1]
+    candidates = []
+    for model in models:
+        if model not in SEASONAL_MODELS:
+            candidates.append(
+                {"model": model, "season_length": 1, "season_mstl": 0, "arima_limits": None}
+            )
+            continue
+        for position, season in enumerate(seasons):
+            if model == "AutoARIMA":
+                candidates += [
+                    {
+                        "model": model,
+                        "season_length": season,
+                        "season_mstl": 0,
+                        "arima_limits": arima_limits(order),
+                    }
+                    for order in sorted(arima_orders) or [5]
+                ]
+                continue
+            candidates.append(
+                {"model": model, "season_length": season, "season_mstl": 0, "arima_limits": None}
+            )
+            if model == "MSTL":
+                candidates += [
+                    {
+                        "model": model,
+                        "season_length": season,
+                        "season_mstl": longer,
+                        "arima_limits": None,
+                    }
+                    for longer in seasons[position + 1 :]
+                ]
+    if len(candidates) > max_candidates:
+        rows = np.random.default_rng(seed).choice(len(candidates), max_candidates, replace=False)
+        candidates = [candidates[i] for i in sorted(rows)]
+    return candidates
+
+
+def _score_candidate(
+    candidate, training_data, testing_data, forecast_horizon, freq, level, X_df, keep_fit
+):
+    """Fit one candidate inside a worker process and return its holdout MAE"""
+    model = get_model(
+        candidate["model"],
+        candidate["season_length"],
+        candidate["season_mstl"],
+        candidate["arima_limits"],
+    )
+    start = time.perf_counter()
+    forecast_df, sf = run_fit(
+        model, training_data, forecast_horizon, freq, level=level, X_df=X_df
+    )
+    seconds = time.perf_counter() - start
+    aligned = align_forecast(forecast_df, testing_data, str(model))
+    mae = float(np.mean(np.abs(aligned["y"].to_numpy() - aligned["y_hat"].to_numpy())))
+    if not np.isfinite(mae):
+        mae = math.inf
+    return (mae, seconds, forecast_df, sf) if keep_fit else (mae, seconds, None, None)
+
+
+def shortest_series(data):
+    return int(data.groupby("unique_id", sort=False, observed=True).size().min())
+
+
+def recent_history(training_data, length):
+    return training_data.groupby("unique_id", sort=False, observed=True).tail(length)
+
+
+def _run_round(jobs, on_done):
+    """Submit (index, args) jobs to the shared process pool and hand every result,
+    or the exception, to on_done as it arrives"""
+    executor = get_job_manager()["executor"]
+    futures = {executor.submit(_score_candidate, *args): index for index, args in jobs}
+    for future in as_completed(futures):
+        try:
+            on_done(futures[future], future.result(), None)
+        except Exception as e:
+            on_done(futures[future], None, e)
+
+
+def run_search(candidates, training_data, testing_data, freq, level=None, progress=None):
+    """Score the candidates on the holdout in two rounds on the process pool.
+
+    The first round fits every candidate on the most recent SEARCH_SHORT_FRACTION
+    of the training data. Candidates more than SEARCH_STOP_RATIO times worse than
+    the best, and the worse half in any case, stop there; the rest are refit on
+    the full training data. Returns the results table, best first, and the best
+    candidate with its forecast, fitted model and fit time, or None.
+    """
+    shortest = shortest_series(training_data)
+    forecast_horizon = int(
+        testing_data.groupby("unique_id", sort=False, observed=True).size().max()
+    )
+    X_df = exog_frame(testing_data)
+    rows = [
+        {
+            "Candidate": describe_candidate(c),
+            "Short MAE": np.nan,
+            "MAE": np.nan,
+            "Seconds": 0.0,
+            "Status": "",
+        }
+        for c in candidates
+    ]
+    total_jobs = [len(candidates)]
+    finished = [0]
+    fits = {}
+
+    def report():
+        finished[0] += 1
+        if progress is not None:
+            progress.progress(
+                min(finished[0] / total_jobs[0], 1.0),
+                text=f"Search: {finished[0]} of {total_jobs[0]} fits done",
+            )
+
+    def on_done(index, result, error):
+        row = rows[index]
+        if error is not None:
+            row["Status"] = f"Failed: {error}"
+        else:
+            mae, seconds, forecast_df, sf = result
+            row["Seconds"] += round(seconds, 2)
+            if forecast_df is None:
+                row["Short MAE"] = round(mae, 4)
+            else:
+                row["MAE"] = round(mae, 4)
+                fits[index] = {
+                    "candidate": candidates[index],
+                    "forecast": forecast_df,
+                    "sf": sf,
+                    "seconds": seconds,
+                }
+        report()
+
+    # Round one: short history, or the full history when a short one would not
+    # hold enough seasons
+    short_jobs, full = [], []
+    for index, candidate in enumerate(candidates):
+        seasons = max(candidate["season_length"], candidate["season_mstl"])
+        length = max(int(shortest * SEARCH_SHORT_FRACTION), 3 * seasons + 1)
+        if length >= shortest:
+            full.append(index)
+            continue
+        short_jobs.append(
+            (
+                index,
+                (
+                    candidate,
+                    recent_history(training_data, length),
+                    testing_data,
+                    forecast_horizon,
+                    freq,
+                    None,
+                    X_df,
+                    False,
+                ),
+            )
+        )
+    _run_round(short_jobs, on_done)
+
+    scored = [i for i, _ in short_jobs if not rows[i]["Status"]]
+    if scored:
+        scores = np.array([rows[i]["Short MAE"] for i in scored])
+        keep = max(math.ceil(len(scored) / 2), 1)
+        threshold = min(np.sort(scores)[keep - 1], scores.min() * SEARCH_STOP_RATIO)
+        for i, score in zip(scored, scores):
+            if score <= threshold:
+                full.append(i)
+            else:
+                rows[i]["Status"] = "Stopped early"
+    total_jobs[0] += len(full)
+
+    _run_round(
+        [
+            (
+                index,
+                (
+                    candidates[index],
+                    training_data,
+                    testing_data,
+                    forecast_horizon,
+                    freq,
+                    level or None,
+                    X_df,
+                    True,
+                ),
+            )
+            for index in full
+        ],
+        on_done,
+    )
+    for index in full:
+        if not rows[index]["Status"]:
+            rows[index]["Status"] = "Completed"
+    best = None
+    if fits:
+        # Ties go to the faster fit
+        index = min(fits, key=lambda i: (rows[i]["MAE"], rows[i]["Seconds"]))
+        rows[index]["Status"] = "Best"
+        best = fits[index]
+
+    results = pd.DataFrame(rows).sort_values(
+        ["MAE", "Short MAE", "Seconds"], ignore_index=True
+    )
+    results.index = results.index + 1
+    results.index.name = "Rank"
+    return results, best
+
+
+def render_search_sidebar(settings, season_length):
+    """Return the search configuration, or None if the search is off"""
+    st.sidebar.divider()
+    st.sidebar.header("Hyperparameter Search")
+    if not st.sidebar.toggle(
+        "Search hyperparameters",
+        help="Fit many configurations in worker processes and keep the one with "
+        "the lowest error on the test data.",
+    ):
+        return None
+    models = st.sidebar.multiselect(
+        "Models to search",
+        return_imported_stat_models(),
+        default=return_imported_stat_models(),
+    )
+    detected = (settings or {}).get("season_lengths", [])
+    default = sorted({int(season_length), *detected})
+    seasons = st.sidebar.text_input(
+        "Season lengths",
+        ", ".join(map(str, default)),
+        help="Comma separated. MSTL is also tried with every pair of them.",
+    )
+    try:
+        season_lengths = [int(s) for s in seasons.replace(" ", "").split(",") if s]
+    except ValueError:
+        st.sidebar.error("Season lengths must be whole numbers separated by commas.")
+        return None
+    arima_orders = []
+    if "AutoARIMA" in models:
+        arima_orders = st.sidebar.multiselect(
+            "AutoARIMA max order",
+            ARIMA_ORDERS,
+            default=[2, 5],
+            help="Largest AR and MA order AutoARIMA may choose; lower is faster.",
+        )
+    max_candidates = st.sidebar.number_input(
+        "Max candidates",
+        min_value=1,
+        value=SEARCH_MAX_CANDIDATES,
+        help="Larger grids are searched on a random sample of this many candidates.",
+    )
+    if not models:
+        return None
+    return {
+        "models": models,
+        "season_lengths": season_lengths,
+        "arima_orders": arima_orders,
+        "max_candidates": int(max_candidates),
+    }
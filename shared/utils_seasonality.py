@@ -0,0 +1,247 @@
+import streamlit as st
+import numpy as np
+
+from shared.utils_plot import downsample_trace
+
+
+DETECT_POINTS = 16_384
+REFINE_POINTS = 1 << 22
+# The ACF must fall at least this far below a period's peak within the period
+SEASON_DIP = 0.2
+DECOMPOSITION_METHODS = ["Fast", "STL", "MSTL", "Classical"]
+
+
+def block_average(y, max_points=DETECT_POINTS):
+    """Average consecutive blocks so that at most max_points remain, returning the block size"""
+    y = np.asarray(y, dtype=np.float64)
+    block = max(int(np.ceil(len(y) / max_points)), 1)
+    usable = (len(y) // block) * block
+    return y[:usable].reshape(-1, block).mean(axis=1), block
+
+
+def fill_gaps(y):
+    """Linearly interpolate NaNs so FFT and decomposition see a continuous signal"""
+    y = np.asarray(y, dtype=np.float64)
+    missing = np.isnan(y)
+    if missing.all():
+        return np.zeros_like(y)
+    if missing.any():
+        positions = np.arange(len(y))
+        y = y.copy()
+        y[missing] = np.interp(positions[missing], positions[~missing], y[~missing])
+    return y
+
+
+def autocorrelation(y):
+    """Autocorrelation of all lags at once via the FFT"""
+    y = y - y.mean()
+    n = len(y)
+    spectrum = np.fft.rfft(y, n=2 * n)
+    acf = np.fft.irfft(spectrum * np.conj(spectrum))[:n]
+    return acf / acf[0] if acf[0] > 0 else acf
+
+
+def detrend(y):
+    """Remove the least-squares line, which would otherwise dominate spectrum and ACF"""
+    positions = np.arange(len(y))
+    return y - np.polyval(np.polyfit(positions, y, 1), positions)
+
+
+def spectral_periods(view, top_k):
+    """Dominant periods of an evenly sampled view, in samples of that view.
+
+    Periodogram peaks are snapped onto the nearest ACF peak. Returns (period, ACF
+    at the period) pairs, strongest spectral peak first.
+    """
+    n = len(view)
+    if n < 8:
+        return []
+    detrended = detrend(view)
+    power = np.abs(np.fft.rfft(detrended)) ** 2
+    frequencies = np.fft.rfftfreq(n)
+    acf = autocorrelation(detrended)
+
+    # Only periods that repeat at least twice and span more than two samples
+    valid = (frequencies > 0) & (frequencies <= 0.5) & (1 / np.maximum(frequencies, 1e-12) <= n / 2)
+    candidates = np.flatnonzero(valid)
+    candidates = candidates[np.argsort(power[candidates])[::-1]]
+
+    periods = []
+    for index in candidates[: top_k * 10]:
+        # Snap the spectral peak onto the nearest ACF peak
+        width = max(1, int(round(1 / frequencies[index])) // 10)
+        lo = max(int(round(1 / frequencies[index])) - width, 2)
+        hi = min(int(round(1 / frequencies[index])) + width + 1, n)
+        if lo >= hi:
+            continue
+        period = lo + int(np.argmax(acf[lo:hi]))
+        is_peak = period + 1 < n and acf[period - 1] < acf[period] >= acf[period + 1]
+        known = [p for p, _ in periods]
+        if not is_peak or acf[period] <= 0.1 or any(abs(period - p) <= max(1, p // 10) for p in known):
+            continue
+        # A season dips between repeats; a smooth leftover curve only decays
+        if acf[period] - acf[1:period].min() < SEASON_DIP:
+            continue
+        # A multiple of a known period only counts if it correlates clearly better
+        if any(
+            min(period % p, p - period % p) <= max(1, p // 10) and acf[period] < acf[p] + 0.05
+            for p in known
+        ):
+            continue
+        periods.append((period, float(acf[period])))
+        if len(periods) == top_k:
+            break
+    return periods
+
+
+def detect_periods(y, top_k=2, max_points=DETECT_POINTS):
+    """Find the dominant season lengths from the periodogram, confirmed by the ACF.
+
+    Periods up to ``max_points / 2`` are searched at full resolution on the first
+    ``max_points`` values, so block averaging never blurs short seasons. Longer
+    series are also searched on a block-averaged view of at most ``max_points``
+    values for the periods too long for that prefix, which are then refined at
+    full resolution and ranked after the short ones. Returns periods sorted by
+    strength, possibly empty if the series has no clear seasonality.
+    """
+    y = fill_gaps(y)
+    found = spectral_periods(y[:max_points], top_k)
+    if len(y) > max_points:
+        view, block = block_average(y, max_points)
+        found += [
+            (refine_period(y, period * block, block), strength)
+            for period, strength in spectral_periods(view, top_k)
+            if period * block > max_points // 2
+        ]
+    return [period for period, _ in found[:top_k]]
+
+
+def refine_period(y, period, block):
+    """Recover the exact lag lost to block averaging from a full-resolution ACF"""
+    if block == 1:
+        return period
+    segment = fill_gaps(y[: min(len(y), max(REFINE_POINTS // 4, 8 * period), REFINE_POINTS)])
+    acf = autocorrelation(detrend(segment))
+    lo, hi = max(period - block, 2), min(period + block + 1, len(acf))
+    if lo >= hi:
+        return period
+    return lo + int(np.argmax(acf[lo:hi]))
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_periods(dataset_id, series_key, _y):
+    """Memoize period detection per dataset and column"""
+    return detect_periods(_y)
+
+
+def moving_average(y, window):
+    """Centered moving average via cumulative sums, edges held at the nearest value"""
+    window = max(int(window), 1)
+    if window >= len(y):
+        return np.full_like(y, y.mean())
+    if window == 1:
+        return y.copy()
+    cumsum = np.concatenate([[0.0], np.cumsum(y)])
+    averaged = (cumsum[window:] - cumsum[:-window]) / window
+    trend = np.empty_like(y)
+    offset = (window - 1) // 2
+    trend[offset : offset + len(averaged)] = averaged
+    trend[:offset] = averaged[0]
+    trend[offset + len(averaged) :] = averaged[-1]
+    return trend
+
+
+def fast_decompose(y, periods, iterations=2):
+    """Vectorized multi-seasonal decomposition.
+
+    The trend is a moving average over the longest period, and every seasonal
+    component is the mean of the detrended values per phase (one bincount each).
+    """
+    positions = np.arange(len(y))
+    trend = moving_average(y, periods[-1])
+    seasonals = {period: np.zeros_like(y) for period in periods}
+    for _ in range(iterations):
+        for period in periods:
+            others = sum(seasonals[p] for p in periods if p != period)
+            remainder = y - trend - others
+            phase = positions % period
+            profile = np.bincount(phase, weights=remainder, minlength=period)
+            profile /= np.bincount(phase, minlength=period)
+            seasonals[period] = (profile - profile.mean())[phase]
+        trend = moving_average(y - sum(seasonals.values()), periods[-1])
+    seasonal = sum(seasonals.values())
+    return {
+        "observed": y,
+        "trend": trend,
+        "seasonal": seasonal,
+        "residual": y - trend - seasonal,
+    }
+
+
+def decompose(y, periods, method="Fast"):
+    """Split a series into trend, seasonal and residual components.
+
+    STL and MSTL estimate the trend and the seasonal smoother on every ``jump``-th
+    point only and interpolate in between, which trades resolution for speed.
+    """
+    y = fill_gaps(y)
+    periods = sorted(int(p) for p in periods if 2 <= p <= len(y) // 2)
+    if not periods:
+        raise ValueError("The series is too short for the selected season length")
+
+    if method == "Fast":
+        return fast_decompose(y, periods)
+
+    # statsmodels takes seconds to import and is only needed off the default path
+    from statsmodels.tsa.seasonal import MSTL, STL, seasonal_decompose
+
+    if method == "Classical":
+        result = seasonal_decompose(y, model="add", period=periods[0])
+        return {
+            "observed": result.observed,
+            "trend": result.trend,
+            "seasonal": result.seasonal,
+            "residual": result.resid,
+        }
+
+    jump = max(periods[0] // 10, 1)
+    stl_kwargs = {"seasonal_jump": jump, "trend_jump": jump, "low_pass_jump": jump}
+    if method == "MSTL" and len(periods) > 1:
+        result = MSTL(y, periods=periods, stl_kwargs=stl_kwargs).fit()
+        seasonal = np.asarray(result.seasonal)
+        seasonal = seasonal.sum(axis=1) if seasonal.ndim > 1 else seasonal
+    else:
+        result = STL(y, period=periods[0], **stl_kwargs).fit()
+        seasonal = np.asarray(result.seasonal)
+    return {
+        "observed": y,
+        "trend": np.asarray(result.trend),
+        "seasonal": seasonal,
+        "residual": np.asarray(result.resid),
+    }
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def cached_decomposition(dataset_id, series_key, periods, method, _y):
+    """Memoize the decomposition per dataset, column, periods and method"""
+    return decompose(_y, periods, method)
+
+
+def decomposition_plot(x, components):
+    """Plot each component in its own row, sharing the x axis"""
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(
+        rows=len(components),
+        cols=1,
+        shared_xaxes=True,
+        subplot_titles=[name.capitalize() for name in components],
+        vertical_spacing=0.05,
+    )
+    for row, (name, values) in enumerate(components.items(), start=1):
+        trace_x, trace_y = downsample_trace(x, values)
+        fig.add_scatter(x=trace_x, y=trace_y, mode="lines", name=name, row=row, col=1)
+    fig.update_layout(
+        title="Decomposed Time Series", height=200 * len(components), showlegend=False
+    )
+    return fig
@@ -0,0 +1,132 @@
+"""Summary statistics computed in one streaming pass over a dataset's chunks.
+
+Count, mean and standard deviation are merged chunk by chunk with the parallel
+variance formula, so no chunk is visited twice. Quantiles come from a KLL-style
+compacting sketch whose memory is bounded by SKETCH_SIZE values per level.
+"""
+import numpy as np
+import pandas as pd
+
+
+SKETCH_SIZE = 4096
+SUMMARY_QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+class QuantileSketch:
+    """Approximate quantiles of a stream of values.
+
+    Level i holds values that each stand for 2**i inputs. When a level grows
+    beyond SKETCH_SIZE values it is sorted and every other value, from a random
+    offset, moves up a level, halving its size.
+    """
+
+    def __init__(self, size=SKETCH_SIZE, seed=0):
+        self.size = size
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.size:
+                items = np.sort(items)
+                # An odd value out stays behind, so the weights still add up
+                even = len(items) - len(items) % 2
+                self.levels[level] = items[even:]
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                promoted = items[self.rng.integers(2) : even : 2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def quantiles(self, qs):
+        values = np.concatenate(self.levels)
+        if not len(values):
+            return np.full(len(qs), np.nan)
+        weights = np.concatenate(
+            [np.full(len(items), 2.0**level) for level, items in enumerate(self.levels)]
+        )
+        order = np.argsort(values, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side="left")
+        return values[order][np.minimum(positions, len(values) - 1)]
+
+
+class ColumnSummary:
+    """Running statistics of one column"""
+
+    def __init__(self):
+        self.count = 0
+        self.missing = 0
+        self.numeric = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.sketch = QuantileSketch()
+
+    def update(self, series):
+        self.count += int(series.notna().sum())
+        self.missing += int(series.isna().sum())
+        if not pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            return
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        values = values[np.isfinite(values)]
+        n = len(values)
+        if not n:
+            return
+        mean = values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        # Chan et al.: merge the chunk's mean and squared deviations into the totals
+        total = self.numeric + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta**2 * self.numeric * n / total
+        self.numeric = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.sketch.update(values)
+
+    def result(self):
+        result = {"count": self.count, "missing": self.missing}
+        if not self.numeric:
+            return result
+        result.update(
+            mean=self.mean,
+            std=np.sqrt(self.m2 / (self.numeric - 1)) if self.numeric > 1 else np.nan,
+            min=self.min,
+            max=self.max,
+        )
+        quantiles = self.sketch.quantiles(SUMMARY_QUANTILES)
+        result.update({f"{q:.0%}": float(v) for q, v in zip(SUMMARY_QUANTILES, quantiles)})
+        return {key: float(value) for key, value in result.items()}
+
+
+class StreamingSummary:
+    """Statistics of every column of a chunked dataset"""
+
+    def __init__(self):
+        self.columns = {}
+
+    def update(self, chunk):
+        for col in chunk.columns:
+            self.columns.setdefault(col, ColumnSummary()).update(chunk[col])
+
+    def track(self, chunks):
+        """Pass the chunks through unchanged while summarizing them"""
+        for chunk in chunks:
+            self.update(chunk)
+            yield chunk
+
+    def result(self):
+        return {col: summary.result() for col, summary in self.columns.items()}
+
+
+def summary_frame(summary, columns):
+    """The statistics of the columns as a table shaped like DataFrame.describe()"""
+    frame = pd.DataFrame({col: summary.get(col, {}) for col in columns})
+    order = ["count", "missing", "mean", "std", "min"]
+    order += [f"{q:.0%}" for q in SUMMARY_QUANTILES] + ["max"]
+    return frame.reindex([row for row in order if row in frame.index])
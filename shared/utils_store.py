@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import time
+
+import pyarrow as pa
+
+
+DATASET_STORE_DIR = os.environ.get("DATASET_STORE_DIR", ".dataset_store")
+DATASET_STORE_TTL_HOURS = float(os.environ.get("DATASET_STORE_TTL_HOURS", "24"))
+DATASET_STORE_MAX_MB = float(os.environ.get("DATASET_STORE_MAX_MB", "4096"))
+
+HASH_BLOCK_BYTES = 8 * 1024 * 1024
+
+
+def hash_upload(file):
+    """Hash the raw upload in fixed-size blocks to identify duplicate files"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for block in iter(lambda: file.read(HASH_BLOCK_BYTES), b""):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()[:32]
+
+
+def dataset_path(dataset_id):
+    return os.path.join(DATASET_STORE_DIR, f"{dataset_id}.arrow")
+
+
+def summary_path(dataset_id):
+    return os.path.join(DATASET_STORE_DIR, f"{dataset_id}.summary.json")
+
+
+def has_dataset(dataset_id):
+    return dataset_id is not None and os.path.exists(dataset_path(dataset_id))
+
+
+def _touch(path):
+    """Refresh the modification time, which doubles as the LRU timestamp"""
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def _stable_schema(table):
+    """Widen types that later chunks could contradict (ints gaining NaNs, all-null columns)"""
+    fields = []
+    for field in table.schema:
+        if pa.types.is_integer(field.type):
+            field = field.with_type(pa.float64())
+        elif pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        fields.append(field)
+    return pa.schema(fields)
+
+
+def _conform(chunk, schema):
+    """The chunk as an Arrow table of schema, and schema itself.
+
+    Columns the chunk contradicts, such as text in a column that was numeric so
+    far, are widened to strings; the returned schema then differs.
+    """
+    try:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed Python objects in a column; read them as text
+        mixed = {col: "string" for col in chunk.columns if chunk[col].dtype == object}
+        table = pa.Table.from_pandas(chunk.astype(mixed), preserve_index=False)
+    fields = []
+    for field in schema:
+        try:
+            table[field.name].cast(field.type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            field = field.with_type(pa.string())
+        fields.append(field)
+    widened = pa.schema(fields)
+    return table.select(widened.names).cast(widened), widened
+
+
+def _widen(tmp_path, schema):
+    """Copy the batches written so far into a new file of the widened schema and
+    return its path and an open writer to continue with"""
+    new_path = f"{tmp_path}.w"
+    writer = pa.ipc.new_file(new_path, schema)
+    try:
+        with pa.memory_map(tmp_path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = pa.Table.from_batches([reader.get_record_batch(i)])
+                writer.write_table(batch.cast(schema))
+    except BaseException:
+        writer.close()
+        os.remove(new_path)
+        raise
+    os.remove(tmp_path)
+    return new_path, writer
+
+
+def write_dataset(dataset_id, chunks):
+    """Write DataFrame chunks to an Arrow IPC file without holding them all in memory"""
+    os.makedirs(DATASET_STORE_DIR, exist_ok=True)
+    path = dataset_path(dataset_id)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    writer = None
+    schema = None
+    try:
+        for chunk in chunks:
+            if schema is None:
+                schema = _stable_schema(pa.Table.from_pandas(chunk, preserve_index=False))
+                writer = pa.ipc.new_file(tmp_path, schema)
+            table, widened = _conform(chunk, schema)
+            if widened != schema:
+                writer.close()
+                writer = None
+                tmp_path, writer = _widen(tmp_path, widened)
+                schema = widened
+            writer.write_table(table)
+        if writer is None:
+            raise ValueError("The file does not contain any rows")
+        writer.close()
+        writer = None
+        os.replace(tmp_path, path)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    evict_datasets(keep=dataset_id)
+    return dataset_id
+
+
+def read_columns(dataset_id):
+    """Return the column names of a stored dataset without loading any data"""
+    with pa.memory_map(dataset_path(dataset_id)) as source:
+        return pa.ipc.open_file(source).schema.names
+
+
+def read_dataset(dataset_id, columns=None):
+    """Memory-map a stored dataset and materialize only the requested columns"""
+    path = dataset_path(dataset_id)
+    _touch(path)
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(list(dict.fromkeys(columns)))
+        return table.to_pandas()
+
+
+def count_rows(dataset_id):
+    """Number of rows of a stored dataset, from the file metadata only"""
+    with pa.memory_map(dataset_path(dataset_id)) as source:
+        reader = pa.ipc.open_file(source)
+        return sum(
+            reader.get_record_batch(i).num_rows for i in range(reader.num_record_batches)
+        )
+
+
+def read_rows(dataset_id, start, stop, columns=None):
+    """Materialize only the rows start:stop of a stored dataset"""
+    with pa.memory_map(dataset_path(dataset_id)) as source:
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(list(dict.fromkeys(columns)))
+        return table.slice(start, max(stop - start, 0)).to_pandas()
+
+
+def iter_dataset_chunks(dataset_id):
+    """Yield a stored dataset one record batch at a time"""
+    with pa.memory_map(dataset_path(dataset_id)) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            yield reader.get_record_batch(i).to_pandas()
+
+
+def write_summary(dataset_id, summary):
+    """Store the summary statistics of a dataset next to it"""
+    with open(summary_path(dataset_id), "w") as f:
+        json.dump(summary, f)
+
+
+def read_summary(dataset_id):
+    """Return the stored summary statistics of a dataset, or None"""
+    try:
+        with open(summary_path(dataset_id)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def evict_datasets(keep=None):
+    """Drop datasets past their TTL, then the least recently used beyond the size limit"""
+    if not os.path.isdir(DATASET_STORE_DIR):
+        return
+    now = time.time()
+    entries = []
+    for name in os.listdir(DATASET_STORE_DIR):
+        path = os.path.join(DATASET_STORE_DIR, name)
+        if name.endswith((".tmp", ".tmp.w")):
+            # Left behind by a writer that died; live writes are far younger than the TTL
+            try:
+                if now - os.stat(path).st_mtime > DATASET_STORE_TTL_HOURS * 3600:
+                    os.remove(path)
+            except OSError:
+                pass
+            continue
+        if not name.endswith(".arrow"):
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, name[: -len(".arrow")], path))
+
+    ttl_seconds = DATASET_STORE_TTL_HOURS * 3600
+    max_bytes = DATASET_STORE_MAX_MB * 1024 * 1024
+    entries.sort()
+    total = sum(size for _, size, _, _ in entries)
+    for mtime, size, dataset_id, path in entries:
+        if dataset_id == keep:
+            continue
+        if now - mtime > ttl_seconds or total > max_bytes:
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+            try:
+                os.remove(summary_path(dataset_id))
+            except OSError:
+                pass
@@ -1,34 +1,87 @@
 import streamlit as st
 import csv
-import plotly.express as px
+import numpy as np
 import pandas as pd
-from statsmodels.tsa.seasonal import seasonal_decompose 
-import matplotlib.pyplot as plt
+from pandas.tseries.api import guess_datetime_format
+from pandas.tseries.frequencies import to_offset
+
+from shared.utils_plot import downsample_trace
+from shared.utils_profiling import timed
+from shared.utils_seasonality import (
+    DECOMPOSITION_METHODS,
+    cached_decomposition,
+    cached_periods,
+    decomposition_plot,
+)
+from shared.utils_stats import StreamingSummary, summary_frame
+from shared.utils_store import (
+    count_rows,
+    has_dataset,
+    hash_upload,
+    iter_dataset_chunks,
+    read_dataset,
+    read_rows,
+    read_summary,
+    write_dataset,
+    write_summary,
+)
 
 
 ####### PAGE 1: Upload your Data #######
 
 
-def select_columns(dataframe):
+SNIFF_BYTES = 64 * 1024
+CHUNK_ROWS = 500_000
+DATE_SAMPLE_ROWS = 1000
+PREVIEW_ROWS = 100
+# float32 is used when its rounding moves no value by more than this share of the
+# column's standard deviation; large offsets such as meter readings keep float64
+FLOAT32_TOLERANCE = 1e-4
+
+
+def select_columns(columns):
+    columns = list(columns)
     x_axis = st.sidebar.selectbox(
         "**Select X-Axis**",
-        dataframe.columns,
+        columns,
         key="temp_x_axis",
-        index=dataframe.columns.tolist().index(
-            st.session_state.get("x_axis", dataframe.columns[0])
-        ),
+        index=columns.index(st.session_state.get("x_axis", columns[0])),
     )
     y_axis = st.sidebar.selectbox(
         "**Select Y-Axis**",
-        dataframe.columns,
+        columns,
         key="temp_y_axis",
-        index=dataframe.columns.tolist().index(
-            st.session_state.get("y_axis", dataframe.columns[1])
-        ),
+        index=columns.index(st.session_state.get("y_axis", columns[1])),
     )
     return x_axis, y_axis
 
 
+def select_series_layout(columns, x_axis, y_axis):
+    """Let the user pick how several series are laid out in the file"""
+    layout = st.sidebar.radio(
+        "**Series Layout**",
+        ["Single series", "ID column", "Multiple value columns"],
+        key="temp_series_layout",
+        help="""
+        - **Single series**: The Y-Axis column is one time series.
+        - **ID column**: A column identifies the series each row belongs to.
+        - **Multiple value columns**: Every selected column is its own series.
+        """,
+    )
+    id_axis = None
+    y_columns = None
+    others = [col for col in columns if col not in (x_axis, y_axis)]
+    if layout == "ID column" and others:
+        id_axis = st.sidebar.selectbox("**Select ID Column**", others)
+    elif layout == "Multiple value columns":
+        y_columns = st.sidebar.multiselect(
+            "**Select Value Columns**",
+            [col for col in columns if col != x_axis],
+            default=[y_axis],
+        ) or [y_axis]
+    return id_axis, y_columns
+
+
 def render_initial_main_content():
     # Instructions when no data is uploaded
     st.markdown(
@@ -52,72 +105,337 @@ def detect_delimiter(data_string):
         return ","
 
 
-def load_file(file):
-    """Load the file into a DataFrame."""
+def read_prefix(file, size=SNIFF_BYTES):
+    """Read a bounded prefix of the file, cut at the last complete line"""
+    file.seek(0)
+    prefix = file.read(size).decode("utf-8", errors="ignore")
+    file.seek(0)
+    if "\n" in prefix:
+        prefix = prefix[: prefix.rindex("\n") + 1]
+    return prefix
+
+
+def read_header(file):
+    """Detect the delimiter and column names from the start of the file only"""
     try:
-        data_string = file.getvalue().decode("utf-8")  # Decode file content
-        delimiter = detect_delimiter(data_string)
-        file.seek(0)  # Reset file pointer for reading
-        df = pd.read_csv(file, delimiter=delimiter)
-        return df
+        delimiter = detect_delimiter(read_prefix(file))
+        columns = pd.read_csv(file, delimiter=delimiter, nrows=0).columns.tolist()
+        file.seek(0)
+        return columns, delimiter
+    except Exception as e:
+        st.error(f"Error loading file: {e}")
+        return None, None
+
+
+def compact_float(values):
+    """Numeric values as float32 where that keeps their precision, else float64"""
+    values = np.asarray(values, dtype=np.float64)
+    single = values.astype(np.float32)
+    finite = np.isfinite(values)
+    if not finite.any():
+        return single
+    error = np.abs(single[finite].astype(np.float64) - values[finite]).max()
+    if error <= FLOAT32_TOLERANCE * values[finite].std():
+        return single
+    return values
+
+
+def downcast_column(series):
+    """Store numeric columns in the smallest float type that keeps their precision,
+    leave the rest untouched"""
+    numeric = pd.to_numeric(series, errors="coerce")
+    if numeric.notna().sum() < series.notna().sum():
+        return series
+    return pd.Series(compact_float(numeric), index=series.index, name=series.name)
+
+
+def iter_csv_chunks(file, delimiter=","):
+    """Yield the file in chunks of CHUNK_ROWS rows while updating a progress bar"""
+    file.seek(0)
+    total_size = max(getattr(file, "size", 0), 1)
+    progress = st.sidebar.progress(0.0, text="Reading file...")
+    for chunk in pd.read_csv(file, delimiter=delimiter, chunksize=CHUNK_ROWS):
+        yield chunk
+        done = min(file.tell() / total_size, 1.0)
+        progress.progress(done, text=f"Reading file... {done:.0%}")
+    progress.empty()
+
+
+@timed
+def ingest_file(file, delimiter=","):
+    """Stream the upload into the dataset store and return its dataset id.
+
+    Identical uploads share one stored dataset, so they are only parsed once.
+    """
+    try:
+        dataset_id = hash_upload(file)
+        if not has_dataset(dataset_id):
+            # Summarize the chunks on their way into the store, in the same pass
+            summary = StreamingSummary()
+            write_dataset(dataset_id, summary.track(iter_csv_chunks(file, delimiter)))
+            write_summary(dataset_id, summary.result())
+        return dataset_id
     except Exception as e:
         st.error(f"Error loading file: {e}")
         return None
 
 
-def transform_df_nixtla(df, x_col, y_col):
-    df_transformed = df[[x_col, y_col]].rename(columns={x_col: "ds", y_col: "y"})
-    df_transformed.insert(0, "unique_id", "time-analysis")
-    return df_transformed
+@timed
+def load_series(dataset_id, x_col, y_col, id_col=None, exog=()):
+    """Read only the selected columns of a stored dataset"""
+    y_cols = [y_col] if isinstance(y_col, str) else list(y_col)
+    columns = [x_col] + y_cols + ([id_col] if id_col else []) + list(exog)
+    df = read_dataset(dataset_id, columns)
+    for col in y_cols + list(exog):
+        df[col] = downcast_column(df[col])
+    return df
+
+
+def parse_dates(values, sample_size=DATE_SAMPLE_ROWS):
+    """Parse timestamps once with a format guessed from a sample instead of per row.
+
+    Numeric time indexes are kept as they are.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype("datetime64[ns]")
+    if pd.api.types.is_numeric_dtype(values):
+        return values
+    sample = values.dropna().astype(str).iloc[:sample_size]
+    if len(sample):
+        # Day-first and month-first read the same on some days, the sample decides
+        for dayfirst in (False, True):
+            date_format = guess_datetime_format(sample.iloc[0], dayfirst=dayfirst)
+            if date_format is None:
+                continue
+            try:
+                pd.to_datetime(sample, format=date_format)
+            except (ValueError, TypeError):
+                continue
+            return pd.to_datetime(values, format=date_format).astype("datetime64[ns]")
+    return pd.to_datetime(values, format="mixed").astype("datetime64[ns]")
+
+
+@timed
+def transform_df_nixtla(df, x_col, y_col, id_col=None, exog=()):
+    """Bring the data into the compact long unique_id/ds/y format used by StatsForecast.
+
+    ``y_col`` may be a list of columns, which are melted into one series each.
+    ``unique_id`` is categorical, ``ds`` is parsed to datetime64[ns] and ``y`` is
+    float32 where all values are numeric and float32 keeps their precision. The
+    ``exog`` columns are kept as numeric regressors after ``y``, compacted the same
+    way. Rows are sorted by series and time, so every series is one contiguous block.
+    """
+    exog = list(exog)
+    if not isinstance(y_col, str):
+        df_transformed = df.melt(
+            id_vars=[x_col] + exog,
+            value_vars=list(y_col),
+            var_name="unique_id",
+            value_name="y",
+        ).rename(columns={x_col: "ds"})
+    elif id_col:
+        df_transformed = df[[id_col, x_col, y_col] + exog].rename(
+            columns={id_col: "unique_id", x_col: "ds", y_col: "y"}
+        )
+    else:
+        df_transformed = df[[x_col, y_col] + exog].rename(columns={x_col: "ds", y_col: "y"})
+        df_transformed.insert(0, "unique_id", "time-analysis")
+    df_transformed = pd.DataFrame(
+        {
+            "unique_id": df_transformed["unique_id"].astype(str).astype("category"),
+            "ds": parse_dates(df_transformed["ds"]),
+            "y": downcast_column(df_transformed["y"]),
+            **{
+                col: compact_float(pd.to_numeric(df_transformed[col], errors="coerce"))
+                for col in exog
+            },
+        }
+    )
+    return df_transformed.sort_values(["unique_id", "ds"], kind="stable", ignore_index=True)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def load_canonical_series(dataset_id, x_col, y_col, id_col=None, exog=()):
+    """Transform a stored dataset once and share the result between reruns and sessions.
+
+    Callers must treat the returned frame as read-only.
+    """
+    df = load_series(dataset_id, x_col, y_col, id_col, exog)
+    return transform_df_nixtla(df, x_col, y_col, id_col, exog)
+
+
+def validate_series(data):
+    """Infer the frequency and find duplicate, unordered and missing timestamps.
+
+    All series are checked in one vectorized pass over the timestamp differences.
+    Irregular timestamps get no frequency.
+    """
+    ds = data["ds"].to_numpy()
+    is_datetime = np.issubdtype(ds.dtype, np.datetime64)
+    ticks = ds.view(np.int64) if is_datetime else ds.astype(np.int64)
+    codes = data["unique_id"].cat.codes.to_numpy()
+    diffs = np.diff(ticks)[codes[1:] == codes[:-1]]
+    positive = diffs[diffs > 0]
+    report = {
+        "freq": None,
+        "step": None,
+        "duplicates": int((diffs == 0).sum()),
+        "unordered": int((diffs < 0).sum()),
+        "gaps": 0,
+        "missing": 0,
+        "irregular": False,
+    }
+    if not len(positive):
+        return report
+    values, counts = np.unique(positive, return_counts=True)
+    step = int(values[np.argmax(counts)])
+    # Calendar steps such as months vary in length, so allow some slack
+    gaps = positive[positive > 1.5 * step]
+    report.update(
+        step=step,
+        gaps=int(len(gaps)),
+        missing=int((np.round(gaps / step) - 1).sum()),
+        # No common step: most timestamps are not on any grid
+        irregular=bool(counts.max() < 0.5 * len(positive)),
+    )
+    # Irregular timestamps have no frequency; a step such as "246091313ns" would
+    # only pre-fill the fit with a nonsense alias, so they must be resampled first
+    if is_datetime and not report["irregular"]:
+        first = ds[: min(len(ds), DATE_SAMPLE_ROWS)][codes[: DATE_SAMPLE_ROWS] == codes[0]]
+        try:
+            report["freq"] = pd.infer_freq(pd.DatetimeIndex(np.unique(first)))
+        except (TypeError, ValueError):
+            pass
+        if report["freq"] is None:
+            report["freq"] = to_offset(pd.Timedelta(step)).freqstr
+    return report
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def cached_validation(dataset_id, x_col, y_col, id_col, _data, preprocess=None, exog=None):
+    """Memoize the validation per dataset, column selection, pre-processing and
+    regressors"""
+    return validate_series(_data)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def dataset_summary(dataset_id):
+    """Summary statistics of every column, computed at ingest or, for datasets
+    stored without them, in one pass over the stored record batches"""
+    summary = read_summary(dataset_id)
+    if summary is None:
+        tracker = StreamingSummary()
+        for chunk in iter_dataset_chunks(dataset_id):
+            tracker.update(chunk)
+        summary = tracker.result()
+        write_summary(dataset_id, summary)
+    return summary
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def cached_row_count(dataset_id):
+    return count_rows(dataset_id)
+
+
+@st.fragment
+def render_preview(dataset_id, columns):
+    """Show one page of rows, read from the store when the page changes.
+
+    Runs as a fragment, so paging does not rerun the rest of the page.
+    """
+    total = cached_row_count(dataset_id)
+    pages = max((total + PREVIEW_ROWS - 1) // PREVIEW_ROWS, 1)
+    page = st.number_input(
+        f"Page (of {pages})", min_value=1, max_value=pages, value=1, key="preview_page"
+    )
+    start = (page - 1) * PREVIEW_ROWS
+    stop = min(start + PREVIEW_ROWS, total)
+    rows = read_rows(dataset_id, start, stop, columns)
+    rows.index = pd.RangeIndex(start, start + len(rows))
+    st.dataframe(rows, use_container_width=True)
+    st.caption(f"Rows {start + 1:,}-{stop:,} of {total:,}")
 
 
 def is_data_in_session():
     """Check if data is stored in session"""
     return (
-        "uploaded_data" in st.session_state
-        and st.session_state["uploaded_data"] is not None
+        has_dataset(st.session_state.get("dataset_id"))
         and "x_axis" in st.session_state
         and "y_axis" in st.session_state
     )
 
 
-def process_data(df=None, x_col=None, y_col=None):
+def select_decomposition():
+    """Let the user choose the decomposition method and season length (0 = detect)"""
+    method = st.sidebar.selectbox(
+        "**Decomposition**",
+        DECOMPOSITION_METHODS,
+        key="temp_decomposition",
+        help="""
+        - **Fast**: Vectorized moving-average trend and per-phase seasonal means, handles millions of points.
+        - **STL / MSTL**: Loess based, smoothed on a coarser grid. Slower on long series.
+        - **Classical**: Moving-average decomposition with a single season.
+        """,
+    )
+    period = st.sidebar.number_input(
+        "**Season Length**",
+        min_value=0,
+        value=0,
+        key="temp_decomposition_period",
+        help="Leave at 0 to detect the dominant season lengths automatically.",
+    )
+    return method, int(period)
+
+
+def render_decomposition(df, x_col, y_col, decomposition=None, series_key=None):
+    """Detect the season lengths if needed, decompose the series and plot it"""
+    method, period = decomposition or (DECOMPOSITION_METHODS[0], 0)
+    dataset_id = st.session_state.get("dataset_id")
+    y = pd.to_numeric(df[y_col], errors="coerce").to_numpy(
+        dtype="float64", na_value=float("nan")
+    )
+    periods = [period] if period else cached_periods(dataset_id, series_key, y)
+    if not periods:
+        st.info("No clear seasonality found, set a season length to decompose.")
+        return
+    st.write(f"**Season length(s):** {', '.join(map(str, periods))}")
+    try:
+        components = cached_decomposition(dataset_id, series_key, tuple(periods), method, y)
+    except Exception as e:
+        st.warning(f"Could not decompose the series: {e}")
+        return
+    st.plotly_chart(decomposition_plot(df[x_col], components), use_container_width=True)
+
+
+@timed
+def process_data(df=None, x_col=None, y_col=None, id_col=None, decomposition=None):
     """Process the DataFrame and generate content."""
 
-    # Save transformed data to session
-    if "transformed_data" not in st.session_state:
-        st.session_state["transformed_data"] = transform_df_nixtla(df, x_col, y_col)
+    if id_col:
+        # Only the first series is visualized, the others share its layout
+        first_id = df[id_col].iloc[0]
+        st.info(f"Showing series **{first_id}** of {df[id_col].nunique()}")
+        df = df[df[id_col] == first_id]
+
+    import plotly.express as px
 
     # Plot
     st.write(f"### Plot: {x_col} vs {y_col}")
-    fig = px.line(df, x=x_col, y=y_col, title=f"{x_col} vs {y_col}")
-    season_data = seasonal_decompose(df[y_col], model = "add", period=12)
+    x, y = downsample_trace(df[x_col], df[y_col])
+    fig = px.line(x=x, y=y, title=f"{x_col} vs {y_col}", labels={"x": x_col, "y": y_col})
     st.plotly_chart(fig, use_container_width=True)
 
-    decompose_df = pd.DataFrame({
-        'date': df.index,
-        'observed': season_data.observed,
-        'trend': season_data.trend,
-        'seasonal': season_data.seasonal,
-        'residual': season_data.resid
-    })
-
-    decomposed_df_long = decompose_df.melt(id_vars="date", value_vars=['observed', 'trend', 'seasonal', 'residual'],
-                                        var_name='component', value_name='value')
-
-    # Plot the decomposition using Plotly Express
-    fig_season = px.line(decomposed_df_long, x='date', y='value', color='component', 
-              title="Decomposed Time Series", labels={'value': 'Value', 'date': 'Date'})
-
-    # Show the plot in Streamlit
-    st.plotly_chart(fig_season)
+    render_decomposition(df, x_col, y_col, decomposition, series_key=(y_col, id_col))
 
     # Layout: DataFrame and description side by side
     col1, col2 = st.columns(2)
+    dataset_id = st.session_state.get("dataset_id")
+    columns = [x_col, y_col] + ([id_col] if id_col else [])
     with col1:
         st.write("### Data Preview")
-        st.dataframe(df, use_container_width=True)
+        render_preview(dataset_id, columns)
     with col2:
         st.write("### Data Description")
-        description = df[[x_col, y_col]].describe()
+        description = summary_frame(dataset_summary(dataset_id), columns)
         st.dataframe(description, use_container_width=True)
+        st.caption("Over all rows; quantiles are approximate.")
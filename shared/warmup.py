@@ -0,0 +1,46 @@
+"""Pay the one-off import and compilation costs before the server takes traffic.
+
+Fits every model once on a small synthetic series so that compiled kernels are
+written to their on-disk caches (``NUMBA_CACHE_DIR`` for numba-backed
+statsforecast versions) and the heavy libraries are byte-compiled. Run it while
+building the image or before starting the server:
+
+    python -m shared.warmup
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def warm_up(n_points=400, season_length=24):
+    """Fit, cross-validate and decompose a small series with every model"""
+    from shared.utils_fitting import get_model, get_models, run_fit, evaluate_performance
+    from shared.utils_ml import ML_MODELS
+    from shared.utils_seasonality import decompose
+
+    positions = np.arange(n_points)
+    data = pd.DataFrame(
+        {
+            "unique_id": "warmup",
+            "ds": pd.date_range("2020-01-01", periods=n_points, freq="h"),
+            "y": 10 + np.sin(2 * np.pi * positions / season_length) + positions / n_points,
+        }
+    )
+    train_data, test_data = data.iloc[:-season_length], data.iloc[-season_length:]
+    models = get_models(season_length, 2 * season_length)
+    forecast_df, sf = run_fit(models, train_data, season_length, "h")
+    for model in models:
+        evaluate_performance(forecast_df, test_data, str(model))
+    sf.cross_validation(df=data, h=season_length, n_windows=2, step_size=season_length)
+    ml_models = [get_model(name, season_length) for name in ML_MODELS]
+    run_fit(ml_models, train_data, season_length, "h")
+    for method in ("STL", "MSTL", "Classical"):
+        decompose(data["y"].to_numpy(), [season_length, 2 * season_length], method)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    warm_up()
+    print(f"Warm-up finished in {time.perf_counter() - start:.1f}s", file=sys.stderr)
@@ -0,0 +1,29 @@
+import numpy as np
+
+from shared.utils_anomaly import rolling_robust_zscore
+
+
+def test_spikes_stand_out_against_their_neighbours():
+    rng = np.random.default_rng(0)
+    y = np.sin(np.arange(5_000) / 50) + rng.normal(0, 0.05, 5_000)
+    y[[1_000, 4_000]] += [3.0, -3.0]
+    z, median = rolling_robust_zscore(y, 101)
+    assert len(z) == len(median) == len(y)
+    assert set(np.flatnonzero(np.abs(z) > 10)) == {1_000, 4_000}
+    # The rolling median follows the level, not the spike
+    assert abs(median[1_000] - np.sin(1_000 / 50)) < 0.1
+
+
+def test_constant_windows_and_gaps_do_not_produce_nan():
+    y = np.ones(300)
+    y[100] = np.nan
+    z, _ = rolling_robust_zscore(y, 25)
+    assert np.isfinite(z[~np.isnan(y)]).all()
+    assert not z[np.arange(300) != 100].any()
+
+
+def test_windows_longer_than_the_series_are_capped():
+    y = np.arange(10, dtype=np.float64)
+    z, median = rolling_robust_zscore(y, 100)
+    assert np.all(median == 4.5)
+    assert z[0] < 0 < z[-1]
@@ -0,0 +1,45 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from shared.batch import MANIFEST_NAME, load_manifest, run_batch
+
+CONFIG = {
+    "x_col": "date",
+    "y_col": "value",
+    "model": "HistoricAverage",
+    "season_length": 7,
+    "freq": "D",
+    "split_ratio": 80,
+    "horizon": 5,
+}
+
+
+def write_input(path, n=60):
+    pd.DataFrame(
+        {"date": pd.date_range("2024-01-01", periods=n, freq="D"), "value": np.arange(n)}
+    ).to_csv(path, index=False)
+
+
+def test_resume_skips_finished_files_until_they_change(tmp_path):
+    inputs, output = tmp_path / "in", tmp_path / "out"
+    inputs.mkdir()
+    for name in ("a.csv", "b.csv"):
+        write_input(inputs / name)
+    (inputs / "broken.csv").write_text("date,other\n2024-01-01,1\n")
+
+    first = run_batch([str(inputs)], str(output), CONFIG, max_workers=1, log=None)
+    assert (first["done"], first["failed"], first["skipped"]) == (2, 1, 0)
+    assert len(pd.read_parquet(output / "forecasts")) == 10
+
+    write_input(inputs / "b.csv", n=90)
+    second = run_batch([str(inputs)], str(output), CONFIG, max_workers=1, log=None)
+    # Failed files are retried, changed files processed again
+    assert (second["done"], second["failed"], second["skipped"]) == (1, 1, 1)
+    manifest = load_manifest(str(output))
+    assert manifest[str(inputs / "b.csv")]["rows"] == 90
+    with open(output / MANIFEST_NAME) as f:
+        assert len([json.loads(line) for line in f]) == 5
+    assert sorted(os.listdir(output)) == ["forecasts", "manifest.jsonl", "metrics.parquet"]
@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import shared.utils_cache as utils_cache
+from shared.utils_cache import cache_get, cache_put, cache_stats, hash_frame, make_fit_key
+from shared.utils_fitting import get_model
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(utils_cache, "FIT_CACHE_DIR", "")
+    utils_cache.get_fit_cache.clear()
+    yield
+    utils_cache.get_fit_cache.clear()
+
+
+def frame(values):
+    return pd.DataFrame(
+        {
+            "unique_id": pd.Categorical(["a"] * len(values)),
+            "ds": pd.date_range("2024-01-01", periods=len(values), freq="h"),
+            "y": np.asarray(values, dtype=np.float32),
+        }
+    )
+
+
+def test_hash_frame_ignores_the_index_but_not_the_values():
+    data = frame([1, 2, 3])
+    assert hash_frame(data) == hash_frame(data.set_axis([7, 8, 9]))
+    assert hash_frame(data) != hash_frame(frame([1, 2, 4]))
+
+
+def test_fit_key_covers_data_model_parameters_and_config():
+    data = frame(np.arange(50))
+    key = make_fit_key(data, get_model("HoltWinters", 24), freq="h")
+    assert key == make_fit_key(data.copy(), get_model("HoltWinters", 24), freq="h")
+    assert key != make_fit_key(data, get_model("HoltWinters", 12), freq="h")
+    assert key != make_fit_key(data, get_model("HoltWinters", 24), freq="D")
+    assert key != make_fit_key(frame(np.arange(1, 51)), get_model("HoltWinters", 24), freq="h")
+
+
+def test_memory_cache_evicts_the_least_recently_used(monkeypatch):
+    monkeypatch.setattr(utils_cache, "FIT_CACHE_MAX_ENTRIES", 2)
+    cache_put("a", 1)
+    cache_put("b", 2)
+    assert cache_get("a") == 1
+    cache_put("c", 3)
+    assert cache_get("b") is None
+    assert (cache_get("a"), cache_get("c")) == (1, 3)
+    assert cache_stats() == {"hits": 3, "misses": 1, "entries": 2}
+
+
+def test_disk_cache_survives_the_memory_cache_and_evicts_by_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils_cache, "FIT_CACHE_DIR", str(tmp_path))
+    cache_put("old", np.zeros(100_000))
+    os.utime(tmp_path / "old.pkl", (0, 0))
+    utils_cache.get_fit_cache.clear()
+    assert cache_get("old").shape == (100_000,)
+
+    # Room for one array: the least recently used file goes, the new one stays
+    monkeypatch.setattr(utils_cache, "FIT_CACHE_MAX_MB", 1.0)
+    os.utime(tmp_path / "old.pkl", (0, 0))
+    cache_put("new", np.zeros(100_000))
+    assert sorted(os.listdir(tmp_path)) == ["new.pkl"]
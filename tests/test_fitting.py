@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from shared.utils_fitting import calendar_seasons, infer_settings, match_season
+from shared.utils_upload import validate_series
+
+HOUR = 3_600 * 10**9
+DAY = 24 * HOUR
+
+
+@pytest.mark.parametrize(
+    "step, seasons",
+    [
+        (HOUR, [24, 168]),
+        (60 * 10**9, [60, 1_440, 10_080]),
+        (DAY, [7, 365]),
+        (7 * DAY, [52]),
+        (31 * DAY, [12]),
+        (None, []),
+    ],
+)
+def test_calendar_seasons(step, seasons):
+    assert calendar_seasons(step) == seasons
+
+
+def test_match_season_snaps_to_a_close_calendar_season():
+    assert match_season(167, [24, 168]) == 168
+    assert match_season(23, [24, 168]) == 24
+    assert match_season(161, [24, 168]) is None
+
+
+def frame(y, ds):
+    return pd.DataFrame(
+        {"unique_id": pd.Categorical(["a"] * len(y)), "ds": ds, "y": y.astype(np.float32)}
+    )
+
+
+def test_infer_settings_keeps_calendar_seasons_of_hourly_data():
+    t = np.arange(20_000)
+    y = 10 * np.sin(2 * np.pi * t / 24) + 6 * np.sin(2 * np.pi * t / 168)
+    y += np.random.default_rng(0).normal(0, 1, len(t))
+    data = frame(y, pd.date_range("2020-01-01", periods=len(t), freq="h"))
+    settings = infer_settings(data, validate_series(data))
+    assert settings["freq"] == "h"
+    assert settings["season_lengths"] == [24, 168]
+
+
+def test_infer_settings_falls_back_when_the_period_is_off_calendar():
+    t = np.arange(2_000)
+    y = np.sin(2 * np.pi * t / 17)
+    data = frame(y, pd.date_range("2020-01-01", periods=len(t), freq="h"))
+    assert infer_settings(data, validate_series(data))["season_lengths"] == [24]
+
+
+def test_infer_settings_keeps_detected_periods_of_integer_time():
+    t = np.arange(2_000)
+    data = frame(np.sin(2 * np.pi * t / 17), t)
+    assert infer_settings(data, validate_series(data))["season_lengths"] == [17]
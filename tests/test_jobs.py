@@ -0,0 +1,38 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import shared.utils_fitting as utils_fitting
+from shared.utils_fitting import single_process_fits
+from shared.utils_jobs import _drop_idle
+
+
+def fit_jobs_in_worker():
+    return utils_fitting.FIT_N_JOBS
+
+
+def test_pool_workers_fit_in_a_single_process():
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(1, mp_context=context, initializer=single_process_fits) as pool:
+        assert pool.submit(fit_jobs_in_worker).result() == 1
+    assert utils_fitting.FIT_N_JOBS == -1
+
+
+def job(seen):
+    return {"seen": seen, "future": Future(), "result": None}
+
+
+def test_idle_jobs_are_cancelled_and_dropped():
+    now = time.time()
+    stale, fresh = job(now - 3600), job(now)
+    manager = {
+        "jobs": {"stale": stale, "fresh": fresh},
+        "progress": {"stale": "Queued", "fresh": "Queued"},
+        "lock": threading.Lock(),
+    }
+    _drop_idle(manager)
+    assert list(manager["jobs"]) == ["fresh"]
+    assert list(manager["progress"]) == ["fresh"]
+    assert stale["future"].cancelled()
+    assert not fresh["future"].cancelled()
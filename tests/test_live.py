@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+import shared.utils_live as utils_live
+from shared.utils_live import (
+    FileTail,
+    RingBuffer,
+    SocketSource,
+    extend_live_frame,
+    live_file_path,
+    parse_lines,
+)
+
+
+def append(buffer, start, stop):
+    buffer.append(np.arange(start, stop, dtype=np.int64) * 10**9, np.arange(start, stop, dtype=float))
+
+
+def test_ring_buffer_keeps_the_newest_values_in_order():
+    buffer = RingBuffer(5)
+    append(buffer, 0, 3)
+    append(buffer, 3, 8)
+    ds, y, total = buffer.snapshot()
+    assert y.tolist() == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert total == 8
+    assert np.all(np.diff(ds.astype(np.int64)) > 0)
+
+
+def test_ring_buffer_drops_values_that_are_not_newer():
+    buffer = RingBuffer(5)
+    append(buffer, 0, 3)
+    assert buffer.append(np.array([1, 5], dtype=np.int64) * 10**9, np.array([9.0, 5.0])) == 1
+    assert buffer.snapshot()[1].tolist() == [0.0, 1.0, 2.0, 5.0]
+
+
+def test_since_copies_only_the_new_values():
+    buffer = RingBuffer(5)
+    append(buffer, 0, 4)
+    append(buffer, 4, 6)
+    assert buffer.since(4)[1].tolist() == [4.0, 5.0]
+    assert buffer.since(6)[1].tolist() == []
+
+
+def test_live_frame_is_extended_and_cut_to_the_capacity():
+    buffer = RingBuffer(10)
+    frame, seen = None, 0
+    for start, stop in [(0, 4), (4, 9), (9, 13)]:
+        append(buffer, start, stop)
+        frame, seen = extend_live_frame(frame, buffer, seen, "s")
+    assert frame["y"].tolist() == list(np.arange(3.0, 13.0))
+    append(buffer, 13, 40)
+    frame, seen = extend_live_frame(frame, buffer, seen, "s")
+    assert frame["y"].tolist() == list(np.arange(30.0, 40.0))
+    assert seen == 40
+
+
+def test_parse_lines_skips_headers_and_bad_values():
+    ds, y = parse_lines(["time,value", "2024-01-01 00:00:00,1.5", "2024-01-01 01:00:00,x"])
+    assert y.tolist() == [1.5]
+    assert len(ds) == 1
+
+
+def test_file_tail_returns_only_complete_lines(tmp_path):
+    path = tmp_path / "live.csv"
+    path.write_text("a,1\nb,2\nc,")
+    tail = FileTail(str(path))
+    assert tail.read(0) == ["a,1", "b,2"]
+    with open(path, "a") as f:
+        f.write("3\n")
+    assert tail.read(0) == ["c,3"]
+
+
+def test_files_outside_the_live_directory_are_refused(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils_live, "LIVE_DATA_DIR", str(tmp_path))
+    assert live_file_path("live.csv") == str((tmp_path / "live.csv").resolve())
+    for name in ["../secret.csv", "/etc/passwd"]:
+        with pytest.raises(ValueError):
+            live_file_path(name)
+
+
+@pytest.mark.parametrize("host", ["0.0.0.0", "192.168.1.10", "example.com"])
+def test_sockets_only_listen_on_loopback(host):
+    with pytest.raises(ValueError):
+        SocketSource("TCP socket", host, 39_123)
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from shared.utils_cache import make_fit_key
+from shared.utils_ml import LagForecaster, MLModel, lag_features
+
+
+def series(n=400):
+    t = np.arange(n)
+    return pd.DataFrame(
+        {
+            "unique_id": pd.Categorical(["a"] * n),
+            "ds": pd.date_range("2020-01-01", periods=n, freq="h"),
+            "y": (10 + np.sin(2 * np.pi * t / 24)).astype(np.float32),
+        }
+    )
+
+
+def test_lag_features_hold_the_history_before_each_target():
+    y = np.arange(10, dtype=np.float64)
+    X, target = lag_features(y, [1, 2], [3])
+    assert target.tolist() == list(range(3, 10))
+    assert X[0].tolist() == [2.0, 1.0, 1.0]
+
+
+def test_fit_leaves_the_callers_model_and_its_cache_key_unchanged():
+    data = series()
+    model = MLModel("Ridge", season_length=24)
+    key = make_fit_key(data, model, freq="h")
+    sf = LagForecaster([model], freq="h").fit(data)
+    assert model.regressor_ is None
+    assert sf.models[0].regressor_ is not None
+    assert make_fit_key(data, model, freq="h") == key
+
+
+def test_forecast_follows_the_season_with_intervals():
+    sf = LagForecaster([MLModel("Ridge", season_length=24)], freq="h").fit(series())
+    forecast = sf.predict(24, level=[80])
+    assert len(forecast) == 24
+    assert (forecast["Ridge-lo-80"] <= forecast["Ridge"]).all()
+    assert np.abs(forecast["Ridge"].to_numpy() - 10).max() < 1.5
+
+
+def test_conformal_intervals_are_refused():
+    with pytest.raises(ValueError, match="Conformal"):
+        LagForecaster([MLModel("Ridge")], freq="h").fit(series(), prediction_intervals=object())
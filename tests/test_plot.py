@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+import shared.utils_plot as utils_plot
+from shared.utils_plot import downsample_indices, downsample_trace, lttb_indices, minmax_indices
+
+
+def test_minmax_keeps_the_extremes_of_every_bucket():
+    y = np.zeros(1_000)
+    y[[123, 456, 789]] = [5.0, -5.0, 7.0]
+    indices = minmax_indices(y, 10)
+    assert {0, 123, 456, 789, 999} <= set(indices.tolist())
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_returns_n_out_sorted_points_with_both_ends():
+    x = np.arange(10_000, dtype=np.float64)
+    indices = lttb_indices(x, np.sin(x / 100), 500)
+    assert len(indices) == 500
+    assert indices[0] == 0 and indices[-1] == 9_999
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_downsampling_keeps_spikes_and_short_traces():
+    x = pd.date_range("2024-01-01", periods=200_000, freq="s").to_numpy()
+    y = np.random.default_rng(0).normal(size=200_000)
+    y[123_456] = 100.0
+    indices = downsample_indices(x, y, 1_000)
+    assert len(indices) <= 1_000
+    assert 123_456 in indices
+    assert np.array_equal(downsample_indices(x[:500], y[:500], 1_000), np.arange(500))
+
+
+def test_downsample_trace_restricts_to_the_window_and_keys_on_content():
+    utils_plot.get_plot_cache.clear()
+    x = pd.date_range("2024-01-01", periods=100_000, freq="min")
+    y = np.arange(100_000, dtype=np.float64)
+    window = (x[10_000], x[20_000])
+    tx, ty = downsample_trace(x, y, window, n_out=500)
+    assert len(ty) <= 500
+    assert tx[0] <= window[0].to_datetime64() and tx[-1] >= window[1].to_datetime64()
+
+    # The same length and window with one changed value must not hit the cached trace
+    edited = y.copy()
+    edited[15_000] = -1.0
+    assert -1.0 in downsample_trace(x, edited, window, n_out=500)[1]
+    assert -1.0 not in downsample_trace(x, y, window, n_out=500)[1]
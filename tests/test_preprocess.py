@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from shared.utils_preprocess import clip_outliers, fill_missing, preprocess_series, resample
+from shared.utils_upload import compact_float, downcast_column
+
+
+def frame(ds, y, ids=None):
+    return pd.DataFrame(
+        {
+            "unique_id": pd.Categorical(ids if ids is not None else ["a"] * len(ds)),
+            "ds": ds,
+            "y": np.asarray(y, dtype=np.float32),
+        }
+    )
+
+
+def test_resample_aggregates_each_series_and_keeps_the_dtype():
+    ds = pd.date_range("2024-01-01", periods=8, freq="30min")
+    data = frame(ds.append(ds), np.arange(16), ["a"] * 8 + ["b"] * 8)
+    hourly = resample(data, "h", "sum")
+    assert hourly["y"].dtype == np.float32
+    assert hourly["y"].tolist() == [1, 5, 9, 13, 17, 21, 25, 29]
+    assert resample(data, "h", "last")["y"].tolist()[:4] == [1, 3, 5, 7]
+
+
+@pytest.mark.parametrize(
+    "method, filled", [("ffill", [2, 2]), ("zero", [0, 0]), ("interpolate", [3, 4])]
+)
+def test_fill_missing_fills_each_series_and_keeps_the_dtype(method, filled):
+    ds = pd.date_range("2024-01-01", periods=6, freq="D").delete([2, 3])
+    data = frame(ds.append(ds), [1, 2, 5, 6] * 2, ["a"] * 4 + ["b"] * 4)
+    result = fill_missing(data, "D", method)
+    assert len(result) == 12
+    assert result["y"].dtype == np.float32
+    assert result["y"].tolist()[:6] == [1, 2, *filled, 5, 6]
+    assert result["unique_id"].tolist() == ["a"] * 6 + ["b"] * 6
+
+
+def test_fill_missing_at_calendar_frequencies():
+    ds = pd.date_range("2024-01-31", periods=6, freq="ME").delete(2)
+    result = fill_missing(frame(ds, np.arange(5)), "ME", "ffill")
+    assert result["ds"].tolist() == pd.date_range("2024-01-31", periods=6, freq="ME").tolist()
+
+
+def test_clip_outliers_leaves_zero_mad_series_alone():
+    spiky = [10, 11, 9, 10, 1_000, 10, 11, 9]
+    intermittent = [0, 0, 0, 0, 5, 0, 0, 0]
+    ds = pd.date_range("2024-01-01", periods=8, freq="D")
+    data = frame(ds.append(ds), spiky + intermittent, ["a"] * 8 + ["b"] * 8)
+    clipped = clip_outliers(data, 5.0)
+    assert clipped["y"].iloc[4] < 20
+    assert clipped["y"].iloc[8:].tolist() == intermittent
+    assert clipped["y"].dtype == np.float32
+
+
+def test_preprocess_series_needs_timestamps_to_resample():
+    data = frame(np.arange(10), np.arange(10))
+    with pytest.raises(ValueError, match="timestamp"):
+        preprocess_series(data, freq="h")
+    assert preprocess_series(data, clip=5.0)["y"].tolist() == list(range(10))
+
+
+def test_values_are_stored_as_float32_only_when_that_keeps_their_precision():
+    assert compact_float([1.5, 2.25, np.nan]).dtype == np.float32
+    assert compact_float([1e9, 1e9 + 1]).dtype == np.float64
+    assert downcast_column(pd.Series(["1", "x"])).tolist() == ["1", "x"]
+    assert downcast_column(pd.Series([1, 2, 3])).dtype == np.float32
@@ -0,0 +1,44 @@
+import threading
+
+import shared.utils_registry as utils_registry
+
+
+def _entry(config):
+    return {
+        "name": "HoltWinters",
+        "fingerprint": "abc",
+        "config": config,
+        "data": {"filename": "data.csv"},
+        "metrics": {"mae": 1.0},
+    }
+
+
+def test_register_versions_and_reuse(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils_registry, "MODEL_REGISTRY_DIR", str(tmp_path))
+    first = utils_registry.register_model({"fitted": 1}, _entry({"season_length": 24}))
+    again = utils_registry.register_model({"fitted": 1}, _entry({"season_length": 24}))
+    second = utils_registry.register_model({"fitted": 2}, _entry({"season_length": 168}))
+    assert first == again
+    versions = {e["id"]: e["version"] for e in utils_registry.list_models("abc")}
+    assert versions == {first: 1, second: 2}
+    assert utils_registry.load_model(second) == {"fitted": 2}
+
+
+def test_concurrent_register_of_same_fit(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils_registry, "MODEL_REGISTRY_DIR", str(tmp_path))
+    ids = []
+    start = threading.Barrier(8)
+
+    def register():
+        start.wait()
+        ids.append(utils_registry.register_model({"fitted": 1}, _entry({"season_length": 24})))
+
+    threads = [threading.Thread(target=register) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(ids)) == 1
+    assert [e["version"] for e in utils_registry.list_models()] == [1]
+    assert len(list((tmp_path / "models").iterdir())) == 1
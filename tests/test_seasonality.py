@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from shared.utils_seasonality import detect_periods
+
+
+def hourly_series(n, seed=0):
+    """Daily and weekly seasons of hourly data on a strong upward trend"""
+    t = np.arange(n)
+    noise = np.random.default_rng(seed).normal(0, 1, n)
+    return 0.01 * t + 10 * np.sin(2 * np.pi * t / 24) + 6 * np.sin(2 * np.pi * t / 168) + noise
+
+
+@pytest.mark.parametrize("n", [2_000, 20_000, 100_000, 500_000, 2_000_000])
+def test_detects_daily_and_weekly_seasons_at_every_length(n):
+    periods = detect_periods(hourly_series(n))
+    expected = [24, 168] if n >= 20_000 else [24]
+    assert periods[: len(expected)] == expected
+
+
+def test_short_series_only_finds_the_daily_season():
+    assert detect_periods(hourly_series(600))[0] == 24
+
+
+def test_period_longer_than_the_prefix_is_refined_to_full_resolution():
+    t = np.arange(3_000_000)
+    y = 0.01 * t + 10 * np.sin(2 * np.pi * t / 20_000)
+    y += np.random.default_rng(1).normal(0, 1, len(t))
+    (period,) = detect_periods(y)
+    assert abs(period - 20_000) <= 20
+
+
+def test_noise_has_no_season():
+    assert detect_periods(np.random.default_rng(2).normal(0, 1, 200_000)) == []
+
+
+def test_gaps_are_filled_before_detection():
+    t = np.arange(5_000)
+    y = np.sin(2 * np.pi * t / 7).astype(np.float64)
+    y[::50] = np.nan
+    assert detect_periods(y)[0] == 7
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from shared.utils_stats import SUMMARY_QUANTILES, QuantileSketch, StreamingSummary
+
+
+def test_sketch_quantiles_are_close_and_memory_is_bounded():
+    values = np.random.default_rng(0).normal(size=1_000_000)
+    sketch = QuantileSketch(size=1_024)
+    for chunk in np.array_split(values, 100):
+        sketch.update(chunk)
+    estimated = sketch.quantiles(SUMMARY_QUANTILES)
+    exact = np.quantile(values, SUMMARY_QUANTILES)
+    # Rank error, in fractions of the data, rather than value error
+    ranks = np.searchsorted(np.sort(values), estimated) / len(values)
+    assert np.abs(ranks - np.asarray(SUMMARY_QUANTILES)).max() < 0.01
+    assert np.abs(estimated - exact).max() < 0.1
+    assert sum(len(level) for level in sketch.levels) < 1_024 * len(sketch.levels)
+
+
+def test_sketch_of_nothing_is_nan():
+    assert np.isnan(QuantileSketch().quantiles([0.5])).all()
+
+
+def test_streaming_summary_matches_the_whole_frame():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame(
+        {
+            "y": rng.normal(10, 3, 10_000),
+            "count": rng.integers(0, 100, 10_000),
+            "label": rng.choice(["a", "b"], 10_000),
+        }
+    )
+    df.loc[::7, "y"] = np.nan
+    summary = StreamingSummary()
+    chunks = list(summary.track(df.iloc[i : i + 777] for i in range(0, len(df), 777)))
+    assert sum(len(chunk) for chunk in chunks) == len(df)
+    result = summary.result()
+
+    y = df["y"].dropna()
+    assert result["y"]["count"] == len(y)
+    assert result["y"]["missing"] == df["y"].isna().sum()
+    np.testing.assert_allclose(
+        [result["y"]["mean"], result["y"]["std"], result["y"]["min"], result["y"]["max"]],
+        [y.mean(), y.std(), y.min(), y.max()],
+    )
+    assert abs(result["count"]["50%"] - df["count"].median()) <= 2
+    assert result["label"] == {"count": 10_000, "missing": 0}
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import shared.utils_store as utils_store
+from shared.utils_store import (
+    count_rows,
+    evict_datasets,
+    has_dataset,
+    read_columns,
+    read_dataset,
+    read_rows,
+    write_dataset,
+)
+
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils_store, "DATASET_STORE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_round_trip_in_chunks():
+    df = pd.DataFrame(
+        {
+            "ds": pd.date_range("2024-01-01", periods=10, freq="h"),
+            "y": np.arange(10, dtype=np.float32),
+            "meter": list("ab") * 5,
+        }
+    )
+    write_dataset("d", (df.iloc[i : i + 4] for i in range(0, 10, 4)))
+    assert has_dataset("d")
+    assert read_columns("d") == ["ds", "y", "meter"]
+    assert count_rows("d") == 10
+    pd.testing.assert_frame_equal(read_dataset("d"), df)
+    pd.testing.assert_frame_equal(read_dataset("d", ["y"]), df[["y"]])
+    pd.testing.assert_frame_equal(read_rows("d", 3, 6), df.iloc[3:6].reset_index(drop=True))
+
+
+def test_later_chunks_widen_the_schema(store_dir):
+    chunks = [
+        pd.DataFrame({"a": [1, 2], "b": [None, None]}),
+        pd.DataFrame({"a": [3.5, np.nan], "b": ["x", None]}),
+        pd.DataFrame({"a": ["text", "4"], "b": ["y", "z"]}),
+    ]
+    write_dataset("d", iter(chunks))
+    df = read_dataset("d")
+    assert df["a"].tolist() == ["1", "2", "3.5", None, "text", "4"]
+    assert df["b"].tolist() == [None, None, "x", None, "y", "z"]
+    assert sorted(os.listdir(store_dir)) == ["d.arrow"]
+
+
+def test_failed_writes_leave_no_files(store_dir):
+    def chunks():
+        yield pd.DataFrame({"a": [1.0]})
+        raise RuntimeError("upload interrupted")
+
+    with pytest.raises(RuntimeError):
+        write_dataset("d", chunks())
+    with pytest.raises(ValueError):
+        write_dataset("e", iter([]))
+    assert not has_dataset("d") and os.listdir(store_dir) == []
+
+
+def test_eviction_drops_expired_datasets_and_stale_temporary_files(store_dir):
+    write_dataset("old", iter([pd.DataFrame({"a": [1.0]})]))
+    write_dataset("new", iter([pd.DataFrame({"a": [1.0]})]))
+    (store_dir / "dead.arrow.1.tmp").write_bytes(b"")
+    for name in ("old.arrow", "dead.arrow.1.tmp"):
+        os.utime(store_dir / name, (0, 0))
+    evict_datasets()
+    assert sorted(os.listdir(store_dir)) == ["new.arrow"]
@@ -0,0 +1,31 @@
+import pandas as pd
+
+from benchmarks.run import DEFAULT_POINTS
+from benchmarks.synthetic import make_series, series_freq
+
+
+def test_short_series_keep_their_frequency():
+    data = make_series(1_000, freq="h")
+    assert series_freq(1_000, 1, "h") == "h"
+    assert data["ds"].iloc[0] == pd.Timestamp("2020-01-01")
+    assert (data["ds"].diff().dropna() == pd.Timedelta("1h")).all()
+
+
+def test_every_default_size_has_timestamps_that_fit():
+    for n_points in DEFAULT_POINTS:
+        assert series_freq(n_points, 1, "h") in ("h", "min")
+    assert series_freq(10_000_000, 1, "h") == "min"
+
+
+def test_series_beyond_the_hourly_range_switch_to_minutes():
+    # 2.6 million hours are close to three centuries, more than datetime64[ns] spans
+    data = make_series(2_600_000, freq="h")
+    assert data["ds"].is_monotonic_increasing
+    assert data["ds"].diff().iloc[1] == pd.Timedelta("1min")
+
+
+def test_long_series_start_earlier_to_end_in_range():
+    data = make_series(2_400_000, freq="h")
+    assert data["ds"].iloc[0] < pd.Timestamp("2020-01-01")
+    assert data["ds"].iloc[-1] <= pd.Timestamp.max
+    assert len(data) == 2_400_000
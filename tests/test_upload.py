@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import shared.utils_store as utils_store
+from benchmarks.run import UploadedBytes
+from benchmarks.synthetic import make_csv
+from shared.utils_fitting import frequency_options
+from shared.utils_preprocess import preprocess_series
+from shared.utils_store import read_dataset, read_summary
+from shared.utils_upload import ingest_file, validate_series
+
+
+def frame(ds, ids=None):
+    ids = ids if ids is not None else ["a"] * len(ds)
+    return pd.DataFrame(
+        {
+            "unique_id": pd.Categorical(ids),
+            "ds": ds,
+            "y": np.arange(len(ds), dtype=np.float32),
+        }
+    )
+
+
+def test_validate_series_infers_the_frequency():
+    report = validate_series(frame(pd.date_range("2024-01-01", periods=100, freq="h")))
+    assert report["freq"] == "h"
+    assert not report["irregular"]
+    assert report["missing"] == report["duplicates"] == report["unordered"] == 0
+
+
+def test_validate_series_counts_gaps_duplicates_and_unordered_timestamps():
+    ds = pd.date_range("2024-01-01", periods=100, freq="h").delete([10, 11, 50])
+    report = validate_series(frame(ds.append(ds[-1:]).append(ds[:1])))
+    assert report["freq"] == "h"
+    assert (report["gaps"], report["missing"]) == (2, 3)
+    assert report["duplicates"] == 1
+    assert report["unordered"] == 1
+
+
+def test_validate_series_checks_each_series_separately():
+    ds = pd.date_range("2024-01-01", periods=50, freq="D")
+    report = validate_series(frame(ds.append(ds), ["a"] * 50 + ["b"] * 50))
+    assert report["freq"] == "D"
+    assert report["unordered"] == report["duplicates"] == 0
+
+
+def test_irregular_timestamps_have_no_frequency():
+    rng = np.random.default_rng(0)
+    ds = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+        np.cumsum(rng.integers(1, 10**12, 500)), unit="ns"
+    )
+    report = validate_series(frame(ds))
+    assert report["irregular"]
+    assert report["freq"] is None
+    # The frequency select stays at its default option
+    options, index = frequency_options(report["freq"])
+    assert index == 0 and not any(key.startswith("Detected") for key in options)
+    with pytest.raises(ValueError, match="resample"):
+        preprocess_series(frame(ds), fill="interpolate")
+
+
+def test_ingest_stores_and_summarizes_the_upload_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils_store, "DATASET_STORE_DIR", str(tmp_path))
+    upload = UploadedBytes(make_csv(1_000, 2))
+    dataset_id = ingest_file(upload)
+    assert ingest_file(UploadedBytes(upload.getvalue())) == dataset_id
+    df = read_dataset(dataset_id)
+    assert len(df) == 1_000
+    assert read_summary(dataset_id)["value"]["count"] == 1_000
+    assert len(list(tmp_path.glob("*.arrow"))) == 1